@@ -2,60 +2,71 @@ import pandas as pd
 from datetime import datetime, timedelta
 import numpy as np
 
-def detect_anomalies(expenses):
+from analytics import as_analytics_frame
+
+def format_anomaly_alert(amount, category, description, median):
+    return f"⚠️ Unusual Spend: ₹{amount:,.2f} on {category} ({description}) is unusually high (Median: ₹{median:,.0f})."
+
+def detect_anomalies(expenses, window=5, multiplier=3.0, floor=100.0):
     """
-    Detects expenses that are significantly higher than the average for their category.
-    Rule: Expense > 3 * Median of Category.
-    Returns a list of alerts (strings).
+    Flags recent expenses that are much higher than usual for their category.
+    Rule: one of the `window` most recent expenses > max(multiplier * category median, floor).
+    Accepts a list of expense dicts or a DataFrame (such as the analytics frame).
+    Returns a list of alerts (strings), newest first.
     """
-    if not expenses:
+    if expenses is None or len(expenses) == 0:
         return []
 
-    df = pd.DataFrame(expenses)
-    alerts = []
+    df = expenses if isinstance(expenses, pd.DataFrame) else pd.DataFrame(expenses)
+    amounts = pd.to_numeric(df['amount'], errors='coerce')
 
-    # Calculate Median per category
-    category_stats = df.groupby('category')['amount'].median().reset_index()
-    category_stats.rename(columns={'amount': 'median'}, inplace=True)
-    
-    # Iterate over recent expenses (last 5)
-    # Ensure date is datetime for sorting
-    if 'date' in df.columns and df['date'].dtype == 'object':
-        try:
-            df['date'] = pd.to_datetime(df['date'], format='mixed')
-        except:
-            df['date'] = pd.to_datetime(df['date']) # Fallback
-        
-    recent = df.sort_values('date', ascending=False).head(5)
-    
-    for _, row in recent.iterrows():
-        cat = row['category']
-        amt = row['amount']
-        
-        median = category_stats[category_stats['category'] == cat]['median'].values[0]
-        
-        # Threshold: 3 * Median. Minimum threshold 100 to avoid noise.
-        threshold = max(3 * median, 100)
-        
-        if amt > threshold:
-            alerts.append(f"⚠️ Unusual Spend: ₹{amt:,.2f} on {cat} ({row['description']}) is unusually high (Median: ₹{median:,.0f}).")
+    # 1. Category medians in one grouped pass
+    medians = amounts.groupby(df['category'], sort=False, observed=True).median()
+
+    # 2. Pick the most recent `window` rows without sorting the whole frame.
+    # Rows whose date can't be parsed are never treated as recent.
+    dates = df['date']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        text = dates
+        dates = pd.to_datetime(text, format='ISO8601', errors='coerce')
+        # Imported rows can keep their statement's own format (e.g. 01/25/2025)
+        rest = dates.isna() & text.notna()
+        if rest.any():
+            dates[rest] = pd.to_datetime(text[rest], format='mixed', errors='coerce')
+    valid = np.flatnonzero(dates.notna().to_numpy())
+    ticks = dates.to_numpy(dtype='datetime64[ns]').view('i8')[valid]
+    k = min(window, len(ticks))
+    if k <= 0:
+        return []
+    top = np.argpartition(ticks, len(ticks) - k)[len(ticks) - k:]
+    top = valid[top[np.argsort(-ticks[top], kind='stable')]]
+
+    # 3. Compare against the thresholds, vectorized
+    categories = df['category'].to_numpy()[top]
+    descriptions = df['description'].to_numpy()[top]
+    recent_amounts = amounts.to_numpy()[top]
+    recent_medians = medians.reindex(categories).to_numpy()
+    flagged = recent_amounts > np.maximum(multiplier * recent_medians, floor)
 
-    return list(set(alerts)) # Deduplicate
+    alerts = [
+        format_anomaly_alert(amt, cat, desc, median)
+        for amt, cat, desc, median in zip(recent_amounts[flagged], categories[flagged],
+                                          descriptions[flagged], recent_medians[flagged])
+    ]
+    return list(dict.fromkeys(alerts)) # Deduplicate, keep order
 
 def predict_month_end(expenses, current_balance):
     """
     Predicts total spending by month-end and estimated savings.
+    Accepts the analytics frame or a list of expense dicts.
     """
-    if not expenses:
+    if expenses is None or len(expenses) == 0:
         return 0.0, 0.0
 
-    df = pd.DataFrame(expenses)
-    df['date'] = pd.to_datetime(df['date'])
+    df = as_analytics_frame(expenses)
     
-    current_month = datetime.now().strftime('%Y-%m')
-    df_month = df[df['date'].dt.to_period('M').astype(str) == current_month]
-    
-    spent_so_far = df_month['amount'].sum()
+    current_month = pd.Period(datetime.now(), 'M')
+    spent_so_far = df.loc[df['month'] == current_month, 'amount'].sum()
     
     today = datetime.now().day
     days_in_month = (datetime.now().replace(day=1) + pd.DateOffset(months=1) - pd.DateOffset(days=1)).day
@@ -74,12 +85,13 @@ def predict_month_end(expenses, current_balance):
 def generate_savings_tips(expenses):
     """
     Generates personalized tips based on spending habits.
+    Accepts the analytics frame or a list of expense dicts.
     """
-    if not expenses:
+    if expenses is None or len(expenses) == 0:
         return ["Start adding expenses to get personalized tips!"]
         
-    df = pd.DataFrame(expenses)
-    top_cat = df.groupby('category')['amount'].sum().idxmax()
+    df = as_analytics_frame(expenses)
+    top_cat = df.groupby('category', observed=True)['amount'].sum().idxmax()
     
     tips = []
     tips.append(f"💡 You spend the most on **{top_cat}**. Try to set a budget for this category.")
@@ -91,9 +103,12 @@ def generate_savings_tips(expenses):
         
     return tips
 
+# Days ahead a recurring expense starts showing up as a reminder
+REMINDER_DAYS = 3
+
 def check_recurring_reminders(recurring_expenses):
     """
-    Checks if any recurring expense is due soon (within 3 days).
+    Checks if any recurring expense is due soon (within REMINDER_DAYS days).
     """
     alerts = []
     today = datetime.now().date()
@@ -103,7 +118,7 @@ def check_recurring_reminders(recurring_expenses):
             due_date = datetime.strptime(item['next_due_date'], "%Y-%m-%d").date()
             days_left = (due_date - today).days
             
-            if 0 <= days_left <= 3:
+            if 0 <= days_left <= REMINDER_DAYS:
                 alerts.append(f"📅 Reminder: **{item['description']}** ({item['category']}) of ₹{item['amount']} is due in {days_left} days!")
             elif days_left < 0:
                 alerts.append(f"❗ Overdue: **{item['description']}** was due on {item['next_due_date']}.")
@@ -0,0 +1,61 @@
+import pandas as pd
+
+from database import get_expense_columns_db
+
+# One typed frame per user and rerun, shared by ai_logic and the pages:
+#   date         datetime64, from date_epoch or parsed text (dates that can't be read become NaT)
+#   amount       float64
+#   category     categorical
+#   type         categorical ('expense' / 'income')
+#   month        monthly Period key
+#   day          datetime64 at midnight
+ANALYTICS_COLUMNS = ["id", "date", "amount", "category", "type", "description"]
+
+def build_analytics_frame(rows):
+    """
+    Builds the typed frame from (id, date_epoch, amount, category, type, description) tuples
+    or from expense dicts as returned by get_expenses_db.
+    """
+    if isinstance(rows, pd.DataFrame):
+        df = rows.copy()
+    elif rows and isinstance(rows[0], dict):
+        df = pd.DataFrame(rows)
+    else:
+        df = pd.DataFrame.from_records(rows, columns=ANALYTICS_COLUMNS)
+    for col in ANALYTICS_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+
+    df["amount"] = pd.to_numeric(df["amount"], errors="coerce").astype("float64")
+    if pd.api.types.is_datetime64_any_dtype(df["date"]):
+        pass
+    elif pd.api.types.is_numeric_dtype(df["date"]) or df["date"].isna().all():
+        # date_epoch seconds from get_expense_columns_db: no text parsing at all
+        df["date"] = pd.to_datetime(pd.to_numeric(df["date"]), unit="s")
+    else:
+        text = df["date"]
+        df["date"] = pd.to_datetime(text, format="ISO8601", errors="coerce")
+        # Rows not yet normalized can keep their statement's own format (e.g. 01/25/2025)
+        rest = df["date"].isna() & text.notna()
+        if rest.any():
+            df.loc[rest, "date"] = pd.to_datetime(text[rest], format="mixed", errors="coerce")
+    df["category"] = df["category"].astype("category")
+    df["type"] = df["type"].fillna("expense").astype("category")
+    df["month"] = df["date"].dt.to_period("M")
+    df["day"] = df["date"].dt.normalize()
+    return df
+
+def is_analytics_frame(obj):
+    return isinstance(obj, pd.DataFrame) and "month" in obj.columns and pd.api.types.is_datetime64_any_dtype(obj["date"])
+
+def as_analytics_frame(expenses):
+    """
+    Returns `expenses` unchanged if it already is an analytics frame, otherwise builds one.
+    """
+    return expenses if is_analytics_frame(expenses) else build_analytics_frame(expenses)
+
+def load_analytics_frame(user_id, types=None):
+    """
+    Loads one user's transactions straight into the typed frame (no per-row dicts).
+    """
+    return build_analytics_frame(get_expense_columns_db(user_id, types))
@@ -0,0 +1,10 @@
+import bcrypt
+
+# bcrypt calls run by the auth worker processes (see database._run_auth). Kept out of
+# database.py so a worker only imports bcrypt, not the database layer or its dependencies.
+
+def hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds))
+
+def check_password(password, stored_hash):
+    return bcrypt.checkpw(password.encode('utf-8'), stored_hash)
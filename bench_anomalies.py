@@ -0,0 +1,58 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from ai_logic import detect_anomalies
+
+SIZES = [10_000, 100_000, 1_000_000]
+CATEGORIES = ["Food", "Transport", "Utilities", "Entertainment", "Shopping", "Health", "Education", "Rent", "Other"]
+
+def make_expenses(n, seed=0):
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(0, 3 * 365 * 86400, n)
+    dates = (np.datetime64("2023-01-01") + seconds.astype("timedelta64[s]")).astype(str)
+    return [
+        {"amount": float(a), "category": c, "description": f"Item {i}", "date": d.replace("T", " ")}
+        for i, (a, c, d) in enumerate(zip(rng.gamma(2.0, 150.0, n).round(2), rng.choice(CATEGORIES, n), dates))
+    ]
+
+# The previous implementation, kept here for comparison.
+def old_detect_anomalies(expenses):
+    df = pd.DataFrame(expenses)
+    alerts = []
+    category_stats = df.groupby('category')['amount'].median().reset_index()
+    category_stats.rename(columns={'amount': 'median'}, inplace=True)
+    df['date'] = pd.to_datetime(df['date'], format='mixed')
+    recent = df.sort_values('date', ascending=False).head(5)
+    for _, row in recent.iterrows():
+        median = category_stats[category_stats['category'] == row['category']]['median'].values[0]
+        if row['amount'] > max(3 * median, 100):
+            alerts.append(f"⚠️ Unusual Spend: ₹{row['amount']:,.2f} on {row['category']} ({row['description']}) is unusually high (Median: ₹{median:,.0f}).")
+    return list(set(alerts))
+
+def best_ms(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def run():
+    print("--- detect_anomalies (ms, best of 3) ---")
+    print(f"{'rows':>10}{'old (w=5)':>12}{'new (w=5)':>12}{'new (w=1000)':>14}{'new, frame':>12}")
+    for n in SIZES:
+        expenses = make_expenses(n)
+        frame = pd.DataFrame(expenses)
+        frame['date'] = pd.to_datetime(frame['date'], format='ISO8601')
+        assert set(old_detect_anomalies(expenses)) == set(detect_anomalies(expenses))
+        old = best_ms(lambda: old_detect_anomalies(expenses))
+        new = best_ms(lambda: detect_anomalies(expenses))
+        wide = best_ms(lambda: detect_anomalies(expenses, window=1000))
+        # Callers that already hold a typed frame skip the list->DataFrame build and date parse
+        framed = best_ms(lambda: detect_anomalies(frame))
+        print(f"{n:>10}{old:>12.1f}{new:>12.1f}{wide:>14.1f}{framed:>12.1f}")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import time
+
+import database
+from database import (
+    init_db, set_db_file, close_connections, get_connection,
+    add_expense_batch_db, set_initial_balance_db, archive_and_reset_expenses, undo_last_reset
+)
+
+ROWS = 100_000
+
+# The pre-batch implementation: fetch rows into Python, executemany them back, match undo on archived_at.
+def old_archive_and_reset(user_id, archived_at):
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT amount, category, description, date, transaction_type FROM expenses WHERE user_id = ?", (user_id,))
+        rows = c.fetchall()
+        c.execute("SELECT initial_balance FROM users WHERE id = ?", (user_id,))
+        res = c.fetchone()
+        current_balance = res[0] if res else 0.0
+        c.execute("INSERT INTO archived_balances (user_id, balance, archived_at) VALUES (?, ?, ?)", (user_id, current_balance, archived_at))
+        if rows:
+            archived_data = [(user_id, r[0], r[1], r[2], r[3], r[4], archived_at) for r in rows]
+            c.executemany("INSERT INTO archived_expenses (user_id, amount, category, description, date, transaction_type, archived_at) VALUES (?, ?, ?, ?, ?, ?, ?)", archived_data)
+            c.execute("DELETE FROM expenses WHERE user_id = ?", (user_id,))
+        c.execute("UPDATE users SET initial_balance = 0 WHERE id = ?", (user_id,))
+
+def old_undo(user_id, archived_at):
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT balance FROM archived_balances WHERE user_id = ? AND archived_at = ?", (user_id, archived_at))
+        c.execute("UPDATE users SET initial_balance = ? WHERE id = ?", (c.fetchone()[0], user_id))
+        c.execute("SELECT amount, category, description, date, transaction_type FROM archived_expenses WHERE user_id = ? AND archived_at = ?", (user_id, archived_at))
+        restored = [(user_id, r[0], r[1], r[2], r[3], r[4]) for r in c.fetchall()]
+        c.executemany("INSERT INTO expenses (user_id, amount, category, description, date, transaction_type) VALUES (?, ?, ?, ?, ?, ?)", restored)
+        c.execute("DELETE FROM archived_balances WHERE user_id = ? AND archived_at = ?", (user_id, archived_at))
+        c.execute("DELETE FROM archived_expenses WHERE user_id = ? AND archived_at = ?", (user_id, archived_at))
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    previous = database.DB_FILE
+    set_db_file(os.path.join(tmp_dir, "bench.db"))
+    try:
+        init_db()
+        user_id = 1
+        with get_connection() as conn:
+            conn.execute("INSERT INTO users (id, username, password_hash) VALUES (?, ?, ?)", (user_id, "bench", b"x"))
+        set_initial_balance_db(user_id, 50000.0)
+        add_expense_batch_db([(user_id, float(i % 900), "Food", f"Item {i}", f"2025-{(i % 12) + 1:02d}-{(i % 28) + 1:02d} 12:00:00", "expense") for i in range(ROWS)])
+
+        print(f"--- Reset / undo of {ROWS:,} rows (seconds) ---")
+        print(f"{'':<10}{'row-copy':>10}{'set-based':>11}")
+        old_reset = timed(old_archive_and_reset, user_id, "2025-12-31 00:00:00")
+        old_restore = timed(old_undo, user_id, "2025-12-31 00:00:00")
+        new_reset = timed(archive_and_reset_expenses, user_id)
+        new_restore = timed(undo_last_reset, user_id)
+        print(f"{'reset':<10}{old_reset:>10.2f}{new_reset:>11.2f}")
+        print(f"{'undo':<10}{old_restore:>10.2f}{new_restore:>11.2f}")
+    finally:
+        set_db_file(previous)
+        close_connections()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+from database import init_db, set_db_file, close_connections, create_user, authenticate_user
+
+# Lower than production so the run stays short; the ratio between modes is what matters.
+ROUNDS = int(os.environ.get("BENCH_BCRYPT_ROUNDS", "10"))
+LOGINS = 16
+CONCURRENCY = [1, 2, 4, 8]
+
+def logins_per_sec(concurrency, logins=LOGINS):
+    # Each thread stands in for one Streamlit script thread handling a login
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        results = list(ex.map(lambda i: authenticate_user(f"user{i % 8}", "secret"), range(logins)))
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    return logins / elapsed
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    previous = database.DB_FILE
+    previous_rounds, previous_workers = database.BCRYPT_ROUNDS, database.AUTH_WORKERS
+    set_db_file(os.path.join(tmp_dir, "bench.db"))
+    try:
+        init_db()
+        database.BCRYPT_ROUNDS = ROUNDS
+        for i in range(8):
+            create_user(f"user{i}", "secret")
+
+        print(f"--- Logins/sec (bcrypt cost {ROUNDS}, {os.cpu_count()} CPUs, {LOGINS} logins) ---")
+        print(f"{'concurrency':<14}{'inline':>10}{'pool':>10}")
+        for concurrency in CONCURRENCY:
+            database.AUTH_WORKERS = 0
+            inline = logins_per_sec(concurrency)
+            database.AUTH_WORKERS = previous_workers or 1
+            pooled = logins_per_sec(concurrency)
+            print(f"{concurrency:<14}{inline:>10.1f}{pooled:>10.1f}")
+    finally:
+        database.BCRYPT_ROUNDS, database.AUTH_WORKERS = previous_rounds, previous_workers
+        set_db_file(previous)
+        close_connections()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import time
+
+import database
+import backup
+from database import init_db, set_db_file, close_connections, add_expense_batch_db
+from backup import create_backup
+
+ROWS = 200000
+CHANGES = [10, 1000, 10000]
+
+def timed(fn):
+    start = time.perf_counter()
+    path = fn()
+    return (time.perf_counter() - start) * 1000, os.path.getsize(path)
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    previous = database.DB_FILE
+    previous_dir = backup.BACKUP_DIR
+    backup.BACKUP_DIR = os.path.join(tmp_dir, "backups")
+    set_db_file(os.path.join(tmp_dir, "bench.db"))
+    try:
+        init_db()
+        add_expense_batch_db([(1, float(i % 700), "Food", f"Item {i}", f"2025-01-{(i % 28) + 1:02d} 12:00:00", "expense") for i in range(ROWS)])
+
+        print(f"--- Backup time and size ({ROWS} rows) ---")
+        print(f"{'backup':<26}{'ms':>10}{'KB':>12}")
+        ms, size = timed(lambda: create_backup(keep=100))
+        print(f"{'full':<26}{ms:>10.1f}{size / 1024:>12.1f}")
+        offset = ROWS
+        for changes in CHANGES:
+            add_expense_batch_db([(1, 1.0, "Food", f"New {offset + i}", "2025-02-01 12:00:00", "expense") for i in range(changes)])
+            offset += changes
+            ms, size = timed(lambda: create_backup(keep=100, differential=True))
+            print(f"{f'differential ({changes} rows)':<26}{ms:>10.1f}{size / 1024:>12.1f}")
+    finally:
+        backup.BACKUP_DIR = previous_dir
+        set_db_file(previous)
+        close_connections()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,61 @@
+import os
+import random
+import tempfile
+import time
+
+import database
+from database import init_db, set_db_file, close_connections, create_user, authenticate_user
+from importer import import_statement
+from bulk_import import find_statements, assign_users, run_bulk_import
+from bench_import_stream import write_statement
+
+FILES = 48
+ROWS_PER_FILE = 5_000
+USERS = 4
+
+def run():
+    rng = random.Random(25)
+    tmp_dir = tempfile.mkdtemp()
+    inbox = os.path.join(tmp_dir, "inbox")
+    os.makedirs(inbox)
+    for i in range(FILES):
+        write_statement(os.path.join(inbox, f"statement_{i:03d}.csv"), ROWS_PER_FILE, rng)
+    files = find_statements([inbox])
+    workers = os.cpu_count() or 1
+    print(f"--- {FILES} files x {ROWS_PER_FILE:,} rows for {USERS} users, {workers} CPUs ---")
+
+    previous = database.DB_FILE
+    try:
+        print(f"{'':<34}{'seconds':>9}{'rows/sec':>12}")
+        # Fresh database per run, so every run inserts every row. One file at a time only reads
+        # stored models (training is an offline job); the bulk job trains due models once up front
+        for label, job in [("one file at a time (Data page)", None), ("bulk, in-process", 0), (f"bulk, {workers} workers", workers)]:
+            set_db_file(os.path.join(tmp_dir, f"bench_{job}.db"))
+            init_db()
+            names = [f"user{u}" for u in range(USERS)]
+            for name in names:
+                create_user(name, "pw")
+            mapping = [(os.path.basename(f), names[i % USERS]) for i, f in enumerate(files)]
+
+            start = time.perf_counter()
+            if job is None:
+                user_ids = {name: authenticate_user(name, "pw") for name in names}
+                reports = [import_statement(f, user_ids[user]) for f, (_, user) in zip(files, mapping)]
+            else:
+                assignments, _ = assign_users(files, mapping=mapping)
+                reports, _ = run_bulk_import(assignments, workers=job)
+                assert not any(r["error"] for r in reports)
+                parse_s = sum(r["parse_seconds"] for r in reports)
+                write_s = sum(r["write_seconds"] for r in reports)
+            seconds = time.perf_counter() - start
+            assert sum(r["inserted"] for r in reports) == FILES * ROWS_PER_FILE
+            print(f"{label:<34}{seconds:>9.2f}{FILES * ROWS_PER_FILE / seconds:>12,.0f}")
+            close_connections()
+        # The writer is the serial part: parsing scales with workers, writing does not
+        print(f"\nlast run: parse {parse_s:.2f}s summed over workers, write {write_s:.2f}s in the single writer")
+    finally:
+        set_db_file(previous)
+        close_connections()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,49 @@
+import random
+import time
+
+import pandas as pd
+
+from categorizer import CATEGORY_KEYWORDS, categorize, categorize_series
+
+ROWS = 500_000
+
+# The previous matcher: mapping rebuilt per call, nested keyword loops.
+def old_auto_categorize(description):
+    desc = description.lower()
+    mapping = {category: list(keywords) for category, keywords in CATEGORY_KEYWORDS.items()}
+    for category, keywords in mapping.items():
+        for keyword in keywords:
+            if keyword in desc:
+                return category
+    return "Other"
+
+def make_statement(n, seed=1):
+    noise = ["UPI", "NEFT", "POS", "REF", "TXN", "IMPS", "STORE", "PAYMENT", "ACME LTD", "XYZ"]
+    words = [k for keywords in CATEGORY_KEYWORDS.values() for k in keywords] + noise * 4
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(words).upper() if rng.random() < 0.5 else rng.choice(words)
+                     for _ in range(rng.randint(1, 4))) + f"/{rng.randint(100000, 999999)}" for _ in range(n)]
+
+def run():
+    descriptions = make_statement(ROWS)
+    series = pd.Series(descriptions)
+
+    print(f"--- Categorizing a {ROWS:,}-row statement (seconds) ---")
+    start = time.perf_counter()
+    old = [old_auto_categorize(d) for d in descriptions]
+    old_s = time.perf_counter() - start
+    print(f"nested keyword loops, per row: {old_s:.2f}")
+
+    start = time.perf_counter()
+    compiled = [categorize(d) for d in descriptions]
+    print(f"compiled patterns, per row:    {time.perf_counter() - start:.2f}")
+
+    start = time.perf_counter()
+    batch = categorize_series(series)
+    batch_s = time.perf_counter() - start
+    print(f"categorize_series, one call:   {batch_s:.2f} ({ROWS / batch_s:,.0f} rows/sec, {old_s / batch_s:.1f}x)")
+
+    assert old == compiled == batch.tolist()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,81 @@
+import random
+import time
+
+import numpy as np
+
+from categorizer import categorize_series
+from classifier import NaiveBayes, predict_confident
+
+ROWS = 50_000
+MERCHANTS = 1_500
+CATEGORIES = ["Food", "Transport", "Utilities", "Entertainment", "Shopping", "Health", "Education"]
+SYLLABLES = ["ka", "ro", "mi", "zu", "te", "lo", "va", "ne", "shi", "pa", "do", "ri"]
+LABEL_NOISE = 0.05 # Share of training rows the user categorized inconsistently
+INCOME_KEYWORDS = ['salary', 'credit', 'interest', 'refund', 'dividend', 'deposit'] # main.py's old rule
+
+def merchant_name(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).upper()
+
+def make_rows(rng):
+    """
+    Synthetic history: card lines for merchants with a fixed category, plus income lines
+    (payroll and transfers in) that the income keywords only partly cover.
+    """
+    merchants = {merchant_name(rng): rng.choice(CATEGORIES) for _ in range(MERCHANTS)}
+    names = list(merchants)
+    employers = [merchant_name(rng) + " LTD" for _ in range(20)]
+    rows = []
+    for _ in range(ROWS):
+        roll = rng.random()
+        if roll < 0.08:
+            rows.append((f"NEFT CR {rng.choice(employers)} PAYROLL {rng.randint(1, 12):02d}", "Salary", "income"))
+        elif roll < 0.12:
+            rows.append((f"IMPS IN FROM {merchant_name(rng)} REF{rng.randint(10000, 99999)}", "Other", "income"))
+        else:
+            name = rng.choice(names)
+            prefix = rng.choice(["UPI/", "POS ", "CARD ", ""])
+            rows.append((f"{prefix}{name}*ORDER {rng.randint(1000, 999999)}", merchants[name], "expense"))
+    return rows
+
+def run():
+    rng = random.Random(11)
+    rows = make_rows(rng)
+    split = int(len(rows) * 0.8)
+    train, test = rows[:split], rows[split:]
+    train = [(d, rng.choice(CATEGORIES) if rng.random() < LABEL_NOISE else c, t) for d, c, t in train]
+    # Merchants never seen in training, with names the keyword rules know
+    test += [(f"UPI/{name.upper()}*{rng.randint(1000, 9999)}", category, "expense")
+             for name, category in [("swiggy", "Food"), ("uber", "Transport"), ("netflix", "Entertainment")] for _ in range(300)]
+    descs = np.array([r[0] for r in test], dtype=object)
+    true_cat = np.array([r[1] for r in test])
+    true_type = np.array([r[2] for r in test])
+    print(f"--- {len(train):,} training rows, {len(test):,} test rows, {MERCHANTS:,} merchants ---")
+
+    # 1. Training
+    start = time.perf_counter()
+    models = {target: NaiveBayes.fit([r[0] for r in train], [r[i] for r in train]) for i, target in ((1, "category"), (2, "type"))}
+    train_s = time.perf_counter() - start
+    blob = sum(len(m.to_bytes()) for m in models.values())
+
+    # 2. Baselines: keyword rules and the income keyword heuristic
+    rules_cat = categorize_series(descs).to_numpy()
+    rules_type = np.array(["income" if any(k in d.lower() for k in INCOME_KEYWORDS) else "expense" for d in descs])
+
+    # 3. Models on their own, then as used on import (confident predictions, rules for the rest)
+    start = time.perf_counter()
+    model_cat, cat_conf = models["category"].predict(descs)
+    model_type, _ = models["type"].predict(descs)
+    predict_s = time.perf_counter() - start
+    confident_cat = predict_confident(models["category"], descs)
+    combined_cat = confident_cat.fillna(dict(enumerate(rules_cat))).to_numpy()
+    combined_type = predict_confident(models["type"], descs).fillna(dict(enumerate(rules_type))).to_numpy()
+
+    print(f"{'':<32}{'category acc.':>15}{'type acc.':>11}")
+    print(f"{'rules (auto_categorize/keywords)':<32}{(rules_cat == true_cat).mean():>15.1%}{(rules_type == true_type).mean():>11.1%}")
+    print(f"{'naive Bayes, every row':<32}{(model_cat == true_cat).mean():>15.1%}{(model_type == true_type).mean():>11.1%}")
+    print(f"{'naive Bayes if confident, rules':<32}{(combined_cat == true_cat).mean():>15.1%}{(combined_type == true_type).mean():>11.1%}")
+    print(f"\ntrain {train_s:.2f}s ({blob / 1024:.0f} KiB stored), predict both targets {predict_s:.2f}s "
+          f"= {predict_s / len(test) * 1e6:.1f}us per row, {confident_cat.notna().mean():.1%} of categories confident")
+
+if __name__ == "__main__":
+    run()
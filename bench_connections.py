@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import tempfile
+import time
+
+import database
+from database import (
+    init_db, set_db_file, close_connections,
+    add_expense_batch_db, get_expenses_db, get_initial_balance_db, validate_session
+)
+
+CALLS = 2000
+
+def seed(user_id=1, rows=500):
+    with database.get_connection() as conn:
+        conn.execute("INSERT INTO users (id, username, password_hash) VALUES (?, ?, ?)", (user_id, "bench", b"x"))
+    batch = [(user_id, float(i % 700), "Food", f"Item {i}", f"2025-01-{(i % 28) + 1:02d} 12:00:00", "expense") for i in range(rows)]
+    add_expense_batch_db(batch)
+
+def per_call_us(fn, calls=CALLS):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+# The pre-pool pattern: open, query, close on every call.
+def old_initial_balance(user_id):
+    conn = sqlite3.connect(database.DB_FILE)
+    c = conn.cursor()
+    c.execute("SELECT initial_balance FROM users WHERE id = ?", (user_id,))
+    res = c.fetchone()
+    conn.close()
+    return res[0] if res and res[0] is not None else 0.0
+
+def old_expenses(user_id):
+    conn = sqlite3.connect(database.DB_FILE)
+    c = conn.cursor()
+    c.execute("SELECT amount, category, description, date, id, transaction_type FROM expenses WHERE user_id = ? ORDER BY date DESC", (user_id,))
+    rows = c.fetchall()
+    conn.close()
+    return [{"amount": r[0], "category": r[1], "description": r[2], "date": r[3], "id": r[4], "type": r[5] or 'expense'} for r in rows]
+
+def old_validate_session(session_id):
+    conn = sqlite3.connect(database.DB_FILE)
+    c = conn.cursor()
+    c.execute("SELECT s.user_id, u.username FROM sessions s JOIN users u ON s.user_id = u.id WHERE s.session_id = ?", (session_id,))
+    res = c.fetchone()
+    conn.close()
+    return res
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    previous = database.DB_FILE
+    set_db_file(os.path.join(tmp_dir, "bench.db"))
+    try:
+        init_db()
+        with database.get_connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, user_id INTEGER, created_at TEXT)")
+        seed()
+
+        print(f"--- Per-call latency ({CALLS} calls, microseconds) ---")
+        print(f"{'call':<28}{'connect-per-call':>18}{'pooled':>12}")
+        cases = [
+            ("get_initial_balance_db", lambda: old_initial_balance(1), lambda: get_initial_balance_db(1)),
+            ("get_expenses_db (500 rows)", lambda: old_expenses(1), lambda: get_expenses_db(1)),
+            ("validate_session (miss)", lambda: old_validate_session("missing"), lambda: validate_session("missing")),
+        ]
+        for name, old_fn, new_fn in cases:
+            old_us = per_call_us(old_fn)
+            new_us = per_call_us(new_fn)
+            print(f"{name:<28}{old_us:>18.1f}{new_us:>12.1f}")
+    finally:
+        set_db_file(previous)
+        close_connections()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,83 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import database
+from database import init_db, set_db_file, close_connections, get_connection
+from dates import normalize_dates
+
+ROWS = 200_000
+FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%m/%d/%Y", "%d %b %Y"]
+
+# The read-side fallback chain every page used to repeat on mixed-format dates.
+def old_parse(value):
+    for fmt in FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+def make_dates(n, seed=7):
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    return [(start + timedelta(minutes=rng.randrange(3_000_000))).strftime(rng.choice(FORMATS)) for _ in range(n)]
+
+def run():
+    values = make_dates(ROWS)
+
+    print(f"--- Normalizing {ROWS:,} mixed-format dates (seconds) ---")
+    start = time.perf_counter()
+    [old_parse(v) for v in values]
+    print(f"per-row strptime fallbacks: {time.perf_counter() - start:.2f}")
+    start = time.perf_counter()
+    normalize_dates(values)
+    print(f"normalize_dates:            {time.perf_counter() - start:.2f}")
+
+    tmp_dir = tempfile.mkdtemp()
+    previous = database.DB_FILE
+    path = os.path.join(tmp_dir, "bench.db")
+    try:
+        # Legacy database with mixed-format text dates, migrated once
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, password_hash BLOB NOT NULL, currency TEXT DEFAULT '₹', initial_balance REAL DEFAULT 0.0, created_at TEXT)")
+        conn.execute("CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, amount REAL, category TEXT, description TEXT, date TEXT)")
+        conn.executemany("INSERT INTO expenses (user_id, amount, category, description, date) VALUES (?, 10.0, 'Food', 'x', ?)",
+                         [(i % 20 + 1, v) for i, v in enumerate(values)])
+        conn.commit()
+        conn.close()
+
+        set_db_file(path)
+        start = time.perf_counter()
+        init_db()
+        print(f"\none-time migration of {ROWS:,} rows: {time.perf_counter() - start:.2f}s")
+
+        print("\n--- Per-user reads (milliseconds) ---")
+        with get_connection() as conn:
+            start = time.perf_counter()
+            text = conn.execute("SELECT date FROM expenses WHERE user_id = 1").fetchall()
+            pd.to_datetime(pd.Series([r[0] for r in text]), format="ISO8601")
+            text_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            epochs = conn.execute("SELECT date_epoch FROM expenses WHERE user_id = 1").fetchall()
+            pd.to_datetime(pd.Series([r[0] for r in epochs]), unit="s")
+            epoch_ms = (time.perf_counter() - start) * 1000
+            print(f"datetime column from text:  {text_ms:.1f}")
+            print(f"datetime column from epoch: {epoch_ms:.1f}")
+
+            lo, hi = int(datetime(2023, 1, 1).timestamp()), int(datetime(2023, 2, 1).timestamp())
+            start = time.perf_counter()
+            for _ in range(1000):
+                conn.execute("SELECT COUNT(*) FROM expenses WHERE user_id = 1 AND date_epoch >= ? AND date_epoch < ?", (lo, hi)).fetchone()
+            print(f"epoch range count (indexed): {(time.perf_counter() - start):.3f} per 1000")
+    finally:
+        set_db_file(previous)
+        close_connections()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,69 @@
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from importer import classify_transactions, INCOME_KEYWORDS
+
+SIZES = [10_000, 100_000, 1_000_000]
+DESCRIPTIONS = ["Salary October", "Uber Trip", "Swiggy Order", "Refund Amazon", "Interest Credit", "NEFT Transfer",
+                "Netflix", "Rent Payment", "Dividend ITC", "Cafe Coffee Day", "ATM Withdrawal"]
+TYPES = ["Credit", "Debit", "Cr", "Dr", None, ""]
+
+# The Confirm Import loop as main.py ran it, one row at a time.
+def old_classify(desc, amt, cat, model_type, type_value):
+    if amt > 0:
+        tx_type = 'income' if cat == 'Salary' else 'expense'
+    else:
+        tx_type = 'expense'
+        amt = abs(amt)
+    if model_type is not None:
+        tx_type = model_type
+    elif any(k in desc.lower() for k in INCOME_KEYWORDS):
+        tx_type = 'income'
+        amt = abs(amt)
+    if type_value is not None and pd.notna(type_value):
+        t = str(type_value).lower()
+        if 'credit' in t or 'cr' in t or 'income' in t: tx_type = 'income'
+        elif 'debit' in t or 'dr' in t or 'expense' in t: tx_type = 'expense'
+    return tx_type, amt
+
+def make_frame(rows, rng):
+    return pd.DataFrame({
+        "description": [f"{rng.choice(DESCRIPTIONS)} {rng.randint(1000, 99999)}" for _ in range(rows)],
+        "amount": [rng.uniform(-5000, 5000) for _ in range(rows)],
+        "category": [rng.choice(["Salary", "Food", "Other"]) for _ in range(rows)],
+        # Object dtype keeps None (no confident prediction), as predict_confident returns it
+        "model_type": pd.Series([rng.choice([None, None, "income", "expense"]) for _ in range(rows)], dtype=object),
+        "type": pd.array([rng.choice(TYPES) for _ in range(rows)], dtype=str),
+    })
+
+def run():
+    rng = random.Random(24)
+    print(f"{'rows':>10}{'iterrows s':>12}{'zip loop s':>12}{'vectorized s':>14}{'rows/s':>14}{'speedup':>9}")
+    for rows in SIZES:
+        df = make_frame(rows, rng)
+
+        # iterrows as the Data page did it; skipped on the largest size, where it takes minutes
+        iterrows_s = float("nan")
+        if rows <= 100_000:
+            start = time.perf_counter()
+            for _, row in df.iterrows():
+                old_classify(str(row['description']), float(row['amount']), row['category'], row['model_type'], row['type'])
+            iterrows_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = [old_classify(*r) for r in zip(df['description'], df['amount'], df['category'], df['model_type'], df['type'])]
+        loop_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        types, amounts = classify_transactions(df['description'], df['amount'], df['category'], df['model_type'], df['type'])
+        vector_s = time.perf_counter() - start
+
+        assert types.tolist() == [t for t, _ in expected]
+        assert np.array_equal(amounts.to_numpy(), np.array([a for _, a in expected]))
+        print(f"{rows:>10,}{iterrows_s:>12.2f}{loop_s:>12.2f}{vector_s:>14.3f}{rows / vector_s:>14,.0f}{loop_s / vector_s:>8.1f}x")
+
+if __name__ == "__main__":
+    run()
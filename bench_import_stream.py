@@ -0,0 +1,83 @@
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import database
+from database import init_db, set_db_file, close_connections, add_expense_batch_db, start_import_batch_db, get_user_summary_db
+from ui_utils import parse_bank_statement
+from merchant_memory import categorize_with_memory
+from importer import import_statement, INCOME_KEYWORDS
+
+SIZES = [10_000, 40_000, 160_000]
+MERCHANTS = ["Swiggy Order", "Uber Trip", "Amazon Shopping", "Netflix", "Tata Power Bill", "Apollo Pharmacy",
+             "Kirana Store", "Salary Credit", "Interest Credit", "Refund Flipkart", "Cafe Coffee Day"]
+
+def write_statement(path, rows, rng):
+    with open(path, "w") as f:
+        f.write("Txn Date,Narration,Amount,Cr/Dr\n")
+        for i in range(rows):
+            merchant = rng.choice(MERCHANTS)
+            credit = "Credit" in merchant or "Salary" in merchant
+            f.write(f"{2015 + i * 10 // rows}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d},"
+                    f"{merchant} REF{rng.randint(100000, 999999)},{rng.uniform(10, 5000):.2f},{'Cr' if credit else 'Dr'}\n")
+
+# The previous Data page path: whole file in one frame, iterrows into a list, one insert call.
+def old_import(path, user_id):
+    df = parse_bank_statement(path)
+    categories, _ = categorize_with_memory(df['description'], user_id)
+    batch = []
+    for (_, row), cat in zip(df.iterrows(), categories):
+        desc = str(row.get('description', ''))
+        amt = float(row.get('amount', 0))
+        tx_type = 'income' if amt > 0 and cat == 'Salary' else 'expense'
+        amt = abs(amt)
+        if any(k in desc.lower() for k in INCOME_KEYWORDS):
+            tx_type = 'income'
+        if 'type' in row and pd.notna(row['type']):
+            t = str(row['type']).lower()
+            if 'credit' in t or 'cr' in t or 'income' in t: tx_type = 'income'
+            elif 'debit' in t or 'dr' in t or 'expense' in t: tx_type = 'expense'
+        batch.append((user_id, amt, cat, desc, str(row.get('date')), tx_type))
+    return add_expense_batch_db(batch, import_batch_id=start_import_batch_db(user_id, os.path.basename(path)))
+
+def measure(fn):
+    """Seconds from an untraced run, then peak traced memory from a second run (tracemalloc slows everything down)."""
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return seconds, peak
+
+def run():
+    rng = random.Random(3)
+    tmp_dir = tempfile.mkdtemp()
+    previous = database.DB_FILE
+    try:
+        print(f"{'rows':>9}{'file MB':>9}{'old s':>8}{'old peak MB':>13}{'stream s':>10}{'stream peak MB':>16}")
+        for rows in SIZES:
+            path = os.path.join(tmp_dir, f"statement_{rows}.csv")
+            write_statement(path, rows, rng)
+            set_db_file(os.path.join(tmp_dir, f"bench_{rows}.db"))
+            init_db()
+
+            # Each run imports into a fresh user, so nothing is skipped as already imported
+            users = iter(range(1, 5))
+            old_s, old_peak = measure(lambda: old_import(path, next(users)))
+            new_s, new_peak = measure(lambda: import_statement(path, next(users)))
+            assert all(get_user_summary_db(user_id)["tx_count"] == rows for user_id in range(1, 5))
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            print(f"{rows:>9,}{size_mb:>9.1f}{old_s:>8.2f}{old_peak:>13.1f}{new_s:>10.2f}{new_peak:>16.1f}")
+            close_connections()
+    finally:
+        set_db_file(previous)
+        close_connections()
+
+if __name__ == "__main__":
+    run()
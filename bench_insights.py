@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+import database
+from database import init_db, set_db_file, close_connections, get_connection, add_expense_batch_db
+from insights import run_insights_job
+
+USERS = 500
+ROWS_PER_USER = 200
+WORKERS = [0, 1, 2, 4]
+
+def seed():
+    with get_connection() as conn:
+        conn.executemany("INSERT INTO users (id, username, password_hash) VALUES (?, ?, ?)",
+                         [(u, f"user{u}", b"x") for u in range(1, USERS + 1)])
+    add_expense_batch_db([(u, float((u * 7 + i) % 900), "Food" if i % 3 else "Transport", f"Item {i}",
+                           f"2025-{(i % 12) + 1:02d}-{(i % 28) + 1:02d} 12:00:00", "expense")
+                          for u in range(1, USERS + 1) for i in range(ROWS_PER_USER)])
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    previous = database.DB_FILE
+    set_db_file(os.path.join(tmp_dir, "bench.db"))
+    try:
+        init_db()
+        seed()
+        print(f"--- Insights job ({USERS} users x {ROWS_PER_USER} rows, {os.cpu_count()} CPUs) ---")
+        print(f"{'workers':<10}{'seconds':>10}{'users/sec':>12}")
+        for workers in WORKERS:
+            users, seconds = run_insights_job(workers)
+            print(f"{workers:<10}{seconds:>10.2f}{users / seconds:>12.1f}")
+    finally:
+        set_db_file(previous)
+        close_connections()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,77 @@
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+import database
+from database import init_db, set_db_file, close_connections, get_connection, create_user, authenticate_user
+from categorizer import categorize, categorize_series, merchant_key, DEFAULT_CATEGORY
+from merchant_memory import categorize_with_memory, load_merchant_index
+
+ROWS = 200_000
+MERCHANTS = 2_000
+KNOWN_SHARE = 0.7 # Share of statement rows from merchants the user has categorized before
+CATEGORIES = ["Food", "Transport", "Utilities", "Entertainment", "Shopping", "Health", "Education"]
+SYLLABLES = ["ka", "ro", "mi", "zu", "te", "lo", "va", "ne", "shi", "pa", "do", "ri"]
+
+def merchant_name(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).upper()
+
+def statement_line(rng, name):
+    prefix = rng.choice(["UPI/", "POS ", "NEFT-", ""])
+    return f"{prefix}{name}*ORDER {rng.randint(1000, 999999)}"
+
+def run():
+    rng = random.Random(5)
+    known = {merchant_name(rng): rng.choice(CATEGORIES) for _ in range(MERCHANTS)}
+    unknown = [merchant_name(rng) + "X" for _ in range(MERCHANTS)]
+    names = list(known)
+    lines = [statement_line(rng, rng.choice(names) if rng.random() < KNOWN_SHARE else rng.choice(unknown)) for _ in range(ROWS)]
+    truth = [known.get(line.split("*")[0].split("/")[-1].split(" ")[-1].split("-")[-1]) for line in lines]
+
+    tmp_dir = tempfile.mkdtemp()
+    previous = database.DB_FILE
+    set_db_file(os.path.join(tmp_dir, "bench.db"))
+    try:
+        init_db()
+        create_user("bench", "pw")
+        user_id = authenticate_user("bench", "pw")
+        # One past manual categorization per known merchant
+        with get_connection() as conn:
+            database._learn_merchants(conn, [(user_id, statement_line(rng, name), category) for name, category in known.items()])
+
+        series = pd.Series(lines)
+        print(f"--- {ROWS:,}-row import, {MERCHANTS:,} learned merchants, {KNOWN_SHARE:.0%} of rows from them ---")
+
+        start = time.perf_counter()
+        keyword = categorize_series(series)
+        keyword_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = load_merchant_index(user_id)
+        load_ms = (time.perf_counter() - start) * 1000
+        memory, stats = categorize_with_memory(series, index=index)
+
+        start = time.perf_counter()
+        per_row = [index.get(merchant_key(line)) or categorize(line) for line in lines]
+        per_row_s = time.perf_counter() - start
+        assert per_row == memory.tolist()
+
+        def accuracy(predicted):
+            scored = [(p, t) for p, t in zip(predicted, truth) if t is not None]
+            return sum(p == t for p, t in scored) / len(scored)
+
+        print(f"{'':<28}{'seconds':>9}{'known acc.':>12}{'as Other':>10}")
+        print(f"{'keyword rules only':<28}{keyword_s:>9.2f}{accuracy(keyword):>12.1%}{(keyword == DEFAULT_CATEGORY).mean():>10.1%}")
+        print(f"{'memory, per-row lookups':<28}{per_row_s:>9.2f}{accuracy(per_row):>12.1%}{(pd.Series(per_row) == DEFAULT_CATEGORY).mean():>10.1%}")
+        print(f"{'memory, one vectorized join':<28}{stats['seconds']:>9.2f}{accuracy(memory):>12.1%}{(memory == DEFAULT_CATEGORY).mean():>10.1%}")
+        print(f"\nhit rate {stats['hit_rate']:.1%}, index load {load_ms:.1f}ms ({len(index):,} keys), "
+              f"{stats['seconds'] / ROWS * 1e6:.2f}us per row")
+    finally:
+        set_db_file(previous)
+        close_connections()
+
+if __name__ == "__main__":
+    run()
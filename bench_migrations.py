@@ -0,0 +1,75 @@
+import os
+import tempfile
+import time
+
+import database
+from database import (
+    init_db, migrate_db, set_db_file, close_connections,
+    get_recurring_expenses_db, get_investments_db
+)
+
+CALLS = 2000
+
+RECURRING_DDL = '''CREATE TABLE IF NOT EXISTS recurring_expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, amount REAL, category TEXT,
+    description TEXT, frequency TEXT, next_due_date TEXT, FOREIGN KEY(user_id) REFERENCES users(id)
+)'''
+
+INVESTMENTS_DDL = '''CREATE TABLE IF NOT EXISTS investments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, name TEXT, amount REAL, type TEXT,
+    start_date TEXT, frequency TEXT, FOREIGN KEY(user_id) REFERENCES users(id)
+)'''
+
+# The pre-versioning startup: every CREATE IF NOT EXISTS and PRAGMA table_info check, every time.
+def old_startup():
+    with database.get_connection() as conn:
+        c = conn.cursor()
+        for step in (database._migration_base_tables, database._migration_legacy_columns, database._migration_archive_tables):
+            step(c)
+
+# The pre-versioning read path: DDL check before every query.
+def old_get_recurring(user_id):
+    with database.get_connection() as conn:
+        conn.execute(RECURRING_DDL)
+        return conn.execute("SELECT id, amount, category, description, frequency, next_due_date FROM recurring_expenses WHERE user_id = ?", (user_id,)).fetchall()
+
+def old_get_investments(user_id):
+    with database.get_connection() as conn:
+        conn.execute(INVESTMENTS_DDL)
+        return conn.execute("SELECT id, name, amount, type, start_date, frequency FROM investments WHERE user_id = ?", (user_id,)).fetchall()
+
+def per_call_us(fn, calls=CALLS):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    previous = database.DB_FILE
+    set_db_file(os.path.join(tmp_dir, "bench.db"))
+    try:
+        start = time.perf_counter()
+        migrate_db()
+        first_run_ms = (time.perf_counter() - start) * 1000
+
+        print("--- Startup (per process, milliseconds) ---")
+        print(f"first migration of an empty database: {first_run_ms:.2f}")
+        print(f"old startup checks (every start):      {per_call_us(old_startup, 200) / 1000:.3f}")
+        print(f"migrate_db with nothing pending:       {per_call_us(migrate_db, 200) / 1000:.3f}")
+        print(f"init_db after first call (reruns):     {per_call_us(init_db) / 1000:.4f}")
+
+        print(f"\n--- Per-call latency ({CALLS} calls, microseconds) ---")
+        print(f"{'call':<28}{'DDL-per-call':>14}{'migrated':>12}")
+        cases = [
+            ("get_recurring_expenses_db", lambda: old_get_recurring(1), lambda: get_recurring_expenses_db(1)),
+            ("get_investments_db", lambda: old_get_investments(1), lambda: get_investments_db(1)),
+        ]
+        for name, old_fn, new_fn in cases:
+            print(f"{name:<28}{per_call_us(old_fn):>14.1f}{per_call_us(new_fn):>12.1f}")
+    finally:
+        set_db_file(previous)
+        close_connections()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import time
+from datetime import date
+
+import database
+from database import init_db, set_db_file, close_connections, get_connection, materialize_recurring_db
+
+USERS = 5_000
+ITEMS = [(500.0, "Rent", "Flat", "Monthly", "2025-01-31"),
+         (99.0, "Entertainment", "Streaming", "Monthly", "2025-01-05"),
+         (100.0, "Other", "Club", "Weekly", "2025-03-03")]
+TODAY = date(2025, 6, 30)
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    previous = database.DB_FILE
+    set_db_file(os.path.join(tmp_dir, "bench.db"))
+    try:
+        init_db()
+        with get_connection() as conn:
+            conn.executemany("INSERT INTO users (id, username, password_hash) VALUES (?, ?, x'00')",
+                             [(u, f"user{u}") for u in range(1, USERS + 1)])
+            conn.executemany("INSERT INTO recurring_expenses (user_id, amount, category, description, frequency, next_due_date, anchor_date) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [(u, *item, item[-1]) for u in range(1, USERS + 1) for item in ITEMS])
+
+        print(f"--- {USERS:,} users x {len(ITEMS)} recurring items, caught up to {TODAY} ---")
+        start = time.perf_counter()
+        posted = materialize_recurring_db(TODAY)
+        seconds = time.perf_counter() - start
+        print(f"first run:  {posted:,} transactions in {seconds:.2f}s ({posted / seconds:,.0f} rows/sec)")
+
+        start = time.perf_counter()
+        posted = materialize_recurring_db(TODAY)
+        print(f"second run: {posted} transactions in {(time.perf_counter() - start) * 1000:.2f}ms")
+
+        start = time.perf_counter()
+        for u in range(1, 1001):
+            materialize_recurring_db(TODAY, user_id=u)
+        print(f"per-user check on a rerun (nothing due): {(time.perf_counter() - start) / 1000 * 1e6:.0f}us")
+    finally:
+        set_db_file(previous)
+        close_connections()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import database
+from database import (
+    init_db, set_db_file, close_connections, add_expense_batch_db,
+    get_expenses_db, get_expenses_page, get_user_summary_db, get_insights_db
+)
+from analytics import load_analytics_frame
+from ai_logic import predict_month_end, generate_savings_tips
+
+SIZES = [10_000, 100_000]
+
+# The previous per-rerun path: the whole history as dicts, then a DataFrame per ai_logic call.
+def old_predict_month_end(expenses, current_balance):
+    df = pd.DataFrame(expenses)
+    df['date'] = pd.to_datetime(df['date'])
+    current_month = pd.Timestamp.now().strftime('%Y-%m')
+    spent = df[df['date'].dt.to_period('M').astype(str) == current_month]['amount'].sum()
+    return spent, current_balance
+
+def old_generate_savings_tips(expenses):
+    df = pd.DataFrame(expenses)
+    top_cat = df.groupby('category')['amount'].sum().idxmax()
+    freq_cat = df['category'].mode()[0]
+    return [top_cat, freq_cat]
+
+def old_rerun(user_id, stale):
+    expenses = get_expenses_db(user_id)
+    expense_data = [e for e in expenses if e.get('type') == 'expense']
+    if stale:
+        # compute_user_insights loaded the history again
+        expense_data = [e for e in get_expenses_db(user_id) if e.get('type') == 'expense']
+        old_predict_month_end(expense_data, get_user_summary_db(user_id)['current_balance'])
+        old_generate_savings_tips(expense_data)
+    return bool(expense_data)
+
+def new_rerun(user_id, stale):
+    has_expenses = bool(get_expenses_page(user_id, 1, types=['expense'])[0])
+    get_insights_db(user_id)
+    if stale:
+        frame = load_analytics_frame(user_id, types=['expense'])
+        predict_month_end(frame, get_user_summary_db(user_id)['current_balance'])
+        generate_savings_tips(frame)
+    return has_expenses
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return elapsed, peak
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    previous = database.DB_FILE
+    set_db_file(os.path.join(tmp_dir, "bench.db"))
+    try:
+        init_db()
+        print("--- Analytics work per rerun (ms / peak MB) ---")
+        print(f"{'rows':>8}  {'insights':<9}{'before':>18}{'after':>18}")
+        for user_id, n in enumerate(SIZES, start=1):
+            add_expense_batch_db([(user_id, float(i % 900), ("Food", "Transport", "Rent", "Shopping")[i % 4], f"Item {i}",
+                                   f"2025-{(i % 12) + 1:02d}-{(i % 28) + 1:02d} 12:00:00", "expense" if i % 10 else "income")
+                                  for i in range(n)])
+            for stale in (False, True):
+                old_ms, old_mb = measure(lambda: old_rerun(user_id, stale))
+                new_ms, new_mb = measure(lambda: new_rerun(user_id, stale))
+                label = "stale" if stale else "fresh"
+                print(f"{n:>8}  {label:<9}{old_ms:>10.1f} / {old_mb:>5.1f}{new_ms:>10.1f} / {new_mb:>5.1f}")
+    finally:
+        set_db_file(previous)
+        close_connections()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,213 @@
+import argparse
+import csv
+import fnmatch
+import glob
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+
+import database
+from database import (
+    prepare_expense_rows, insert_expense_rows_db, start_import_batch_db, rollback_import, resolve_user_db,
+    DuplicateCounter, IMPORT_CHUNK_SIZE
+)
+from merchant_memory import load_merchant_index
+from classifier import NaiveBayes, load_user_models
+from importer import read_statement_chunks, classify_chunk
+
+# Headless ingest of many statement files. Worker processes parse, classify and hash whole
+# files with the Data page's column detection and rules; this process is the only writer and
+# inserts each file as its own import batch, so any file can be rolled back on its own.
+
+# Parsed files allowed to wait for the writer, per worker
+FILES_IN_FLIGHT = 2
+
+REPORT_FIELDS = ["file", "user_id", "rows", "inserted", "skipped", "parse_seconds", "write_seconds", "import_batch_id", "error"]
+
+def find_statements(paths):
+    """
+    Statement files for a list of directories (every *.csv in them), glob patterns and file paths.
+    Returns sorted paths without duplicates.
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            files.update(glob.glob(os.path.join(path, "*.csv")))
+        else:
+            files.update(p for p in glob.glob(path, recursive=True) if os.path.isfile(p))
+    return sorted(files)
+
+def load_mapping(path):
+    """
+    Reads a file-to-user mapping CSV with 'file' and 'user' columns. file is a name, a path or a
+    glob pattern; user is a username or id. Returns [(pattern, user)] in file order.
+    """
+    with open(path, newline="") as f:
+        return [(row["file"].strip(), row["user"].strip()) for row in csv.DictReader(f) if row.get("file")]
+
+def assign_users(files, user=None, mapping=None):
+    """
+    Pairs each file with a user id: the first mapping entry matching its path or name, else `user`.
+    Returns (assignments [(file, user_id)], failures {file: reason}).
+    """
+    resolved = {}
+    def user_id(name):
+        if name not in resolved:
+            resolved[name] = resolve_user_db(name)
+        return resolved[name]
+
+    assignments, failures = [], {}
+    for path in files:
+        owner = next((u for pattern, u in mapping or [] if fnmatch.fnmatch(path, pattern)
+                      or fnmatch.fnmatch(os.path.basename(path), pattern)), user)
+        if owner is None:
+            failures[path] = "No user mapped to this file"
+        elif user_id(owner) is None:
+            failures[path] = f"Unknown user {owner!r}"
+        else:
+            assignments.append((path, user_id(owner)))
+    return assignments, failures
+
+# --- Workers ---
+
+_CONTEXTS = {}
+
+def _init_worker(contexts):
+    # Models are rebuilt once per worker rather than sent with every file
+    global _CONTEXTS
+    _CONTEXTS = {user_id: (index, {target: NaiveBayes.from_bytes(blob) for target, blob in blobs.items()})
+                 for user_id, (index, blobs) in contexts.items()}
+
+def parse_statement(path, user_id, dayfirst=False, chunksize=IMPORT_CHUNK_SIZE):
+    """
+    Reads, classifies and prepares (dates, content hashes) one statement for the user, a chunk
+    at a time. Runs in a worker. Returns (rows for insert_expense_rows_db, seconds).
+    """
+    start = time.perf_counter()
+    index, models = _CONTEXTS[user_id]
+    seen = DuplicateCounter()
+    rows = []
+    for chunk in read_statement_chunks(path, chunksize):
+        rows.extend(prepare_expense_rows(classify_chunk(chunk, user_id, index, models)[0], dayfirst, seen))
+    return rows, time.perf_counter() - start
+
+# --- Writer ---
+
+def _write_statement(path, user_id, parse):
+    """
+    Inserts one parsed file as an import batch (rolled back if the write fails) and returns its report row.
+    """
+    report = dict.fromkeys(REPORT_FIELDS, 0)
+    report.update(file=path, user_id=user_id, import_batch_id=None, error=None)
+    try:
+        rows, report["parse_seconds"] = parse()
+        report["rows"] = len(rows)
+        start = time.perf_counter()
+        report["import_batch_id"] = batch_id = start_import_batch_db(user_id, os.path.basename(path))
+        try:
+            report["inserted"], report["skipped"] = insert_expense_rows_db(rows, import_batch_id=batch_id)
+        except Exception:
+            rollback_import(batch_id, user_id)
+            raise
+        report["write_seconds"] = time.perf_counter() - start
+    except Exception as e:
+        report["error"] = f"{type(e).__name__}: {e}"
+    return report
+
+def run_bulk_import(assignments, workers=None, dayfirst=False, on_report=None):
+    """
+    Imports every (file, user_id) pair: files are parsed across a process pool and inserted here,
+    in batched transactions, as they finish. on_report(report) is called after each file.
+    Returns (reports, seconds); a report has the REPORT_FIELDS, with error set if the file failed.
+    """
+    start = time.perf_counter()
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # 1. Each user's learned merchants and models, loaded (and trained if due) once
+    contexts = {}
+    for user_id in sorted({u for _, u in assignments}):
+        models = load_user_models(user_id)
+        contexts[user_id] = (load_merchant_index(user_id), {target: m.to_bytes() for target, m in models.items()})
+
+    reports = []
+    def finish(report):
+        reports.append(report)
+        if on_report:
+            on_report(report)
+
+    # 2. Parse, in-process when workers is 0
+    if workers <= 0:
+        _init_worker(contexts)
+        for path, user_id in assignments:
+            finish(_write_statement(path, user_id, lambda: parse_statement(path, user_id, dayfirst)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(contexts,)) as ex:
+            queue = iter(assignments)
+            pending = {ex.submit(parse_statement, path, user_id, dayfirst): (path, user_id)
+                       for path, user_id in islice(queue, workers * FILES_IN_FLIGHT)}
+            # 3. Write files in the order they finish, keeping the pool busy without piling up parsed rows
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, user_id = pending.pop(future)
+                    for next_path, next_user in islice(queue, 1):
+                        pending[ex.submit(parse_statement, next_path, next_user, dayfirst)] = (next_path, next_user)
+                    finish(_write_statement(path, user_id, future.result))
+
+    return reports, time.perf_counter() - start
+
+def _print_report(report):
+    if report["error"]:
+        print(f"FAIL  {report['file']}: {report['error']}")
+    else:
+        print(f"OK    {report['file']} -> user {report['user_id']}: {report['rows']:,} rows, {report['inserted']:,} new, "
+              f"{report['skipped']:,} skipped (parse {report['parse_seconds']:.2f}s, write {report['write_seconds']:.2f}s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a directory or glob of bank statement CSVs.")
+    parser.add_argument("paths", nargs="+", help="Directories (every *.csv in them), glob patterns or CSV files")
+    parser.add_argument("--user", default=None, help="Username or id to import every file for")
+    parser.add_argument("--mapping", default=None, help="CSV with file,user columns; file may be a name or glob. Falls back to --user")
+    parser.add_argument("--dayfirst", action="store_true", help="Dates are day-first (DD/MM/YYYY)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count, 0 = in-process)")
+    parser.add_argument("--report", default=None, help="Also write the per-file report to this CSV")
+    parser.add_argument("--db", default=None, help="Database file (default: EXPENSES_DB or bank.db)")
+    args = parser.parse_args()
+    if args.user is None and args.mapping is None:
+        parser.error("give --user, --mapping or both")
+
+    if args.db:
+        database.set_db_file(args.db)
+    database.init_db()
+    files = find_statements(args.paths)
+    assignments, failures = assign_users(files, args.user, load_mapping(args.mapping) if args.mapping else None)
+    workers = (os.cpu_count() or 1) if args.workers is None else args.workers
+
+    unassigned = []
+    for path, reason in failures.items():
+        unassigned.append(dict(dict.fromkeys(REPORT_FIELDS, 0), file=path, user_id=None, import_batch_id=None, error=reason))
+        _print_report(unassigned[-1])
+    reports, seconds = run_bulk_import(assignments, workers, args.dayfirst, on_report=_print_report)
+    reports = unassigned + reports
+
+    if args.report:
+        with open(args.report, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(reports)
+
+    failed = sum(1 for r in reports if r["error"])
+    rows = sum(r["rows"] for r in reports)
+    inserted = sum(r["inserted"] for r in reports)
+    rate = rows / seconds if seconds else 0.0
+    print(f"Imported {inserted:,} new of {rows:,} rows from {len(reports) - failed} of {len(reports)} files "
+          f"in {seconds:.2f}s ({rate:,.0f} rows/sec, {workers} workers), {failed} failed")
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
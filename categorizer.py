@@ -0,0 +1,98 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Keyword rules in priority order: a description gets the first category that has any of
+# its keywords anywhere in the lowercased text, else DEFAULT_CATEGORY.
+CATEGORY_KEYWORDS = {
+    "Food": ["burger", "pizza", "swiggy", "zomato", "restaurant", "cafe", "coffee", "grocery", "mart"],
+    "Transport": ["uber", "ola", "fuel", "petrol", "parking", "train", "bus", "flight", "taxi"],
+    "Utilities": ["electricity", "water", "bill", "recharge", "mobile", "broadband", "gas"],
+    "Entertainment": ["netflix", "prime", "movie", "cinema", "spotify", "game", "steam"],
+    "Shopping": ["amazon", "flipkart", "myntra", "nike", "adidas", "clothes", "mall"],
+    "Health": ["pharmacy", "doctor", "hospital", "med", "clinic"],
+    "Salary": ["salary", "credit", "interest", "refund", "dividend", "bonus"]
+}
+DEFAULT_CATEGORY = "Other"
+
+def compile_rules(rules=CATEGORY_KEYWORDS):
+    """
+    One compiled alternation per category, kept in priority order: [(category, pattern)].
+    """
+    return [(category, re.compile("|".join(re.escape(k.lower()) for k in keywords)))
+            for category, keywords in rules.items() if keywords]
+
+# Compiled once per process
+_RULES = compile_rules()
+
+def categorize(description, rules=None):
+    """
+    Category for one description.
+    """
+    desc = str(description).lower()
+    for category, pattern in rules or _RULES:
+        if pattern.search(desc):
+            return category
+    return DEFAULT_CATEGORY
+
+def lower_series(texts):
+    """
+    str(text).lower() for a whole column (missing values stay missing). The vectorized lowercase
+    maps a few characters differently from Python ('İ' becomes 'i' rather than 'i' plus a dot),
+    so the rare rows with non-ASCII characters are lowered in Python to keep results identical.
+    """
+    text = pd.Series(texts).astype(str)
+    lowered = text.str.lower()
+    special = text.str.contains(r"[^\x00-\x7f]", regex=True, na=False).to_numpy(dtype=bool)
+    if special.any():
+        lowered[special] = [t.lower() for t in text[special]]
+    return lowered
+
+def categorize_series(descriptions, rules=None):
+    """
+    Categorizes a whole column in one call, with the same result as categorize() per row.
+    Each category's pattern is matched against every row in one vectorized pass; np.select
+    then picks the highest-priority match. Returns a Series aligned with the input.
+    """
+    rules = rules or _RULES
+    text = lower_series(descriptions)
+    conditions = [text.str.contains(pattern.pattern, regex=True, na=False).to_numpy(dtype=bool)
+                  for _, pattern in rules]
+    labels = np.select(conditions, [category for category, _ in rules], DEFAULT_CATEGORY)
+    return pd.Series(labels, index=text.index, dtype=object)
+
+# --- Merchant Keys ---
+# A merchant key is the first two meaningful words of a description, so the varying parts of
+# a statement line (order numbers, UPI/NEFT prefixes, references) don't split one merchant:
+# "ZOMATO*ORDER 1234" and "UPI/zomato/998877" both become "zomato".
+
+MERCHANT_NOISE = ["upi", "neft", "imps", "rtgs", "pos", "ach", "ecs", "nach", "atm", "ref", "txn", "txnid",
+                  "payment", "paid", "purchase", "order", "orders", "to", "by", "from", "at", "for", "the",
+                  "www", "com", "in", "co", "pvt", "ltd", "india", "nan", "none"]
+
+_NON_LETTERS = r"[^a-z]+"
+_NOISE_WORDS = r"\b(?:" + "|".join(MERCHANT_NOISE) + r"|[a-z])\b"
+_FIRST_WORDS = r"^\s*([a-z]+(?:\s+[a-z]+)?)"
+
+_NON_LETTERS_RE = re.compile(_NON_LETTERS)
+_NOISE_WORDS_RE = re.compile(_NOISE_WORDS)
+_FIRST_WORDS_RE = re.compile(_FIRST_WORDS)
+
+def merchant_key(description):
+    """
+    Merchant key for one description ('' if nothing meaningful is left).
+    """
+    text = _NOISE_WORDS_RE.sub(" ", _NON_LETTERS_RE.sub(" ", str(description).lower()))
+    match = _FIRST_WORDS_RE.match(text)
+    return " ".join(match.group(1).split()) if match else ""
+
+def merchant_keys(descriptions):
+    """
+    merchant_key for a whole column, vectorized. Returns a Series aligned with the input.
+    """
+    text = (lower_series(descriptions)
+            .str.replace(_NON_LETTERS, " ", regex=True)
+            .str.replace(_NOISE_WORDS, " ", regex=True))
+    keys = text.str.extract(_FIRST_WORDS, expand=False).str.replace(r"\s+", " ", regex=True)
+    return keys.fillna("").astype(object)
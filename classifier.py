@@ -0,0 +1,192 @@
+import argparse
+import io
+import re
+import time
+import zlib
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+import database
+from database import (
+    get_expense_columns_db, get_user_summary_db, get_user_ids_db,
+    get_classifier_model_db, save_classifier_model_db
+)
+
+# Multinomial naive Bayes over hashed text features, NumPy only.
+# Features per description: words, word bigrams and character trigrams of each word,
+# hashed into N_FEATURES buckets with crc32 (stable across processes, unlike hash()).
+# Each user gets one model per target (category, transaction type), trained from their
+# own history and stored in classifier_models.
+
+N_FEATURES = 2 ** 18
+ALPHA = 0.1                 # Additive smoothing
+MIN_TRAINING_ROWS = 30      # Below this a user has no model and imports use the rules
+MIN_CONFIDENCE = 0.8        # Predictions less sure than this fall back to the rules
+RETRAIN_GROWTH = 1.25       # Retrain once the history has grown by a quarter
+TARGETS = ("category", "type")
+
+_WORD = re.compile(r"[a-z]{2,}")
+
+def _features(text):
+    words = _WORD.findall(text.lower())
+    bigrams = [f"{a} {b}" for a, b in zip(words, words[1:])]
+    trigrams = [f"#{w[i:i + 3]}" for w in (f"<{w}>" for w in words) for i in range(len(w) - 2)]
+    return words + bigrams + trigrams
+
+def featurize(descriptions, n_features=N_FEATURES):
+    """
+    Sparse count matrix of the descriptions in CSR form: (indptr, feature ids, counts).
+    Each distinct token is hashed once per call, however many rows contain it.
+    """
+    rows = [_features(str(d)) for d in descriptions]
+    lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+    tokens = list(chain.from_iterable(rows))
+    codes, uniques = pd.factorize(pd.Series(tokens, dtype=object))
+    bucket = np.fromiter((zlib.crc32(t.encode("utf-8")) % n_features for t in uniques), dtype=np.int64, count=len(uniques))
+
+    # Merge repeated features within a row into one (row, feature, count) entry
+    row_ids = np.repeat(np.arange(len(rows), dtype=np.int64), lengths)
+    keys, counts = np.unique(row_ids * n_features + bucket[codes], return_counts=True)
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // n_features, minlength=len(rows)), out=indptr[1:])
+    return indptr, keys % n_features, counts.astype(np.float64)
+
+class NaiveBayes:
+    def __init__(self, classes, class_log_prior, feature_ids, feature_log_prob, unseen_log_prob):
+        self.classes = np.asarray(classes)
+        self.class_log_prior = class_log_prior
+        # Only features seen in training are stored (sorted); any other feature has the
+        # smoothed per-class probability in unseen_log_prob
+        self.feature_ids = feature_ids
+        self.feature_log_prob = feature_log_prob
+        self.unseen_log_prob = unseen_log_prob
+
+    @classmethod
+    def fit(cls, descriptions, labels, alpha=ALPHA, n_features=N_FEATURES):
+        indptr, features, counts = featurize(descriptions, n_features)
+        label_codes, classes = pd.factorize(pd.Series(list(labels), dtype=object))
+        row_class = np.repeat(label_codes, np.diff(indptr))
+
+        # 1. Per-class feature counts over the features that occur at all
+        feature_ids, columns = np.unique(features, return_inverse=True)
+        totals = np.zeros((len(feature_ids), len(classes)))
+        np.add.at(totals, (columns, row_class), counts)
+
+        # 2. Smoothed log probabilities and class priors
+        denominator = np.log(totals.sum(axis=0) + alpha * n_features)
+        return cls(classes.to_numpy(dtype=str),
+                   np.log(np.bincount(label_codes, minlength=len(classes)) / len(label_codes)),
+                   feature_ids,
+                   np.log(totals + alpha) - denominator,
+                   np.log(alpha) - denominator)
+
+    def predict(self, descriptions, n_features=N_FEATURES):
+        """
+        Returns (labels, confidence): the most likely class per description and its posterior.
+        """
+        indptr, features, counts = featurize(descriptions, n_features)
+        n = len(indptr) - 1
+        pos = np.searchsorted(self.feature_ids, features).clip(max=max(len(self.feature_ids) - 1, 0))
+        seen = self.feature_ids[pos] == features if len(self.feature_ids) else np.zeros(len(features), dtype=bool)
+        weights = np.where(seen[:, None], self.feature_log_prob[pos], self.unseen_log_prob) * counts[:, None]
+
+        # Sparse x dense: sum each row's feature weights per class
+        row_ids = np.repeat(np.arange(n), np.diff(indptr))
+        scores = np.column_stack([np.bincount(row_ids, weights=weights[:, c], minlength=n) for c in range(len(self.classes))])
+        scores += self.class_log_prior
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+        return self.classes[best], probs[np.arange(n), best]
+
+    def to_bytes(self):
+        buf = io.BytesIO()
+        np.savez_compressed(buf, classes=self.classes, class_log_prior=self.class_log_prior, feature_ids=self.feature_ids,
+                            feature_log_prob=self.feature_log_prob, unseen_log_prob=self.unseen_log_prob)
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, blob):
+        with np.load(io.BytesIO(blob), allow_pickle=False) as data:
+            return cls(data["classes"], data["class_log_prior"], data["feature_ids"],
+                       data["feature_log_prob"], data["unseen_log_prob"])
+
+# --- Per-user models ---
+
+def train_user_models(user_id):
+    """
+    Trains and stores the user's category and type models from their history.
+    Returns {target: model}, without the targets whose history is too short or has a single class.
+    """
+    rows = get_expense_columns_db(user_id)
+    _, _, _, categories, types, descriptions = zip(*rows) if rows else ((),) * 6
+    models = {}
+    for target, labels in (("category", categories), ("type", types)):
+        labels = ["Other" if label is None else label for label in labels]
+        if len(rows) >= MIN_TRAINING_ROWS and len(set(labels)) >= 2:
+            models[target] = NaiveBayes.fit(descriptions, labels)
+        # A skipped target is stored without a model, so the attempt counts towards RETRAIN_GROWTH
+        save_classifier_model_db(user_id, target, len(rows), models[target].to_bytes() if target in models else b"")
+    return models
+
+def _training_due(user_id, stored):
+    # Never trained, or the history has grown by RETRAIN_GROWTH since the last training
+    tx_count = get_user_summary_db(user_id)["tx_count"]
+    trained_on = max((row_count for row_count, _ in filter(None, stored.values())), default=0)
+    return tx_count >= MIN_TRAINING_ROWS and tx_count >= trained_on * RETRAIN_GROWTH
+
+def load_user_models(user_id, train=True):
+    """
+    The user's stored models, retrained first when training is due (if train is set).
+    Returns {target: model}.
+    """
+    stored = {target: get_classifier_model_db(user_id, target) for target in TARGETS}
+    if train and _training_due(user_id, stored):
+        return train_user_models(user_id)
+    return {target: NaiveBayes.from_bytes(blob) for target, (_, blob) in
+            ((t, s) for t, s in stored.items() if s is not None and s[1])}
+
+def predict_confident(model, descriptions, min_confidence=MIN_CONFIDENCE):
+    """
+    Model labels where the model is at least min_confidence sure, None elsewhere.
+    Returns a Series aligned with the input.
+    """
+    descriptions = pd.Series(descriptions)
+    if model is None or descriptions.empty:
+        return pd.Series([None] * len(descriptions), index=descriptions.index, dtype=object)
+    labels, confidence = model.predict(descriptions)
+    return pd.Series(np.where(confidence >= min_confidence, labels, None), index=descriptions.index, dtype=object)
+
+def run_training_job(user_ids=None, force=False):
+    """
+    Trains the models of every user (or the given ones) whose training is due, or of all of
+    them with force. The Data page import only reads stored models, so run this periodically.
+    Returns (users trained, seconds).
+    """
+    start = time.perf_counter()
+    trained = 0
+    for user_id in get_user_ids_db() if user_ids is None else user_ids:
+        stored = {target: get_classifier_model_db(user_id, target) for target in TARGETS}
+        if force or _training_due(user_id, stored):
+            train_user_models(user_id)
+            trained += 1
+    return trained, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Train per-user transaction classifiers.")
+    parser.add_argument("--db", default=None, help="Database file (default: EXPENSES_DB or bank.db)")
+    parser.add_argument("--user", type=int, default=None, help="Train one user (default: everyone)")
+    parser.add_argument("--force", action="store_true", help="Retrain even if the history hasn't grown enough")
+    args = parser.parse_args()
+
+    if args.db:
+        database.set_db_file(args.db)
+    database.init_db()
+    trained, seconds = run_training_job([args.user] if args.user is not None else None, args.force)
+    print(f"Trained models for {trained} users in {seconds:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+import pytest
+
+import database
+
+@pytest.fixture
+def temp_db(tmp_path):
+    """
+    Points database.py at a fresh database file in the test's tmp_path and back afterwards.
+    Yields the file's path.
+    """
+    previous = database.DB_FILE
+    db_file = str(tmp_path / "test.db")
+    database.set_db_file(db_file)
+    yield db_file
+    database.set_db_file(previous)
@@ -1,14 +1,285 @@
 import sqlite3
-import bcrypt
 import os
-from datetime import datetime
+import re
+import hashlib
+import json
+import threading
+import atexit
+import time
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 
-DB_FILE = "bank.db"
+import numpy as np
 
-def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
+from auth_worker import hash_password, check_password
+from sketches import CategorySketch
+from categorizer import merchant_key, merchant_keys, DEFAULT_CATEGORY
+from dates import normalize_date, normalize_dates, add_period, occurrence_index, FREQUENCIES
+
+# Database location. Override with the EXPENSES_DB environment variable or set_db_file().
+DB_FILE = os.environ.get("EXPENSES_DB", "bank.db")
+
+# --- Connection Management ---
+
+# Applied once to every pooled connection when it is opened.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",      # Readers don't block the writer
+    "PRAGMA synchronous=NORMAL",    # Safe with WAL, avoids an fsync per commit
+    "PRAGMA busy_timeout=5000",     # Wait up to 5s for a lock instead of failing
+    "PRAGMA cache_size=-16000",     # ~16MB page cache
+    "PRAGMA mmap_size=134217728",   # 128MB memory-mapped I/O
+    "PRAGMA temp_store=MEMORY",
+)
+
+POOL_SIZE = 8
+
+class ConnectionPool:
+    """
+    Keeps a small stack of open, pre-configured connections to one database file.
+    Connections are handed to a single thread at a time, so check_same_thread is disabled.
+    """
+    def __init__(self, db_file, size=POOL_SIZE):
+        self.db_file = db_file
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=5.0)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._open()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Database files whose schema has been migrated by this process
+_initialized_files = set()
+_init_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.db_file != DB_FILE:
+            if _pool is not None:
+                _pool.close_all()
+            _pool = ConnectionPool(DB_FILE)
+        return _pool
+
+def set_db_file(path):
+    """
+    Points the module at a different database file and drops any pooled connections.
+    """
+    global DB_FILE
+    DB_FILE = path
+    close_connections()
+    session_cache.clear()
+
+def close_connections():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
+
+@contextmanager
+def get_connection():
+    """
+    Borrows a pooled connection. Commits when the block exits cleanly, rolls back on error.
+    The first borrow per process and file brings the schema up to date (see init_db).
+    """
+    if DB_FILE not in _initialized_files:
+        init_db()
+    with _pooled_connection() as conn:
+        yield conn
+
+@contextmanager
+def _pooled_connection():
+    pool = _get_pool()
+    conn = pool.acquire()
+    try:
+        with conn:
+            yield conn
+    finally:
+        pool.release(conn)
+
+# --- User Summary ---
+# user_summary holds per-user totals and the current balance (initial + income - expenses).
+# The triggers below keep it in step with every write to expenses and users.initial_balance,
+# so add/update/delete, batch imports, reset and undo all maintain it without extra code.
+
+_INCOME = "CASE WHEN {row}.transaction_type = 'income' THEN COALESCE({row}.amount, 0) ELSE 0 END"
+_EXPENSE = "CASE WHEN COALESCE({row}.transaction_type, 'expense') = 'expense' THEN COALESCE({row}.amount, 0) ELSE 0 END"
+_BALANCE = "COALESCE((SELECT initial_balance FROM users WHERE id = user_summary.user_id), 0) + income_total - expense_total"
+
+USER_SUMMARY_TRIGGERS = (
+    f'''CREATE TRIGGER IF NOT EXISTS trg_summary_expense_insert AFTER INSERT ON expenses WHEN NEW.user_id IS NOT NULL
+    BEGIN
+        INSERT OR IGNORE INTO user_summary (user_id) VALUES (NEW.user_id);
+        UPDATE user_summary SET
+            income_total = income_total + {_INCOME.format(row="NEW")},
+            expense_total = expense_total + {_EXPENSE.format(row="NEW")},
+            tx_count = tx_count + 1,
+            first_date = CASE WHEN first_date IS NULL OR NEW.date < first_date THEN NEW.date ELSE first_date END,
+            last_date = CASE WHEN last_date IS NULL OR NEW.date > last_date THEN NEW.date ELSE last_date END
+        WHERE user_id = NEW.user_id;
+        UPDATE user_summary SET current_balance = {_BALANCE} WHERE user_id = NEW.user_id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_summary_expense_delete AFTER DELETE ON expenses
+    BEGIN
+        UPDATE user_summary SET
+            income_total = income_total - {_INCOME.format(row="OLD")},
+            expense_total = expense_total - {_EXPENSE.format(row="OLD")},
+            tx_count = tx_count - 1,
+            first_date = CASE WHEN OLD.date = first_date THEN (SELECT MIN(date) FROM expenses WHERE user_id = OLD.user_id) ELSE first_date END,
+            last_date = CASE WHEN OLD.date = last_date THEN (SELECT MAX(date) FROM expenses WHERE user_id = OLD.user_id) ELSE last_date END
+        WHERE user_id = OLD.user_id;
+        UPDATE user_summary SET current_balance = {_BALANCE} WHERE user_id = OLD.user_id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_summary_expense_update AFTER UPDATE OF user_id, amount, date, transaction_type ON expenses
+    BEGIN
+        UPDATE user_summary SET
+            income_total = income_total - {_INCOME.format(row="OLD")},
+            expense_total = expense_total - {_EXPENSE.format(row="OLD")},
+            tx_count = tx_count - 1
+        WHERE user_id = OLD.user_id;
+        INSERT OR IGNORE INTO user_summary (user_id) SELECT NEW.user_id WHERE NEW.user_id IS NOT NULL;
+        UPDATE user_summary SET
+            income_total = income_total + {_INCOME.format(row="NEW")},
+            expense_total = expense_total + {_EXPENSE.format(row="NEW")},
+            tx_count = tx_count + 1
+        WHERE user_id = NEW.user_id;
+        UPDATE user_summary SET
+            first_date = (SELECT MIN(date) FROM expenses WHERE user_id = user_summary.user_id),
+            last_date = (SELECT MAX(date) FROM expenses WHERE user_id = user_summary.user_id),
+            current_balance = {_BALANCE}
+        WHERE user_id IN (OLD.user_id, NEW.user_id);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_summary_user_insert AFTER INSERT ON users
+    BEGIN
+        INSERT OR IGNORE INTO user_summary (user_id) VALUES (NEW.id);
+        UPDATE user_summary SET current_balance = {_BALANCE} WHERE user_id = NEW.id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_summary_initial_balance AFTER UPDATE OF initial_balance ON users
+    BEGIN
+        INSERT OR IGNORE INTO user_summary (user_id) VALUES (NEW.id);
+        UPDATE user_summary SET current_balance = {_BALANCE} WHERE user_id = NEW.id;
+    END''',
+)
+
+# Recomputes every summary row from scratch (users with or without transactions).
+_SUMMARY_FROM_SOURCE_SQL = '''
+    WITH agg AS (
+        SELECT user_id,
+               SUM(CASE WHEN transaction_type = 'income' THEN COALESCE(amount, 0) ELSE 0 END) AS income_total,
+               SUM(CASE WHEN COALESCE(transaction_type, 'expense') = 'expense' THEN COALESCE(amount, 0) ELSE 0 END) AS expense_total,
+               COUNT(*) AS tx_count, MIN(date) AS first_date, MAX(date) AS last_date
+        FROM expenses WHERE user_id IS NOT NULL GROUP BY user_id
+    ),
+    ids AS (SELECT id AS user_id FROM users UNION SELECT user_id FROM agg)
+    SELECT ids.user_id,
+           COALESCE(agg.income_total, 0), COALESCE(agg.expense_total, 0), COALESCE(agg.tx_count, 0),
+           agg.first_date, agg.last_date,
+           COALESCE(u.initial_balance, 0) + COALESCE(agg.income_total, 0) - COALESCE(agg.expense_total, 0)
+    FROM ids LEFT JOIN agg ON agg.user_id = ids.user_id LEFT JOIN users u ON u.id = ids.user_id
+'''
+
+SUMMARY_COLUMNS = ("income_total", "expense_total", "tx_count", "first_date", "last_date", "current_balance")
+
+def _rebuild_user_summary(c):
+    c.execute("DELETE FROM user_summary")
+    c.execute(f"INSERT INTO user_summary (user_id, {', '.join(SUMMARY_COLUMNS)}) {_SUMMARY_FROM_SOURCE_SQL}")
+
+# --- Category Stats ---
+# category_stats holds a streaming sketch (count, mean, approximate median) of expense amounts
+# per user and category. Inserts update it and flag the new row in expenses.anomaly_median
+# when it is far above the category median seen so far, so alerts need no history scan.
+# Edits and single deletes don't adjust the sketch; reset, undo and import rollback rebuild it.
+
+ANOMALY_MULTIPLIER = 3.0
+ANOMALY_FLOOR = 100.0
+ANOMALY_MIN_HISTORY = 5   # Prior expenses in the category before anything is flagged
+ANOMALY_WINDOW = 5        # Most recent expenses the alert panel looks at
+
+_SKETCHED_ROWS_SQL = "user_id IS NOT NULL AND amount IS NOT NULL AND COALESCE(transaction_type, 'expense') = 'expense'"
+
+def _stream_category_stats(rows, sketches):
+    """
+    Feeds (id, user_id, category, amount) rows through their sketches in order.
+    Returns [(median, id)] for rows flagged as anomalies.
+    """
+    flags = []
+    for expense_id, user_id, category, amount in rows:
+        sketch = sketches.get((user_id, category))
+        if sketch is None:
+            sketch = sketches[(user_id, category)] = CategorySketch()
+        median = sketch.check(amount, ANOMALY_MULTIPLIER, ANOMALY_FLOOR, ANOMALY_MIN_HISTORY)
+        if median is not None:
+            flags.append((median, expense_id))
+        sketch.add(amount)
+    return flags
+
+def _save_category_stats(c, sketches, flags):
+    c.executemany("UPDATE expenses SET anomaly_median = ? WHERE id = ?", flags)
+    c.executemany("INSERT OR REPLACE INTO category_stats (user_id, category, count, mean, median, sketch) VALUES (?, ?, ?, ?, ?, ?)",
+                  [(u, cat, sk.count, sk.mean, sk.median, sk.to_json()) for (u, cat), sk in sketches.items()])
+
+def _update_category_stats(c, rows):
+    """
+    Applies newly inserted expense rows (id, user_id, category, amount) to their sketches.
+    """
+    if not rows:
+        return
+    sketches = {}
+    for key in {(r[1], r[2]) for r in rows}:
+        res = c.execute("SELECT count, mean, sketch FROM category_stats WHERE user_id = ? AND category IS ?", key).fetchone()
+        if res:
+            sketches[key] = CategorySketch.from_json(*res)
+    _save_category_stats(c, sketches, _stream_category_stats(rows, sketches))
+
+def _rebuild_category_stats(c, user_id=None):
+    """
+    Recomputes sketches and anomaly flags by replaying history in date order
+    (one user, or everyone when user_id is None).
+    """
+    where, params = ("user_id = ?", (user_id,)) if user_id is not None else ("1", ())
+    c.execute(f"DELETE FROM category_stats WHERE {where}", params)
+    c.execute(f"UPDATE expenses SET anomaly_median = NULL WHERE anomaly_median IS NOT NULL AND {where}", params)
+    rows = c.execute(f"SELECT id, user_id, category, amount FROM expenses WHERE {where} AND {_SKETCHED_ROWS_SQL} ORDER BY user_id, date, id",
+                     params).fetchall()
+    sketches = {}
+    _save_category_stats(c, sketches, _stream_category_stats(rows, sketches))
+
+# --- Schema Migrations ---
+# Each step runs exactly once per database, in order, and is recorded in schema_version.
+# Steps must tolerate databases created before versioning existed (IF NOT EXISTS / column checks).
+
+def _migration_base_tables(c):
     # Users Table
     c.execute('''CREATE TABLE IF NOT EXISTS users (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -31,19 +302,8 @@ def init_db():
         transaction_type TEXT DEFAULT 'expense',
         FOREIGN KEY(user_id) REFERENCES users(id)
     )''')
-    
-    # ... (Rest of tables) ...
-
-    conn.commit()
-    conn.close()
-    
-    # Run Migration to ensure existing DBs get new columns
-    migrate_db()
 
-def migrate_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
+def _migration_legacy_columns(c):
     # Check expenses table for transaction_type
     c.execute("PRAGMA table_info(expenses)")
     cols = [info[1] for info in c.fetchall()]
@@ -57,8 +317,8 @@ def migrate_db():
     if 'family_id' not in cols:
         print("Migrating: Adding family_id to users...")
         c.execute("ALTER TABLE users ADD COLUMN family_id TEXT")
-        
-    # Ensure archived_expenses table exists
+
+def _migration_archive_tables(c):
     c.execute('''CREATE TABLE IF NOT EXISTS archived_expenses (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         user_id INTEGER,
@@ -71,7 +331,6 @@ def migrate_db():
         FOREIGN KEY(user_id) REFERENCES users(id)
     )''')
     
-    # Ensure archived_balances table exists
     c.execute('''CREATE TABLE IF NOT EXISTS archived_balances (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         user_id INTEGER,
@@ -79,113 +338,724 @@ def migrate_db():
         archived_at TEXT,
         FOREIGN KEY(user_id) REFERENCES users(id)
     )''')
-        
-    conn.commit()
-    conn.close()
+
+def _migration_feature_tables(c):
+    # Previously created lazily inside the session / recurring / investment functions
+    c.execute('''CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        user_id INTEGER,
+        created_at TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )''')
+    
+    c.execute('''CREATE TABLE IF NOT EXISTS recurring_expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        amount REAL,
+        category TEXT,
+        description TEXT,
+        frequency TEXT,
+        next_due_date TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )''')
+    
+    c.execute('''CREATE TABLE IF NOT EXISTS investments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        name TEXT,
+        amount REAL,
+        type TEXT,
+        start_date TEXT,
+        frequency TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )''')
+
+def _migration_hot_path_indexes(c):
+    # History / dashboard reads: WHERE user_id = ? ORDER BY date DESC, and per-user deletes on reset
+    c.execute("CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses(user_id, date)")
+    # Reset / undo lookups by user and archive timestamp
+    c.execute("CREATE INDEX IF NOT EXISTS idx_archived_expenses_user_archived ON archived_expenses(user_id, archived_at, date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_archived_balances_user_archived ON archived_balances(user_id, archived_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_recurring_user_due ON recurring_expenses(user_id, next_due_date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_investments_user ON investments(user_id)")
+
+def _migration_user_summary(c):
+    # One row per user, kept current by triggers so balance reads are a primary-key lookup
+    c.execute('''CREATE TABLE IF NOT EXISTS user_summary (
+        user_id INTEGER PRIMARY KEY,
+        income_total REAL NOT NULL DEFAULT 0,
+        expense_total REAL NOT NULL DEFAULT 0,
+        tx_count INTEGER NOT NULL DEFAULT 0,
+        first_date TEXT,
+        last_date TEXT,
+        current_balance REAL NOT NULL DEFAULT 0
+    )''')
+    for trigger in USER_SUMMARY_TRIGGERS:
+        c.execute(trigger)
+    _rebuild_user_summary(c)
+
+def _migration_archive_batches(c):
+    # Resets are grouped under an integer batch id instead of an archived_at string,
+    # so two resets in the same second no longer collide on undo.
+    # archived_balances is superseded by archive_batches.balance and kept only for old data.
+    c.execute('''CREATE TABLE IF NOT EXISTS archive_batches (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        balance REAL,
+        archived_at TEXT,
+        row_count INTEGER DEFAULT 0,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_archive_batches_user ON archive_batches(user_id)")
+    
+    c.execute("PRAGMA table_info(archived_expenses)")
+    cols = [info[1] for info in c.fetchall()]
+    if 'batch_id' not in cols:
+        c.execute("ALTER TABLE archived_expenses ADD COLUMN batch_id INTEGER REFERENCES archive_batches(id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_archived_expenses_batch ON archived_expenses(batch_id)")
+    
+    # Backfill: one batch per existing (user_id, archived_at) reset, oldest first so ids follow time
+    c.execute('''INSERT INTO archive_batches (user_id, balance, archived_at)
+                 SELECT user_id, balance, archived_at FROM (
+                     SELECT user_id, balance, archived_at, id AS ord FROM archived_balances
+                     UNION ALL
+                     SELECT DISTINCT user_id, NULL, archived_at, 0 FROM archived_expenses a
+                     WHERE NOT EXISTS (SELECT 1 FROM archived_balances b WHERE b.user_id = a.user_id AND b.archived_at = a.archived_at)
+                 ) ORDER BY archived_at, ord''')
+    c.execute('''UPDATE archived_expenses SET batch_id = (
+                     SELECT MAX(b.id) FROM archive_batches b
+                     WHERE b.user_id = archived_expenses.user_id AND b.archived_at = archived_expenses.archived_at)
+                 WHERE batch_id IS NULL''')
+    c.execute("UPDATE archive_batches SET row_count = (SELECT COUNT(*) FROM archived_expenses a WHERE a.batch_id = archive_batches.id)")
+    c.execute("DELETE FROM archived_balances")
+
+def _migration_content_hash(c):
+    # Imported rows carry a content hash; the partial unique index makes re-imports no-ops.
+    # Manually added rows keep a NULL hash, so genuine repeats can still be entered by hand.
+    for table in ("expenses", "archived_expenses"):
+        c.execute(f"PRAGMA table_info({table})")
+        cols = [info[1] for info in c.fetchall()]
+        if 'content_hash' not in cols:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN content_hash TEXT")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_content_hash ON expenses(content_hash) WHERE content_hash IS NOT NULL")
+
+def _migration_import_batches(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS import_batches (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        filename TEXT,
+        imported_at TEXT,
+        row_count INTEGER DEFAULT 0,
+        skipped_count INTEGER DEFAULT 0,
+        balance_adjustment REAL DEFAULT 0,
+        rolled_back_at TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_import_batches_user ON import_batches(user_id)")
+    
+    c.execute("PRAGMA table_info(expenses)")
+    cols = [info[1] for info in c.fetchall()]
+    if 'import_batch_id' not in cols:
+        c.execute("ALTER TABLE expenses ADD COLUMN import_batch_id INTEGER REFERENCES import_batches(id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_expenses_import_batch ON expenses(import_batch_id) WHERE import_batch_id IS NOT NULL")
+
+def _migration_session_expiry(c):
+    c.execute("PRAGMA table_info(sessions)")
+    cols = [info[1] for info in c.fetchall()]
+    if 'expires_at' not in cols:
+        c.execute("ALTER TABLE sessions ADD COLUMN expires_at TEXT")
+    # Existing sessions get the standard lifetime counted from when they were created
+    c.execute("UPDATE sessions SET expires_at = datetime(COALESCE(created_at, 'now'), ?) WHERE expires_at IS NULL",
+              (f"+{SESSION_LIFETIME_DAYS} days",))
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)")
+
+# --- Change Log ---
+# change_log records which rows changed in the tables a differential backup needs to carry.
+# Only rowids are logged; the backup reads the rows' current state. Logging is off until the
+# first backup exists, and each backup prunes the entries it has captured.
+
+# Every table of user data, keyed by rowid (the id column where there is one). Derived tables
+# (user_summary, category_stats, insights) are rebuilt after a restore instead; sessions are
+# not restored, and archived_balances has been empty since archive_batches replaced it.
+CHANGE_LOG_TABLES = ("expenses", "recurring_expenses", "investments", "users", "archive_batches",
+                     "archived_expenses", "import_batches", "merchant_categories", "classifier_models")
+
+_LOG_WHEN = "WHEN EXISTS (SELECT 1 FROM backup_history)"
+
+def _change_log_triggers(tables):
+    triggers = []
+    for table in tables:
+        for op, event, row in (("I", "INSERT", "NEW"), ("U", "UPDATE", "NEW"), ("D", "DELETE", "OLD")):
+            triggers.append(f'''CREATE TRIGGER IF NOT EXISTS trg_log_{table}_{event.lower()} AFTER {event} ON {table} {_LOG_WHEN}
+    BEGIN
+        INSERT INTO change_log (table_name, op, row_id) VALUES ('{table}', '{op}', {row}.rowid);
+    END''')
+    return triggers
+
+def _migration_change_log(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        op TEXT NOT NULL,
+        row_id INTEGER NOT NULL
+    )''')
+    # One row per backup taken; to_seq is the change_log high-water mark the backup covers
+    c.execute('''CREATE TABLE IF NOT EXISTS backup_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        filename TEXT NOT NULL,
+        base_filename TEXT NOT NULL,
+        to_seq INTEGER,
+        created_at TEXT
+    )''')
+    for sql in _change_log_triggers(("expenses", "recurring_expenses", "investments")):
+        c.execute(sql)
+    # Users are logged when created (so restored rows have an owner) and when the balance changes
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_log_users_insert AFTER INSERT ON users {_LOG_WHEN}
+    BEGIN
+        INSERT INTO change_log (table_name, op, row_id) VALUES ('users', 'I', NEW.id);
+    END''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_log_users_initial_balance AFTER UPDATE OF initial_balance ON users {_LOG_WHEN}
+    BEGIN
+        INSERT INTO change_log (table_name, op, row_id) VALUES ('users', 'U', NEW.id);
+    END''')
+
+def _migration_category_stats(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS category_stats (
+        user_id INTEGER NOT NULL,
+        category TEXT,
+        count INTEGER NOT NULL DEFAULT 0,
+        mean REAL NOT NULL DEFAULT 0,
+        median REAL,
+        sketch TEXT,
+        PRIMARY KEY (user_id, category)
+    )''')
+    c.execute("PRAGMA table_info(expenses)")
+    cols = [info[1] for info in c.fetchall()]
+    if 'anomaly_median' not in cols:
+        c.execute("ALTER TABLE expenses ADD COLUMN anomaly_median REAL")
+    # Existing history is replayed so current data has sketches and flags from day one
+    _rebuild_category_stats(c)
+
+# --- Insights ---
+# insights caches each user's precomputed tips, month-end forecast and reminders.
+# Triggers bump data_version on writes that can change them; a row is fresh while
+# computed_version matches it (and it was computed today). Only the first write after a
+# version is handed out (read_version) needs to bump, so bulk imports pay one row write.
+
+def _insights_triggers():
+    triggers = []
+    bump = "UPDATE insights SET data_version = data_version + 1 WHERE user_id IN ({ids}) AND data_version = read_version;"
+    for table in ("expenses", "recurring_expenses"):
+        for event, ids in (("INSERT", "NEW.user_id"), ("UPDATE", "OLD.user_id, NEW.user_id"), ("DELETE", "OLD.user_id")):
+            triggers.append(f'''CREATE TRIGGER IF NOT EXISTS trg_insights_{table}_{event.lower()} AFTER {event} ON {table}
+    BEGIN
+        {bump.format(ids=ids)}
+    END''')
+    triggers.append(f'''CREATE TRIGGER IF NOT EXISTS trg_insights_initial_balance AFTER UPDATE OF initial_balance ON users
+    BEGIN
+        {bump.format(ids="NEW.id")}
+    END''')
+    return triggers
+
+def _migration_insights(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS insights (
+        user_id INTEGER PRIMARY KEY,
+        data_version INTEGER NOT NULL DEFAULT 0,
+        read_version INTEGER NOT NULL DEFAULT 0,
+        computed_version INTEGER,
+        computed_at TEXT,
+        tips TEXT,
+        reminders TEXT,
+        predicted_total REAL,
+        predicted_savings REAL
+    )''')
+    for sql in _insights_triggers():
+        c.execute(sql)
+
+def _migration_date_epoch(c):
+    # One-time normalization: every date becomes canonical text plus an indexed integer epoch.
+    # Rows whose date can't be parsed keep their text and a NULL epoch. The per-row summary
+    # trigger is dropped for the backfill and the summary and sketches are rebuilt once after,
+    # now in true date order.
+    c.execute("DROP TRIGGER IF EXISTS trg_summary_expense_update")
+    for table in ("expenses", "archived_expenses"):
+        c.execute(f"PRAGMA table_info({table})")
+        cols = [info[1] for info in c.fetchall()]
+        if 'date_epoch' not in cols:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN date_epoch INTEGER")
+        rows = c.execute(f"SELECT id, date FROM {table} WHERE date_epoch IS NULL AND date IS NOT NULL").fetchall()
+        if not rows:
+            continue
+        ids, raw = zip(*rows)
+        dates, epochs = normalize_dates(raw)
+        c.execute("CREATE TEMP TABLE IF NOT EXISTS normalized_dates (id INTEGER PRIMARY KEY, date TEXT, date_epoch INTEGER)")
+        c.execute("DELETE FROM normalized_dates")
+        c.executemany("INSERT INTO normalized_dates VALUES (?, ?, ?)",
+                      [(i, d, e) for i, d, e in zip(ids, dates, epochs) if e is not None])
+        c.execute(f'''UPDATE {table} SET date = n.date, date_epoch = n.date_epoch
+                     FROM normalized_dates n WHERE n.id = {table}.id''')
+    c.execute("DROP TABLE IF EXISTS temp.normalized_dates")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_expenses_user_epoch ON expenses(user_id, date_epoch)")
+    c.execute(next(t for t in USER_SUMMARY_TRIGGERS if "trg_summary_expense_update" in t))
+    _rebuild_user_summary(c)
+    _rebuild_category_stats(c)
+
+def _migration_recurring_posting(c):
+    # anchor_date is the first due date; later ones are counted from it, so month-end
+    # schedules stay on the month end after a short month
+    c.execute("PRAGMA table_info(recurring_expenses)")
+    cols = [info[1] for info in c.fetchall()]
+    if 'anchor_date' not in cols:
+        c.execute("ALTER TABLE recurring_expenses ADD COLUMN anchor_date TEXT")
+    c.execute("UPDATE recurring_expenses SET anchor_date = next_due_date WHERE anchor_date IS NULL")
+    # The posting job looks for due items across all users
+    c.execute("CREATE INDEX IF NOT EXISTS idx_recurring_due ON recurring_expenses(next_due_date)")
+
+# --- Merchant Memory ---
+# merchant_categories remembers the category a user gave each merchant (see
+# categorizer.merchant_key). Manual adds and category edits teach it; imports read it
+# before falling back to keyword rules. Imported guesses never teach it.
+
+def _learn_merchants(c, rows):
+    """
+    Upserts [(user_id, description, category)]; later rows win. 'Other' and empty keys are skipped.
+    """
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    learned = [(user_id, merchant_key(description), category, now)
+               for user_id, description, category in rows
+               if user_id is not None and category and category != DEFAULT_CATEGORY]
+    learned = [row for row in learned if row[1]]
+    c.executemany('''INSERT INTO merchant_categories (user_id, merchant_key, category, updated_at) VALUES (?, ?, ?, ?)
+                     ON CONFLICT(user_id, merchant_key) DO UPDATE SET category = excluded.category, updated_at = excluded.updated_at''',
+                  learned)
+
+def _migration_merchant_categories(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS merchant_categories (
+        user_id INTEGER NOT NULL,
+        merchant_key TEXT NOT NULL,
+        category TEXT NOT NULL,
+        updated_at TEXT,
+        PRIMARY KEY (user_id, merchant_key)
+    )''')
+    # Family members share what they have taught
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_family ON users(family_id) WHERE family_id IS NOT NULL")
+
+    # Learn from history: the most recent category each user gave each merchant by hand
+    # (imported rows carry a content hash or an import batch and only hold the import's guess)
+    rows = c.execute('''SELECT user_id, description, category FROM expenses
+                        WHERE user_id IS NOT NULL AND category IS NOT NULL AND category != ?
+                          AND content_hash IS NULL AND import_batch_id IS NULL ORDER BY id''',
+                     (DEFAULT_CATEGORY,)).fetchall()
+    if rows:
+        user_ids, descriptions, categories = zip(*rows)
+        keys = merchant_keys(list(descriptions))
+        latest = {}
+        for user_id, key, category in zip(user_ids, keys, categories):
+            if key:
+                latest[(user_id, key)] = category
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        c.executemany("INSERT OR REPLACE INTO merchant_categories (user_id, merchant_key, category, updated_at) VALUES (?, ?, ?, ?)",
+                      [(user_id, key, category, now) for (user_id, key), category in latest.items()])
+
+def _migration_classifier_models(c):
+    # Per-user naive Bayes models (see classifier.py), one per target
+    c.execute('''CREATE TABLE IF NOT EXISTS classifier_models (
+        user_id INTEGER NOT NULL,
+        target TEXT NOT NULL,
+        row_count INTEGER NOT NULL,
+        trained_at TEXT,
+        model BLOB NOT NULL,
+        PRIMARY KEY (user_id, target)
+    )''')
+
+def _migration_change_log_all_tables(c):
+    # Log the reset, import and learning tables too, and every change to a user, so a
+    # differential restore brings them back along with the expenses they refer to
+    c.execute("DROP TRIGGER IF EXISTS trg_log_users_insert")
+    c.execute("DROP TRIGGER IF EXISTS trg_log_users_initial_balance")
+    for sql in _change_log_triggers(CHANGE_LOG_TABLES):
+        c.execute(sql)
+
+def _migration_archived_import_batches(c):
+    # Archived rows keep their import, so undoing a reset brings back rows that can still be rolled back
+    c.execute("PRAGMA table_info(archived_expenses)")
+    cols = [info[1] for info in c.fetchall()]
+    if 'import_batch_id' not in cols:
+        c.execute("ALTER TABLE archived_expenses ADD COLUMN import_batch_id INTEGER REFERENCES import_batches(id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_archived_expenses_import_batch ON archived_expenses(import_batch_id) WHERE import_batch_id IS NOT NULL")
+
+# (version, description, step). Append new steps at the end; never renumber.
+MIGRATIONS = [
+    (1, "users and expenses tables", _migration_base_tables),
+    (2, "transaction_type and family_id columns", _migration_legacy_columns),
+    (3, "archive tables", _migration_archive_tables),
+    (4, "sessions, recurring_expenses and investments tables", _migration_feature_tables),
+    (5, "per-user indexes for hot queries", _migration_hot_path_indexes),
+    (6, "trigger-maintained user_summary table", _migration_user_summary),
+    (7, "archive_batches with integer batch ids", _migration_archive_batches),
+    (8, "content_hash for idempotent imports", _migration_content_hash),
+    (9, "import_batches for one-step import rollback", _migration_import_batches),
+    (10, "session expiry", _migration_session_expiry),
+    (11, "change_log for differential backups", _migration_change_log),
+    (12, "streaming category stats and anomaly flags", _migration_category_stats),
+    (13, "precomputed insights", _migration_insights),
+    (14, "canonical dates and date_epoch", _migration_date_epoch),
+    (15, "recurring expense posting", _migration_recurring_posting),
+    (16, "merchant category memory", _migration_merchant_categories),
+    (17, "per-user classifier models", _migration_classifier_models),
+    (18, "change_log for every user table", _migration_change_log_all_tables),
+    (19, "import batch ids on archived expenses", _migration_archived_import_batches),
+]
+
+def get_schema_version():
+    with _pooled_connection() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, description TEXT, applied_at TEXT)")
+        res = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return res[0] or 0
+
+def migrate_db():
+    """
+    Applies every pending migration in order. Each step runs in its own write transaction,
+    so concurrent starters serialize and a failed step leaves earlier ones recorded.
+    Returns the list of versions applied.
+    """
+    applied = []
+    current = get_schema_version()
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        with _pooled_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Another process may have applied it while we waited for the lock
+            res = conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone()
+            if res:
+                continue
+            step(conn.cursor())
+            conn.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                         (version, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        applied.append(version)
+    return applied
+
+def init_db():
+    """
+    Brings the database up to the latest schema. Safe to call on every Streamlit rerun:
+    the migration check only touches the database the first time per process and file.
+    """
+    if DB_FILE in _initialized_files:
+        return
+    with _init_lock:
+        if DB_FILE not in _initialized_files:
+            migrate_db()
+            _initialized_files.add(DB_FILE)
 
 # --- User Auth Functions ---
 
+# bcrypt cost factor for new hashes. Changing it upgrades existing users on their next login.
+BCRYPT_ROUNDS = int(os.environ.get("EXPENSES_BCRYPT_ROUNDS", "12"))
+# Worker processes for hashing; 0 hashes inline on the calling thread.
+AUTH_WORKERS = int(os.environ.get("EXPENSES_AUTH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_auth_pool = None
+_auth_pool_lock = threading.Lock()
+
+def _hash_rounds(stored_hash):
+    # $2b$12$... -> 12
+    try:
+        return int(stored_hash.split(b"$")[2])
+    except (IndexError, ValueError):
+        return None
+
+def _get_auth_pool():
+    global _auth_pool
+    with _auth_pool_lock:
+        if _auth_pool is None:
+            # Workers fork from a server that has only imported auth_worker (spawn where
+            # there is no forkserver), so they never load this module or the app's imports
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                ctx = multiprocessing.get_context("forkserver")
+                ctx.set_forkserver_preload(["auth_worker"])
+            else:
+                ctx = multiprocessing.get_context("spawn")
+            _auth_pool = ProcessPoolExecutor(max_workers=AUTH_WORKERS, mp_context=ctx)
+            atexit.register(_auth_pool.shutdown)
+        return _auth_pool
+
+def _run_auth(fn, *args):
+    """
+    Runs an auth_worker bcrypt call in the bounded worker pool so a login burst queues there
+    instead of pinning the Streamlit script threads. If a worker dies the call runs inline and
+    the next one starts a fresh pool.
+
+    Like any multiprocessing pool, the workers re-import the calling script's __main__ module,
+    so scripts that create or authenticate users must keep their top-level code under
+    `if __name__ == "__main__":` (main.py does). Without the guard every worker reruns the
+    script and fails to start.
+    """
+    global _auth_pool
+    if AUTH_WORKERS <= 0:
+        return fn(*args)
+    try:
+        return _get_auth_pool().submit(fn, *args).result()
+    except BrokenProcessPool:
+        with _auth_pool_lock:
+            _auth_pool = None
+        return fn(*args)
+
 def create_user(username, password, family_id=None):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    password_hash = _run_auth(hash_password, password, BCRYPT_ROUNDS)
     try:
-        c.execute("INSERT INTO users (username, password_hash, created_at, family_id) VALUES (?, ?, ?, ?)", 
-                  (username, password_hash, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), family_id))
-        conn.commit()
+        with get_connection() as conn:
+            conn.execute("INSERT INTO users (username, password_hash, created_at, family_id) VALUES (?, ?, ?, ?)", 
+                         (username, password_hash, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), family_id))
         return True
     except sqlite3.IntegrityError:
         return False
-    finally:
-        conn.close()
 
 def authenticate_user(username, password):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT id, password_hash FROM users WHERE username = ?", (username,))
-    user = c.fetchone()
-    conn.close()
+    with get_connection() as conn:
+        user = conn.execute("SELECT id, password_hash FROM users WHERE username = ?", (username,)).fetchone()
     
     if user:
         # user[1] should be bytes if stored as BLOB, or needs encoding if TEXT
-        stored_hash = user[1]
-        if bcrypt.checkpw(password.encode('utf-8'), stored_hash):
+        stored_hash = user[1] if isinstance(user[1], bytes) else user[1].encode('utf-8')
+        if _run_auth(check_password, password, stored_hash):
+            # Transparently move the hash to the configured cost factor
+            if _hash_rounds(stored_hash) != BCRYPT_ROUNDS:
+                new_hash = _run_auth(hash_password, password, BCRYPT_ROUNDS)
+                with get_connection() as conn:
+                    conn.execute("UPDATE users SET password_hash = ? WHERE id = ?", (new_hash, user[0]))
             return user[0] # Return user_id
     return None
 
+def resolve_user_db(user):
+    """
+    Id of the user with this username, or of this id if no username matches. None if neither exists.
+    """
+    with get_connection() as conn:
+        row = conn.execute("SELECT id FROM users WHERE username = ?", (str(user),)).fetchone()
+        if row is None and str(user).isdigit():
+            row = conn.execute("SELECT id FROM users WHERE id = ?", (int(user),)).fetchone()
+    return row[0] if row else None
+
+# --- Session Functions ---
+
+SESSION_LIFETIME_DAYS = 30
+SESSION_CACHE_SIZE = 1024
+SESSION_CACHE_TTL = 15 * 60    # Seconds a validated session is trusted without re-reading the table
+SESSION_SWEEP_INTERVAL = 3600  # Seconds between expired-session sweeps
+
+class SessionCache:
+    """
+    In-process LRU of session_id -> (user_id, username), each entry with its own deadline.
+    delete_session invalidates locally; a logout in another process is picked up within the TTL.
+    """
+    def __init__(self, size=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            value, deadline = entry
+            if deadline <= time.monotonic():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return value
+
+    def put(self, session_id, value, expires_in=None):
+        ttl = self.ttl if expires_in is None else min(self.ttl, expires_in)
+        with self._lock:
+            self._entries[session_id] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+session_cache = SessionCache()
+_last_sweep = 0.0
+
+def _seconds_until(timestamp):
+    return (datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S") - datetime.now()).total_seconds()
+
 def create_session(user_id):
     import uuid
     session_id = str(uuid.uuid4())
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    # Ensure table exists (lazy init for migration)
-    c.execute('''CREATE TABLE IF NOT EXISTS sessions (
-        session_id TEXT PRIMARY KEY,
-        user_id INTEGER,
-        created_at TEXT,
-        FOREIGN KEY(user_id) REFERENCES users(id)
-    )''')
-    c.execute("INSERT INTO sessions (session_id, user_id, created_at) VALUES (?, ?, ?)", 
-              (session_id, user_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-    conn.commit()
-    conn.close()
+    now = datetime.now()
+    expires_at = (now + timedelta(days=SESSION_LIFETIME_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+    with get_connection() as conn:
+        conn.execute("INSERT INTO sessions (session_id, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)", 
+                     (session_id, user_id, now.strftime("%Y-%m-%d %H:%M:%S"), expires_at))
+    _maybe_sweep_sessions()
     return session_id
 
 def validate_session(session_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    # Check if table exists first
+    cached = session_cache.get(session_id)
+    if cached:
+        return cached
     try:
-        c.execute("SELECT s.user_id, u.username FROM sessions s JOIN users u ON s.user_id = u.id WHERE s.session_id = ?", (session_id,))
-        res = c.fetchone()
-        conn.close()
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with get_connection() as conn:
+            res = conn.execute("SELECT s.user_id, u.username, s.expires_at FROM sessions s JOIN users u ON s.user_id = u.id WHERE s.session_id = ? AND (s.expires_at IS NULL OR s.expires_at > ?)",
+                               (session_id, now)).fetchone()
         if res:
+            expires_in = _seconds_until(res[2]) if res[2] else None
+            session_cache.put(session_id, (res[0], res[1]), expires_in)
             return res[0], res[1] # user_id, username
     except sqlite3.OperationalError:
-        conn.close()
+        pass
     return None, None
 
 def delete_session(session_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
+    session_cache.invalidate(session_id)
     try:
-        c.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
-        conn.commit()
+        with get_connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
     except:
         pass
-    conn.close()
+
+def sweep_expired_sessions():
+    """
+    Deletes expired sessions. Returns how many were removed.
+    """
+    global _last_sweep
+    _last_sweep = time.monotonic()
+    with get_connection() as conn:
+        cur = conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
+        return cur.rowcount
+
+def _maybe_sweep_sessions():
+    # Piggybacks on logins so the table stays bounded without a separate scheduler
+    if time.monotonic() - _last_sweep >= SESSION_SWEEP_INTERVAL:
+        sweep_expired_sessions()
 
 
 # --- Expense Functions ---
 
 def add_expense_db(user_id, amount, category, description, date=None, transaction_type='expense'):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    if date is None:
-        date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO expenses (user_id, amount, category, description, date, transaction_type) VALUES (?, ?, ?, ?, ?, ?)",
-              (user_id, amount, category, description, date, transaction_type))
-    conn.commit()
-    conn.close()
+    date, date_epoch = normalize_date(datetime.now() if date is None else date)
+    with get_connection() as conn:
+        cur = conn.execute("INSERT INTO expenses (user_id, amount, category, description, date, date_epoch, transaction_type) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (user_id, amount, category, description, date, date_epoch, transaction_type))
+        if user_id is not None and amount is not None and (transaction_type or 'expense') == 'expense':
+            _update_category_stats(conn, [(cur.lastrowid, user_id, category, amount)])
+        # The user picked this category, so remember it for the merchant
+        _learn_merchants(conn, [(user_id, description, category)])
 
-def add_expense_batch_db(expenses_list):
+# Rows per transaction when bulk importing
+IMPORT_CHUNK_SIZE = 5000
+
+def normalize_description(description):
+    return re.sub(r"\s+", " ", str(description or "")).strip().lower()
+
+def transaction_hash(user_id, amount, description, date, occurrence=0):
+    """
+    Content hash identifying an imported row: user, date, amount and normalized description.
+    occurrence numbers identical rows within one import (two same-day coffees), so they are
+    kept apart from each other but still match themselves on a re-import.
+    """
+    key = f"{user_id}|{str(date).strip()}|{float(amount or 0):.2f}|{normalize_description(description)}|{occurrence}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+class DuplicateCounter:
+    """
+    Numbers identical import rows (0, 1, 2...) across any number of add_expense_batch_db calls.
+    Keeps one sorted 64-bit key hash per row seen rather than a dict entry, so a long statement
+    streamed in chunks costs 8 bytes a row.
+    """
+    def __init__(self):
+        self._seen = np.empty(0, dtype=np.int64)
+
+    def number(self, keys):
+        keys = np.asarray(keys, dtype=np.int64)
+        if not len(keys):
+            return keys
+        # 1. Copies of each key in earlier calls
+        earlier = np.searchsorted(self._seen, keys, side="right") - np.searchsorted(self._seen, keys, side="left")
+
+        # 2. Position among equal keys within this call, in input order
+        order = np.argsort(keys, kind="stable")
+        ordered = keys[order]
+        positions = np.arange(len(keys))
+        group_start = np.maximum.accumulate(np.where(np.r_[True, ordered[1:] != ordered[:-1]], positions, 0))
+        within = np.empty(len(keys), dtype=np.int64)
+        within[order] = positions - group_start
+
+        # Both parts are sorted, so the stable sort is a linear merge
+        self._seen = np.sort(np.concatenate([self._seen, ordered]), kind="stable")
+        return earlier + within
+
+def prepare_expense_rows(expenses_list, dayfirst=False, seen=None):
+    """
+    The CPU-bound half of add_expense_batch_db, which needs no connection and can run in another
+    process: normalized dates and content hashes. Returns rows for insert_expense_rows_db.
+    """
+    expenses_list = list(expenses_list)
+    dates, epochs = normalize_dates([row[4] for row in expenses_list], dayfirst=dayfirst)
+    seen = DuplicateCounter() if seen is None else seen
+    # The hash keeps the statement's own date text, so re-imports still match older rows
+    occurrences = seen.number([hash((user_id, str(date_str).strip(), f"{float(amount or 0):.2f}", normalize_description(description)))
+                               for user_id, amount, _, description, date_str, _ in expenses_list])
+    rows = []
+    for (user_id, amount, category, description, date_str, transaction_type), canonical, epoch, occurrence in zip(expenses_list, dates, epochs, occurrences):
+        rows.append((user_id, amount, category, description, canonical, epoch, transaction_type,
+                     transaction_hash(user_id, amount, description, date_str, int(occurrence))))
+    return rows
+
+def insert_expense_rows_db(rows, chunk_size=IMPORT_CHUNK_SIZE, import_batch_id=None):
+    """
+    Inserts rows from prepare_expense_rows in chunked transactions, skipping those already stored.
+    Returns (inserted, skipped).
+    """
+    inserted = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = [row + (import_batch_id,) for row in rows[start:start + chunk_size]]
+        with get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM expenses").fetchone()[0]
+            # rowcount counts rows actually inserted (not ignored ones, not trigger writes)
+            cur = conn.executemany("INSERT OR IGNORE INTO expenses (user_id, amount, category, description, date, date_epoch, transaction_type, content_hash, import_batch_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   chunk)
+            inserted += cur.rowcount
+            # Rows past the previous max id are exactly the ones this chunk inserted
+            new_rows = conn.execute(f"SELECT id, user_id, category, amount FROM expenses WHERE id > ? AND {_SKETCHED_ROWS_SQL} ORDER BY id",
+                                    (last_id,)).fetchall()
+            _update_category_stats(conn, new_rows)
+            if import_batch_id is not None:
+                conn.execute("UPDATE import_batches SET row_count = row_count + ?, skipped_count = skipped_count + ? WHERE id = ?",
+                             (cur.rowcount, len(chunk) - cur.rowcount, import_batch_id))
+    return inserted, len(rows) - inserted
+
+def add_expense_batch_db(expenses_list, chunk_size=IMPORT_CHUNK_SIZE, import_batch_id=None, dayfirst=False, seen=None):
     """
     Batch insert expenses/income. 
     expenses_list: list of tuples (user_id, amount, category, description, date, transaction_type)
+    Each row gets a content hash; rows already in the database are skipped (INSERT OR IGNORE),
+    so importing the same statement twice is a no-op. Inserts run in chunked transactions.
+    import_batch_id (from start_import_batch_db) tags the rows so the import can be rolled back.
+    Dates are normalized in one vectorized pass (dayfirst for DD/MM/YYYY statements).
+    When one file is inserted over several calls, pass the same DuplicateCounter as `seen`
+    to each so identical rows are numbered across the whole file.
+    Returns (inserted, skipped).
     """
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.executemany("INSERT INTO expenses (user_id, amount, category, description, date, transaction_type) VALUES (?, ?, ?, ?, ?, ?)",
-                  expenses_list)
-    conn.commit()
-    conn.close()
+    return insert_expense_rows_db(prepare_expense_rows(expenses_list, dayfirst, seen), chunk_size, import_batch_id)
 
 def get_expenses_db(user_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT amount, category, description, date, id, transaction_type FROM expenses WHERE user_id = ? ORDER BY date DESC", (user_id,))
-    rows = c.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        rows = conn.execute("SELECT amount, category, description, date, id, transaction_type FROM expenses WHERE user_id = ? ORDER BY date DESC", (user_id,)).fetchall()
     expenses = []
     for r in rows:
         expenses.append({
@@ -198,118 +1068,225 @@ def get_expenses_db(user_id):
         })
     return expenses
 
+def get_expense_columns_db(user_id, types=None):
+    """
+    Rows as (id, date_epoch, amount, category, type, description) tuples, oldest first,
+    for building the analytics frame without a dict per row or any date parsing.
+    """
+    where, params = _expense_filters_sql(user_id, types=types)
+    with get_connection() as conn:
+        return conn.execute(f'''SELECT id, date_epoch, amount, category, COALESCE(transaction_type, 'expense'), description
+                               FROM expenses WHERE {where} ORDER BY date, id''', params).fetchall()
+
+def _date_bound(value, inclusive_end=False):
+    """
+    Turns a date/datetime/string into a 'YYYY-MM-DD' bound; it compares correctly with the
+    canonical expenses.date text, so range filters seek the (user_id, date) index.
+    An inclusive end date becomes the start of the following day so it can be compared with <.
+    """
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], "%Y-%m-%d").date()
+    if isinstance(value, datetime):
+        value = value.date()
+    if inclusive_end:
+        value = value + timedelta(days=1)
+    return value.strftime("%Y-%m-%d")
+
+def _expense_filters_sql(user_id, categories=None, types=None, start_date=None, end_date=None, min_amount=None, max_amount=None):
+    """
+    Builds the WHERE clause shared by the paginated and aggregate expense queries.
+    Returns (sql, params). Always scoped to one user so the (user_id, date) index applies.
+    """
+    clauses = ["user_id = ?"]
+    params = [user_id]
+    if categories:
+        clauses.append(f"category IN ({','.join('?' * len(categories))})")
+        params.extend(categories)
+    if types:
+        clauses.append(f"COALESCE(transaction_type, 'expense') IN ({','.join('?' * len(types))})")
+        params.extend(types)
+    if start_date is not None:
+        clauses.append("date >= ?")
+        params.append(_date_bound(start_date))
+    if end_date is not None:
+        clauses.append("date < ?")
+        params.append(_date_bound(end_date, inclusive_end=True))
+    if min_amount is not None:
+        clauses.append("amount >= ?")
+        params.append(min_amount)
+    if max_amount is not None:
+        clauses.append("amount <= ?")
+        params.append(max_amount)
+    return " AND ".join(clauses), params
+
+def get_expenses_page(user_id, limit=50, after=None, **filters):
+    """
+    Keyset-paginated transactions, newest first (date DESC, id DESC).
+    after: the (date, id) cursor returned with the previous page, or None for the first page.
+    filters: categories, types, start_date, end_date (inclusive), min_amount, max_amount.
+    Returns (expenses, next_cursor). next_cursor is None on the last page.
+    """
+    where, params = _expense_filters_sql(user_id, **filters)
+    if after is not None:
+        # Row-value comparison lets SQLite seek straight into the (user_id, date) index
+        where += " AND (date, id) < (?, ?)"
+        params.extend([after[0], after[1]])
+    
+    with get_connection() as conn:
+        rows = conn.execute(f"SELECT amount, category, description, date, id, transaction_type FROM expenses WHERE {where} ORDER BY date DESC, id DESC LIMIT ?",
+                            params + [limit + 1]).fetchall()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    expenses = []
+    for r in rows:
+        expenses.append({
+            "amount": r[0],
+            "category": r[1],
+            "description": r[2],
+            "date": r[3],
+            "id": r[4],
+            "type": r[5] if r[5] else 'expense'
+        })
+    next_cursor = (rows[-1][3], rows[-1][4]) if has_more else None
+    return expenses, next_cursor
+
+def iter_expenses_pages(user_id, page_size=1000, **filters):
+    """
+    Yields successive pages (lists of expense dicts) of a filtered result, for exports.
+    """
+    after = None
+    while True:
+        rows, after = get_expenses_page(user_id, page_size, after=after, **filters)
+        if rows:
+            yield rows
+        if after is None:
+            return
+
+def get_expense_categories_db(user_id):
+    with get_connection() as conn:
+        rows = conn.execute("SELECT DISTINCT category FROM expenses WHERE user_id = ? ORDER BY category", (user_id,)).fetchall()
+    return [r[0] for r in rows if r[0] is not None]
+
 def update_expense_db(expense_id, amount, category, description, transaction_type='expense'):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("UPDATE expenses SET amount=?, category=?, description=?, transaction_type=? WHERE id=?", 
-              (amount, category, description, transaction_type, expense_id))
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        conn.execute("UPDATE expenses SET amount=?, category=?, description=?, transaction_type=? WHERE id=?", 
+                     (amount, category, description, transaction_type, expense_id))
+        _learn_merchants(conn, conn.execute("SELECT user_id, description, category FROM expenses WHERE id = ?", (expense_id,)).fetchall())
+
+def set_expense_category_db(expense_id, category):
+    """
+    Recategorizes one transaction and remembers the category for its merchant.
+    """
+    with get_connection() as conn:
+        conn.execute("UPDATE expenses SET category = ? WHERE id = ?", (category, expense_id))
+        _learn_merchants(conn, conn.execute("SELECT user_id, description, category FROM expenses WHERE id = ?", (expense_id,)).fetchall())
+
+def get_merchant_categories_db(user_id, include_family=True):
+    """
+    The user's merchant memory as {merchant_key: category}. With include_family, entries
+    taught by family members fill in merchants the user hasn't categorized themselves.
+    """
+    with get_connection() as conn:
+        rows = []
+        if include_family:
+            rows = conn.execute('''SELECT m.merchant_key, m.category FROM users u
+                                    JOIN users f ON f.family_id = u.family_id AND f.id != u.id
+                                    JOIN merchant_categories m ON m.user_id = f.id
+                                    WHERE u.id = ? AND u.family_id IS NOT NULL
+                                    ORDER BY m.updated_at''', (user_id,)).fetchall()
+        rows += conn.execute("SELECT merchant_key, category FROM merchant_categories WHERE user_id = ?",
+                             (user_id,)).fetchall()
+    # Later entries win: family members by recency, then the user's own
+    return dict(rows)
 
 def delete_expense_db(expense_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("DELETE FROM expenses WHERE id=?", (expense_id,))
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        conn.execute("DELETE FROM expenses WHERE id=?", (expense_id,))
 
 def set_initial_balance_db(user_id, amount):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("UPDATE users SET initial_balance = ? WHERE id = ?", (amount, user_id))
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        conn.execute("UPDATE users SET initial_balance = ? WHERE id = ?", (amount, user_id))
     
 def get_initial_balance_db(user_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT initial_balance FROM users WHERE id = ?", (user_id,))
-    res = c.fetchone()
-    conn.close()
+    with get_connection() as conn:
+        res = conn.execute("SELECT initial_balance FROM users WHERE id = ?", (user_id,)).fetchone()
     return res[0] if res and res[0] is not None else 0.0
 
 def archive_and_reset_expenses(user_id):
     """
     Moves all current expenses for the user to the archive table and resets the initial balance to 0.
+    The move is two set-based statements inside one write transaction. Returns the archive batch id.
     """
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    # 1. Get current expenses
-    c.execute("SELECT amount, category, description, date, transaction_type FROM expenses WHERE user_id = ?", (user_id,))
-    rows = c.fetchall()
-    
-    # 2. Get current initial balance
-    c.execute("SELECT initial_balance FROM users WHERE id = ?", (user_id,))
-    res = c.fetchone()
-    current_balance = res[0] if res else 0.0
-    
-    archived_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    # 3. Archive Balance
-    c.execute("INSERT INTO archived_balances (user_id, balance, archived_at) VALUES (?, ?, ?)", 
-              (user_id, current_balance, archived_at))
-    
-    if rows:
-        # 4. Archive expenses
-        archived_data = [(user_id, r[0], r[1], r[2], r[3], r[4], archived_at) for r in rows]
-        c.executemany("INSERT INTO archived_expenses (user_id, amount, category, description, date, transaction_type, archived_at) VALUES (?, ?, ?, ?, ?, ?, ?)", archived_data)
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        c = conn.cursor()
+        archived_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # 5. Delete from main expenses table
+        # 1. Open a batch recording the balance being reset
+        c.execute("INSERT INTO archive_batches (user_id, balance, archived_at) VALUES (?, COALESCE((SELECT initial_balance FROM users WHERE id = ?), 0.0), ?)",
+                  (user_id, user_id, archived_at))
+        batch_id = c.lastrowid
+        
+        # 2. Copy expenses into the archive under that batch
+        c.execute('''INSERT INTO archived_expenses (user_id, amount, category, description, date, date_epoch, transaction_type, content_hash, import_batch_id, archived_at, batch_id)
+                     SELECT user_id, amount, category, description, date, date_epoch, transaction_type, content_hash, import_batch_id, ?, ? FROM expenses WHERE user_id = ?''',
+                  (archived_at, batch_id, user_id))
+        c.execute("UPDATE archive_batches SET row_count = ? WHERE id = ?", (c.rowcount, batch_id))
+        
+        # 3. Delete from main expenses table
         c.execute("DELETE FROM expenses WHERE user_id = ?", (user_id,))
-    
-    # 6. Reset Initial Balance
-    c.execute("UPDATE users SET initial_balance = 0 WHERE id = ?", (user_id,))
-    
-    conn.commit()
-    conn.close()
+        c.execute("DELETE FROM category_stats WHERE user_id = ?", (user_id,))
+        
+        # 4. Reset Initial Balance
+        c.execute("UPDATE users SET initial_balance = 0 WHERE id = ?", (user_id,))
+    return batch_id
 
-def undo_last_reset(user_id):
+def undo_last_reset(user_id, batch_id=None):
     """
-    Undoes the last reset action by restoring expenses and balance from the archive.
+    Undoes a reset by restoring expenses and balance from the archive.
+    Restores the user's most recent batch, or the given batch_id if it belongs to the user.
     """
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    # 1. Find last archive timestamp
-    c.execute("SELECT archived_at FROM archived_balances WHERE user_id = ? ORDER BY archived_at DESC LIMIT 1", (user_id,))
-    res = c.fetchone()
-    
-    if not res:
-        conn.close()
-        return False # No archives found
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        c = conn.cursor()
         
-    last_archived_at = res[0]
-    
-    # 2. Restore Balance
-    c.execute("SELECT balance FROM archived_balances WHERE user_id = ? AND archived_at = ?", (user_id, last_archived_at))
-    bal_res = c.fetchone()
-    if bal_res:
-        restored_balance = bal_res[0]
-        c.execute("UPDATE users SET initial_balance = ? WHERE id = ?", (restored_balance, user_id))
+        # 1. Find the batch
+        if batch_id is None:
+            c.execute("SELECT id, balance FROM archive_batches WHERE user_id = ? ORDER BY id DESC LIMIT 1", (user_id,))
+        else:
+            c.execute("SELECT id, balance FROM archive_batches WHERE user_id = ? AND id = ?", (user_id, batch_id))
+        res = c.fetchone()
         
-    # 3. Restore Expenses
-    c.execute("SELECT amount, category, description, date, transaction_type FROM archived_expenses WHERE user_id = ? AND archived_at = ?", (user_id, last_archived_at))
-    archived_rows = c.fetchall()
-    
-    if archived_rows:
-        restored_data = [(user_id, r[0], r[1], r[2], r[3], r[4]) for r in archived_rows]
-        c.executemany("INSERT INTO expenses (user_id, amount, category, description, date, transaction_type) VALUES (?, ?, ?, ?, ?, ?)", restored_data)
+        if not res:
+            return False # No archives found
+            
+        batch_id, restored_balance = res
         
-    # 4. Clean up Archive
-    c.execute("DELETE FROM archived_balances WHERE user_id = ? AND archived_at = ?", (user_id, last_archived_at))
-    c.execute("DELETE FROM archived_expenses WHERE user_id = ? AND archived_at = ?", (user_id, last_archived_at))
+        # 2. Restore Balance
+        if restored_balance is not None:
+            c.execute("UPDATE users SET initial_balance = ? WHERE id = ?", (restored_balance, user_id))
+            
+        # 3. Restore Expenses (rows re-imported since the reset are not doubled), still tagged with their import
+        c.execute('''INSERT OR IGNORE INTO expenses (user_id, amount, category, description, date, date_epoch, transaction_type, content_hash, import_batch_id)
+                     SELECT ?, amount, category, description, date, date_epoch, transaction_type, content_hash, import_batch_id FROM archived_expenses WHERE batch_id = ? ORDER BY id''',
+                  (user_id, batch_id))
+            
+        # 4. Clean up Archive
+        c.execute("DELETE FROM archived_expenses WHERE batch_id = ?", (batch_id,))
+        c.execute("DELETE FROM archive_batches WHERE id = ?", (batch_id,))
+        _rebuild_category_stats(c, user_id)
     
-    conn.commit()
-    conn.close()
     return True
 
+def get_archive_batches_db(user_id):
+    with get_connection() as conn:
+        rows = conn.execute("SELECT id, archived_at, balance, row_count FROM archive_batches WHERE user_id = ? ORDER BY id DESC", (user_id,)).fetchall()
+    return [{"id": r[0], "archived_at": r[1], "balance": r[2], "row_count": r[3]} for r in rows]
+
 def get_archived_expenses(user_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT amount, category, description, date, transaction_type, archived_at FROM archived_expenses WHERE user_id = ? ORDER BY archived_at DESC, date DESC", (user_id,))
-    rows = c.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        rows = conn.execute("SELECT amount, category, description, date, transaction_type, archived_at FROM archived_expenses WHERE user_id = ? ORDER BY archived_at DESC, date DESC", (user_id,)).fetchall()
     
     archived = []
     for r in rows:
@@ -323,44 +1300,275 @@ def get_archived_expenses(user_id):
         })
     return archived
 
+# --- Import Batch Functions ---
+
+def start_import_batch_db(user_id, filename):
+    """
+    Opens an import batch record. Pass its id to add_expense_batch_db.
+    """
+    with get_connection() as conn:
+        cur = conn.execute("INSERT INTO import_batches (user_id, filename, imported_at) VALUES (?, ?, ?)",
+                           (user_id, filename, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        return cur.lastrowid
+
+def apply_import_balance_adjustment_db(batch_id, user_id, amount):
+    """
+    Raises the user's initial balance by amount and records it on the batch, so rollback can revert it.
+    """
+    with get_connection() as conn:
+        conn.execute("UPDATE users SET initial_balance = COALESCE(initial_balance, 0) + ? WHERE id = ?", (amount, user_id))
+        conn.execute("UPDATE import_batches SET balance_adjustment = balance_adjustment + ? WHERE id = ?", (amount, batch_id))
+
+def rollback_import(batch_id, user_id=None):
+    """
+    Removes every row of an import and reverts its initial-balance adjustment in one transaction.
+    If user_id is given the batch must belong to that user.
+    Returns the number of rows removed, or None if the batch is missing, already rolled back, or
+    has rows archived by a reset (undo the reset first).
+    """
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        c = conn.cursor()
+        c.execute("SELECT user_id, balance_adjustment FROM import_batches WHERE id = ? AND rolled_back_at IS NULL", (batch_id,))
+        res = c.fetchone()
+        if not res or (user_id is not None and res[0] != user_id):
+            return None
+        if c.execute("SELECT 1 FROM archived_expenses WHERE import_batch_id = ? LIMIT 1", (batch_id,)).fetchone():
+            return None
+        batch_user, adjustment = res
+        
+        c.execute("DELETE FROM expenses WHERE import_batch_id = ?", (batch_id,))
+        removed = c.rowcount
+        # The adjustment covered these rows; with none left there is nothing to revert
+        if adjustment and removed:
+            c.execute("UPDATE users SET initial_balance = COALESCE(initial_balance, 0) - ? WHERE id = ?", (adjustment, batch_user))
+        c.execute("UPDATE import_batches SET rolled_back_at = ? WHERE id = ?", (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), batch_id))
+        _rebuild_category_stats(c, batch_user)
+    return removed
+
+def get_import_batches_db(user_id):
+    with get_connection() as conn:
+        rows = conn.execute("SELECT id, filename, imported_at, row_count, skipped_count, balance_adjustment, rolled_back_at FROM import_batches WHERE user_id = ? ORDER BY id DESC", (user_id,)).fetchall()
+    imports = []
+    for r in rows:
+        imports.append({
+            "id": r[0],
+            "filename": r[1],
+            "imported_at": r[2],
+            "row_count": r[3],
+            "skipped_count": r[4],
+            "balance_adjustment": r[5],
+            "rolled_back_at": r[6]
+        })
+    return imports
+
+# --- Aggregate Functions ---
+# Dashboard / Insights numbers computed with GROUP BY instead of summing rows in Python.
+# All accept the same keyword filters as get_expenses_page (categories, types, dates, amounts).
+# Month and day keys are the leading characters of the stored date text (YYYY-MM, YYYY-MM-DD).
+
+def get_totals_by_type_db(user_id, **filters):
+    """
+    Returns {'income': total, 'expense': total, 'count': number of transactions}.
+    """
+    where, params = _expense_filters_sql(user_id, **filters)
+    with get_connection() as conn:
+        rows = conn.execute(f"SELECT COALESCE(transaction_type, 'expense'), SUM(amount), COUNT(*) FROM expenses WHERE {where} GROUP BY 1", params).fetchall()
+    totals = {'income': 0.0, 'expense': 0.0, 'count': 0}
+    for tx_type, amount, count in rows:
+        totals[tx_type] = totals.get(tx_type, 0.0) + (amount or 0.0)
+        totals['count'] += count
+    return totals
+
+def get_category_totals_db(user_id, **filters):
+    """
+    Per-category sums, largest first: [{'category', 'amount', 'count'}].
+    """
+    where, params = _expense_filters_sql(user_id, **filters)
+    with get_connection() as conn:
+        rows = conn.execute(f"SELECT category, SUM(amount), COUNT(*) FROM expenses WHERE {where} GROUP BY category ORDER BY 2 DESC", params).fetchall()
+    return [{"category": r[0], "amount": r[1], "count": r[2]} for r in rows]
+
+def get_monthly_totals_db(user_id, **filters):
+    """
+    Per-month sums in month order: [{'month': 'YYYY-MM', 'amount'}].
+    Dates that could not be normalized (NULL date_epoch) are skipped, as in every date bucket.
+    """
+    where, params = _expense_filters_sql(user_id, **filters)
+    with get_connection() as conn:
+        rows = conn.execute(f"SELECT substr(date, 1, 7) AS month, SUM(amount) FROM expenses WHERE {where} AND date_epoch IS NOT NULL GROUP BY month ORDER BY month", params).fetchall()
+    return [{"month": r[0], "amount": r[1]} for r in rows]
+
+def get_daily_totals_db(user_id, **filters):
+    """
+    Per-day sums in date order: [{'day': 'YYYY-MM-DD', 'amount'}].
+    """
+    where, params = _expense_filters_sql(user_id, **filters)
+    with get_connection() as conn:
+        rows = conn.execute(f"SELECT substr(date, 1, 10) AS day, SUM(amount) FROM expenses WHERE {where} AND date_epoch IS NOT NULL GROUP BY day ORDER BY day", params).fetchall()
+    return [{"day": r[0], "amount": r[1]} for r in rows]
+
+def get_category_month_totals_db(user_id, **filters):
+    """
+    Category x month sums (the long form of the Insights pivot): [{'category', 'month', 'amount'}].
+    """
+    where, params = _expense_filters_sql(user_id, **filters)
+    with get_connection() as conn:
+        rows = conn.execute(f"SELECT category, substr(date, 1, 7) AS month, SUM(amount) FROM expenses WHERE {where} AND date_epoch IS NOT NULL GROUP BY category, month ORDER BY month, category", params).fetchall()
+    return [{"category": r[0], "month": r[1], "amount": r[2]} for r in rows]
+
+def get_first_transaction_date_db(user_id, **filters):
+    """
+    Earliest canonical date string, or None if there are no matching transactions.
+    Dates that could not be normalized (NULL date_epoch) are skipped.
+    """
+    where, params = _expense_filters_sql(user_id, **filters)
+    with get_connection() as conn:
+        res = conn.execute(f"SELECT date FROM expenses WHERE {where} AND date_epoch IS NOT NULL ORDER BY date_epoch LIMIT 1", params).fetchone()
+    return res[0] if res else None
+
+# --- User Summary Functions ---
+
+def get_user_summary_db(user_id):
+    """
+    O(1) read of the trigger-maintained totals:
+    {'income_total', 'expense_total', 'tx_count', 'first_date', 'last_date', 'current_balance'}.
+    """
+    with get_connection() as conn:
+        res = conn.execute(f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM user_summary WHERE user_id = ?", (user_id,)).fetchone()
+    if res is None:
+        return {"income_total": 0.0, "expense_total": 0.0, "tx_count": 0, "first_date": None, "last_date": None,
+                "current_balance": get_initial_balance_db(user_id)}
+    return dict(zip(SUMMARY_COLUMNS, res))
+
+def verify_user_summary(repair=False, tolerance=1e-6):
+    """
+    Recomputes every summary row from expenses/users and diffs it against the stored table.
+    Returns a list of (user_id, column, stored, expected) mismatches.
+    With repair=True the table is rebuilt from source when anything differs.
+    """
+    with get_connection() as conn:
+        expected = {r[0]: r[1:] for r in conn.execute(_SUMMARY_FROM_SOURCE_SQL)}
+        stored = {r[0]: r[1:] for r in conn.execute(f"SELECT user_id, {', '.join(SUMMARY_COLUMNS)} FROM user_summary")}
+    
+    mismatches = []
+    for user_id in sorted(set(expected) | set(stored)):
+        exp_row = expected.get(user_id, (None,) * len(SUMMARY_COLUMNS))
+        got_row = stored.get(user_id, (None,) * len(SUMMARY_COLUMNS))
+        for column, got, exp in zip(SUMMARY_COLUMNS, got_row, exp_row):
+            if isinstance(got, float) and isinstance(exp, (int, float)):
+                if abs(got - exp) <= tolerance:
+                    continue
+            elif got == exp:
+                continue
+            mismatches.append((user_id, column, got, exp))
+    
+    if mismatches and repair:
+        rebuild_user_summary()
+    return mismatches
+
+def rebuild_user_summary():
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        _rebuild_user_summary(conn.cursor())
+
+# --- Anomaly Functions ---
+
+def get_anomaly_alerts_db(user_id, window=ANOMALY_WINDOW):
+    """
+    Expenses flagged at insert time, among the user's `window` most recent expenses. Newest first.
+    """
+    with get_connection() as conn:
+        rows = conn.execute('''SELECT amount, category, description, date, anomaly_median FROM expenses
+                              WHERE user_id = ? AND COALESCE(transaction_type, 'expense') = 'expense'
+                              ORDER BY date DESC, id DESC LIMIT ?''', (user_id, window)).fetchall()
+    return [{"amount": r[0], "category": r[1], "description": r[2], "date": r[3], "median": r[4]} for r in rows if r[4] is not None]
+
+def get_category_stats_db(user_id):
+    with get_connection() as conn:
+        rows = conn.execute("SELECT category, count, mean, median FROM category_stats WHERE user_id = ? ORDER BY count DESC", (user_id,)).fetchall()
+    return [{"category": r[0], "count": r[1], "mean": r[2], "median": r[3]} for r in rows]
+
+def rebuild_category_stats(user_id=None):
+    """
+    Recomputes category sketches and anomaly flags from history.
+    """
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        _rebuild_category_stats(conn.cursor(), user_id)
+
+# --- Insights Functions ---
+
+def get_user_ids_db():
+    with get_connection() as conn:
+        return [r[0] for r in conn.execute("SELECT id FROM users ORDER BY id")]
+
+def get_insights_db(user_id):
+    with get_connection() as conn:
+        res = conn.execute('''SELECT data_version, computed_version, computed_at, tips, reminders, predicted_total, predicted_savings
+                             FROM insights WHERE user_id = ?''', (user_id,)).fetchone()
+    if not res:
+        return None
+    return {"data_version": res[0], "computed_version": res[1], "computed_at": res[2],
+            "tips": json.loads(res[3]) if res[3] else [], "reminders": json.loads(res[4]) if res[4] else [],
+            "predicted_total": res[5], "predicted_savings": res[6]}
+
+def start_insights_db(user_ids):
+    """
+    Makes sure each user has an insights row and returns {user_id: data_version}.
+    Read this before loading the user's data; results saved with it are stale if data changes meanwhile.
+    """
+    with get_connection() as conn:
+        conn.executemany("INSERT OR IGNORE INTO insights (user_id) VALUES (?)", [(u,) for u in user_ids])
+        conn.executemany("UPDATE insights SET read_version = data_version WHERE user_id = ?", [(u,) for u in user_ids])
+        versions = {}
+        for start in range(0, len(user_ids), 500):
+            chunk = user_ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            versions.update(conn.execute(f"SELECT user_id, data_version FROM insights WHERE user_id IN ({placeholders})", chunk).fetchall())
+    return versions
+
+def save_insights_db(results):
+    """
+    results: list of (user_id, computed_version, insights dict) in one transaction.
+    """
+    computed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with get_connection() as conn:
+        conn.executemany('''UPDATE insights SET computed_version = ?, computed_at = ?, tips = ?, reminders = ?,
+                                                predicted_total = ?, predicted_savings = ?
+                              WHERE user_id = ?''',
+                         [(version, computed_at, json.dumps(i["tips"]), json.dumps(i["reminders"]),
+                           i["predicted_total"], i["predicted_savings"], user_id) for user_id, version, i in results])
+
+# --- Classifier Models ---
+
+def save_classifier_model_db(user_id, target, row_count, model):
+    with get_connection() as conn:
+        # An upsert keeps the row's rowid, so the change log sees an update rather than an unlogged delete
+        conn.execute('''INSERT INTO classifier_models (user_id, target, row_count, trained_at, model) VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(user_id, target) DO UPDATE SET row_count = excluded.row_count,
+                            trained_at = excluded.trained_at, model = excluded.model''',
+                     (user_id, target, row_count, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), model))
+
+def get_classifier_model_db(user_id, target):
+    """
+    (row_count, model bytes) of the user's stored model, or None. The bytes are empty when the
+    last training on row_count rows had too few rows or a single class for this target.
+    """
+    with get_connection() as conn:
+        row = conn.execute("SELECT row_count, model FROM classifier_models WHERE user_id = ? AND target = ?", (user_id, target)).fetchone()
+    return (row[0], bytes(row[1])) if row else None
+
 # --- Recurring Expense Functions ---
 
 def add_recurring_expense_db(user_id, amount, category, description, frequency, next_due_date):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    # Ensure recurring_expenses table exists
-    c.execute('''CREATE TABLE IF NOT EXISTS recurring_expenses (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        amount REAL,
-        category TEXT,
-        description TEXT,
-        frequency TEXT,
-        next_due_date TEXT,
-        FOREIGN KEY(user_id) REFERENCES users(id)
-    )''')
-    c.execute("INSERT INTO recurring_expenses (user_id, amount, category, description, frequency, next_due_date) VALUES (?, ?, ?, ?, ?, ?)",
-              (user_id, amount, category, description, frequency, next_due_date))
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        conn.execute("INSERT INTO recurring_expenses (user_id, amount, category, description, frequency, next_due_date, anchor_date) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (user_id, amount, category, description, frequency, next_due_date, next_due_date))
 
 def get_recurring_expenses_db(user_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    # Ensure recurring_expenses table exists
-    c.execute('''CREATE TABLE IF NOT EXISTS recurring_expenses (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        amount REAL,
-        category TEXT,
-        description TEXT,
-        frequency TEXT,
-        next_due_date TEXT,
-        FOREIGN KEY(user_id) REFERENCES users(id)
-    )''')
-    c.execute("SELECT id, amount, category, description, frequency, next_due_date FROM recurring_expenses WHERE user_id = ?", (user_id,))
-    rows = c.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        rows = conn.execute("SELECT id, amount, category, description, frequency, next_due_date FROM recurring_expenses WHERE user_id = ?", (user_id,)).fetchall()
     recurring = []
     for r in rows:
         recurring.append({
@@ -373,49 +1581,94 @@ def get_recurring_expenses_db(user_id):
         })
     return recurring
 
+def get_recurring_due_db(user_id, until):
+    """
+    Recurring expenses due on or before `until` ('YYYY-MM-DD'), for reminders.
+    """
+    with get_connection() as conn:
+        rows = conn.execute("SELECT id, amount, category, description, frequency, next_due_date FROM recurring_expenses WHERE user_id = ? AND next_due_date <= ?",
+                            (user_id, until)).fetchall()
+    return [{"id": r[0], "amount": r[1], "category": r[2], "description": r[3], "frequency": r[4], "next_due_date": r[5]}
+            for r in rows]
+
 def delete_recurring_expense_db(rec_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("DELETE FROM recurring_expenses WHERE id=?", (rec_id,))
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        conn.execute("DELETE FROM recurring_expenses WHERE id=?", (rec_id,))
+
+def recurring_hash(recurring_id, due_date):
+    # One posting per (recurring item, due date), so overlapping runs can never double-post
+    return hashlib.sha1(f"recurring|{recurring_id}|{due_date}".encode('utf-8')).hexdigest()
+
+def _due_occurrences(anchor, next_due, frequency, today):
+    """
+    Due dates from next_due through today, and the first one after today.
+    """
+    start = date.fromisoformat(anchor[:10]) if anchor else next_due
+    k = occurrence_index(start, next_due, frequency)
+    due = []
+    current = next_due
+    while current <= today:
+        due.append(current)
+        k += 1
+        current = add_period(start, frequency, k)
+    return due, current
+
+def materialize_recurring_db(today=None, user_id=None):
+    """
+    Posts every due occurrence of recurring expenses as transactions, catching up on all
+    missed periods, and moves next_due_date past today, in one write transaction.
+    Covers all users, or one user when user_id is given. Running it again posts nothing new.
+    Returns the number of transactions posted.
+    """
+    today = today or datetime.now().date()
+    today_text = today.strftime("%Y-%m-%d")
+    where, params = ("next_due_date <= ?", [today_text]) if user_id is None else ("user_id = ? AND next_due_date <= ?", [user_id, today_text])
+
+    # 1. Cheap indexed read first, so the common nothing-due case takes no write lock
+    with get_connection() as conn:
+        if conn.execute(f"SELECT 1 FROM recurring_expenses WHERE {where} LIMIT 1", params).fetchone() is None:
+            return 0
+
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        due_items = conn.execute(f"SELECT id, user_id, amount, category, description, frequency, next_due_date, anchor_date FROM recurring_expenses WHERE {where}",
+                                 params).fetchall()
+
+        # 2. One row per missed period, and where each schedule moves to
+        rows, advanced = [], []
+        for rec_id, uid, amount, category, description, frequency, next_due, anchor in due_items:
+            if frequency not in FREQUENCIES:
+                continue
+            try:
+                occurrences, following = _due_occurrences(anchor, date.fromisoformat(next_due[:10]), frequency, today)
+            except (TypeError, ValueError):
+                continue # Unreadable due date: leave the item alone
+            for due in occurrences:
+                date_text, date_epoch = normalize_date(due)
+                rows.append((uid, amount, category, description, date_text, date_epoch, 'expense', recurring_hash(rec_id, due.isoformat())))
+            advanced.append((following.isoformat(), rec_id, next_due))
+
+        # 3. Post and advance together; the content hash makes a repeated posting a no-op
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM expenses").fetchone()[0]
+        cur = conn.executemany("INSERT OR IGNORE INTO expenses (user_id, amount, category, description, date, date_epoch, transaction_type, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               rows)
+        posted = cur.rowcount if rows else 0
+        new_rows = conn.execute(f"SELECT id, user_id, category, amount FROM expenses WHERE id > ? AND {_SKETCHED_ROWS_SQL} ORDER BY id",
+                                (last_id,)).fetchall()
+        _update_category_stats(conn, new_rows)
+        conn.executemany("UPDATE recurring_expenses SET next_due_date = ? WHERE id = ? AND next_due_date = ?", advanced)
+    return posted
 
 # --- Investment Functions ---
 
 def add_investment_db(user_id, name, amount, type, start_date, frequency):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS investments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        name TEXT,
-        amount REAL,
-        type TEXT,
-        start_date TEXT,
-        frequency TEXT,
-        FOREIGN KEY(user_id) REFERENCES users(id)
-    )''')
-    c.execute("INSERT INTO investments (user_id, name, amount, type, start_date, frequency) VALUES (?, ?, ?, ?, ?, ?)",
-              (user_id, name, amount, type, start_date, frequency))
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        conn.execute("INSERT INTO investments (user_id, name, amount, type, start_date, frequency) VALUES (?, ?, ?, ?, ?, ?)",
+                     (user_id, name, amount, type, start_date, frequency))
 
 def get_investments_db(user_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS investments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        name TEXT,
-        amount REAL,
-        type TEXT,
-        start_date TEXT,
-        frequency TEXT,
-        FOREIGN KEY(user_id) REFERENCES users(id)
-    )''')
-    c.execute("SELECT id, name, amount, type, start_date, frequency FROM investments WHERE user_id = ?", (user_id,))
-    rows = c.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        rows = conn.execute("SELECT id, name, amount, type, start_date, frequency FROM investments WHERE user_id = ?", (user_id,)).fetchall()
     investments = []
     for r in rows:
         investments.append({
@@ -429,9 +1682,11 @@ def get_investments_db(user_id):
     return investments
 
 def delete_investment_db(inv_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("DELETE FROM investments WHERE id=?", (inv_id,))
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        conn.execute("DELETE FROM investments WHERE id=?", (inv_id,))
 
+if __name__ == "__main__":
+    # Deploy-time entry point: python database.py
+    versions = migrate_db()
+    print(f"Applied migrations: {versions}" if versions else "Schema is up to date.")
+    print(f"Schema version: {get_schema_version()}")
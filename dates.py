@@ -0,0 +1,109 @@
+import calendar
+from datetime import datetime, timedelta, date as date_type
+
+import numpy as np
+import pandas as pd
+
+# Transaction dates are stored in one canonical form, written once on the way in:
+#   date        'YYYY-MM-DD HH:MM:SS' text (sorts and compares correctly as text)
+#   date_epoch  the same wall-clock time as integer seconds since 1970-01-01 (no timezone)
+# Read paths can then compare, sort and bucket without parsing mixed formats.
+CANONICAL_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Tried in order after ISO-8601; the numeric ones are ambiguous, so the caller picks the order
+_MONTHFIRST_FORMATS = ("%m/%d/%Y", "%m-%d-%Y", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M")
+_DAYFIRST_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d.%m.%Y")
+_NAMED_MONTH_FORMATS = ("%d %b %Y", "%d-%b-%Y", "%d-%b-%y", "%b %d, %Y", "%d %B %Y", "%B %d, %Y")
+
+_EPOCH = datetime(1970, 1, 1)
+_OFFSET = r"(\d{2}:\d{2}(?::\d{2})?(?:\.\d+)?)\s*(?:Z|[+-]\d{2}:?\d{2})$"
+
+def to_epoch(dt):
+    return int((dt - _EPOCH).total_seconds())
+
+# Recurring expense frequencies (as offered on the Recurring page)
+FREQUENCIES = ("Weekly", "Monthly", "Yearly")
+
+def add_period(start, frequency, k=1):
+    """
+    The k-th occurrence after `start` (a date) for a Weekly/Monthly/Yearly schedule.
+    Counting from the same anchor keeps month-end schedules on the month end
+    (Jan 31 -> Feb 28 -> Mar 31) instead of drifting to the 28th.
+    """
+    if frequency == "Weekly":
+        return start + timedelta(weeks=k)
+    if frequency == "Monthly":
+        month = start.month - 1 + k
+        year, month = start.year + month // 12, month % 12 + 1
+    elif frequency == "Yearly":
+        year, month = start.year + k, start.month
+    else:
+        raise ValueError(f"Unknown frequency: {frequency}")
+    return start.replace(year=year, month=month, day=min(start.day, calendar.monthrange(year, month)[1]))
+
+def occurrence_index(anchor, due, frequency):
+    """
+    Which occurrence of the schedule starting at `anchor` falls on `due` (inverse of add_period).
+    """
+    if frequency == "Weekly":
+        return (due - anchor).days // 7
+    if frequency == "Monthly":
+        return (due.year - anchor.year) * 12 + due.month - anchor.month
+    if frequency == "Yearly":
+        return due.year - anchor.year
+    raise ValueError(f"Unknown frequency: {frequency}")
+
+def normalize_date(value, dayfirst=False):
+    """
+    Scalar version of normalize_dates for single writes. Returns (date, epoch).
+    """
+    if isinstance(value, datetime):
+        dt = value.replace(tzinfo=None, microsecond=0)
+        return dt.strftime(CANONICAL_FORMAT), to_epoch(dt)
+    if isinstance(value, date_type):
+        dt = datetime(value.year, value.month, value.day)
+        return dt.strftime(CANONICAL_FORMAT), to_epoch(dt)
+    if isinstance(value, str):
+        # Fast path: already canonical
+        try:
+            return value, to_epoch(datetime.strptime(value, CANONICAL_FORMAT))
+        except ValueError:
+            pass
+    dates, epochs = normalize_dates([value], dayfirst=dayfirst)
+    return dates[0], epochs[0]
+
+def normalize_dates(values, dayfirst=False):
+    """
+    Parses a batch of dates in whatever formats they arrive in, vectorized.
+    ISO-8601 input takes the fast path; the rest is parsed with per-element format inference
+    (dayfirst for DD/MM/YYYY statements). Timezone offsets are dropped, keeping wall-clock time.
+    Returns (dates, epochs) lists: canonical strings and integer epoch seconds. Values that
+    can't be parsed keep their original text (None stays None) with a None epoch.
+    """
+    raw = pd.Series(list(values), dtype="object")
+    if raw.empty:
+        return [], []
+    text = raw.map(lambda v: v if v is None or isinstance(v, str) else str(v)).str.strip()
+    # Keep the wall-clock time of offset timestamps; mixed offsets can't share one column
+    text = text.str.replace(_OFFSET, r"\1", regex=True)
+
+    # 1. ISO-8601 in one pass, then common statement formats, each a vectorized parse of
+    # the rows still missing; per-element format inference only for what is left after that
+    parsed = pd.to_datetime(text, format="ISO8601", errors="coerce")
+    for fmt in (_DAYFIRST_FORMATS if dayfirst else _MONTHFIRST_FORMATS) + _NAMED_MONTH_FORMATS + (None,):
+        missing = parsed.isna() & text.notna() & (text != "")
+        if not missing.any():
+            break
+        if fmt is None:
+            parsed[missing] = pd.to_datetime(text[missing], format="mixed", dayfirst=dayfirst, errors="coerce")
+        else:
+            parsed[missing] = pd.to_datetime(text[missing], format=fmt, errors="coerce")
+
+    # 2. Canonical text and epoch seconds straight from the datetime64 values
+    seconds = parsed.to_numpy(dtype="datetime64[s]")
+    ok = ~np.isnat(seconds)
+    canonical = np.char.replace(np.datetime_as_string(seconds, unit="s"), "T", " ")
+    epochs = seconds.view("i8")
+
+    dates = np.where(ok, canonical, raw.to_numpy()).tolist()
+    return dates, [int(e) if good else None for e, good in zip(epochs, ok)]
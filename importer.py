@@ -0,0 +1,172 @@
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from database import (
+    prepare_expense_rows, insert_expense_rows_db, start_import_batch_db, rollback_import, DuplicateCounter, IMPORT_CHUNK_SIZE
+)
+from categorizer import lower_series
+from merchant_memory import load_merchant_index, categorize_with_memory
+from classifier import load_user_models, predict_confident
+
+# Streaming statement import: the CSV is read, categorized, classified and inserted one
+# chunk at a time, so memory depends on the chunk size rather than on the file size.
+
+# dtype each statement column is read as (amounts may use thousands separators)
+COLUMN_DTYPES = {"date": str, "description": str, "amount": "float64", "type": str}
+INCOME_KEYWORDS = ['salary', 'credit', 'interest', 'refund', 'dividend', 'deposit']
+# Words in a statement's type column marking a credit or a debit ('credit' wins if both appear)
+CREDIT_TYPES = ['credit', 'cr', 'income']
+DEBIT_TYPES = ['debit', 'dr', 'expense']
+
+def detect_columns(columns):
+    """
+    Maps the statement's own column names to date, description, amount and type.
+    Returns {target: column}; date and amount are required by the caller.
+    """
+    col_map = {}
+    for col in columns:
+        name = str(col).lower().strip()
+        if "date" in name: col_map["date"] = col
+        elif "desc" in name or "particulars" in name or "narration" in name: col_map["description"] = col
+        elif "amount" in name or "debit" in name or "credit" in name: col_map["amount"] = col
+        elif "type" in name or "cr/dr" in name: col_map["type"] = col
+    return col_map
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+def read_statement_chunks(source, chunksize=IMPORT_CHUNK_SIZE):
+    """
+    Reads a statement CSV (path or binary file object) chunksize rows at a time with explicit dtypes.
+    Yields DataFrames with date, description, amount and, if the file has one, type columns.
+    Raises ValueError if the file can't be read or has no date or amount column.
+    """
+    _rewind(source)
+    col_map = detect_columns(pd.read_csv(source, nrows=0).columns)
+    if "date" not in col_map or "amount" not in col_map:
+        raise ValueError("Could not find the date and amount columns")
+    _rewind(source)
+    reader = pd.read_csv(source, usecols=list(col_map.values()), chunksize=chunksize, thousands=",",
+                         dtype={col: COLUMN_DTYPES[target] for target, col in col_map.items()})
+    with reader:
+        for chunk in reader:
+            chunk = chunk.rename(columns={col: target for target, col in col_map.items()})
+            if "description" not in chunk.columns:
+                chunk["description"] = "Imported Transaction"
+            yield chunk
+
+def _pattern(words):
+    return re.compile("|".join(re.escape(w) for w in words))
+
+# Compiled once per process
+_INCOME_RE = _pattern(INCOME_KEYWORDS)
+_CREDIT_RE = _pattern(CREDIT_TYPES)
+_DEBIT_RE = _pattern(DEBIT_TYPES)
+
+def _column(values, index):
+    # Lines a column up with the descriptions by position, keeping its dtype
+    return pd.Series(values).set_axis(index)
+
+def classify_transactions(descriptions, amounts, categories, model_types=None, type_values=None):
+    """
+    Transaction type and amount to store for every row of a statement, one vectorized pass per rule:
+    - a positive amount is income if its category is Salary, anything else is an expense
+    - a confident model type (None where there is none) replaces the income keyword rule,
+      which makes a row income if its description contains any of INCOME_KEYWORDS
+    - the statement's own type column, where filled in, has the last word
+    Inputs are matched by position. Amounts are stored positive.
+    Returns (types, amounts) Series aligned with descriptions.
+    """
+    descriptions = pd.Series(descriptions)
+    index = descriptions.index
+    amounts = np.asarray(amounts, dtype=np.float64)
+    text = lower_series(descriptions)
+    keyword = text.str.contains(_INCOME_RE.pattern, regex=True, na=False).to_numpy(dtype=bool)
+    salary = _column(categories, index).eq('Salary').to_numpy(dtype=bool)
+
+    # 1. Keywords or sign and category, then a confident model on top
+    tx_types = np.where(keyword | ((amounts > 0) & salary), 'income', 'expense').astype(object)
+    if model_types is not None:
+        model_types = np.asarray(model_types, dtype=object)
+        predicted = pd.notna(model_types)
+        tx_types[predicted] = model_types[predicted]
+
+    # 2. Explicit type column (credit wins over debit)
+    if type_values is not None:
+        type_values = _column(type_values, index)
+        filled = type_values.notna().to_numpy(dtype=bool)
+        t = lower_series(type_values)
+        tx_types[filled & t.str.contains(_DEBIT_RE.pattern, regex=True, na=False).to_numpy(dtype=bool)] = 'expense'
+        tx_types[filled & t.str.contains(_CREDIT_RE.pattern, regex=True, na=False).to_numpy(dtype=bool)] = 'income'
+
+    # Every branch stores the amount as positive
+    return pd.Series(tx_types, index=index, dtype=object), pd.Series(np.abs(amounts), index=index)
+
+def classify_chunk(chunk, user_id, index=None, models=None):
+    """
+    Turns one chunk of a statement into add_expense_batch_db rows: categories from merchant
+    memory, the user's models and keyword rules, then type and amount for the whole chunk.
+    Returns (rows, categorize_with_memory stats).
+    """
+    models = models or {}
+    categories, stats = categorize_with_memory(chunk["description"], user_id, index=index, model=models.get("category"))
+    model_types = predict_confident(models.get("type"), chunk["description"])
+    tx_types, amounts = classify_transactions(chunk["description"], chunk["amount"], categories, model_types,
+                                              chunk["type"] if "type" in chunk.columns else None)
+
+    descriptions = [str(d) for d in chunk["description"]]
+    dates = [str(d) for d in chunk["date"]]
+    rows = list(zip([user_id] * len(chunk), amounts.tolist(), categories.tolist(), descriptions, dates, tx_types.tolist()))
+    return rows, stats
+
+def import_statement(source, user_id, filename=None, dayfirst=False, chunksize=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Streams a statement CSV (path or binary file object) into the user's expenses as one import batch.
+    Each chunk is categorized, classified and inserted in its own transaction; if the import
+    fails part way, the rows already inserted are rolled back and the error is raised.
+    progress(fraction, stats) is called after every chunk.
+    Returns stats: import_batch_id, rows, inserted, skipped, unreadable_dates (rows whose date
+    couldn't be parsed, kept as-is), hits, hit_rate, model_hits and seconds.
+    """
+    start = time.perf_counter()
+    if filename is None:
+        filename = os.path.basename(source) if isinstance(source, str) else getattr(source, "name", "statement.csv")
+    handle = open(source, "rb") if isinstance(source, str) else source
+    try:
+        _rewind(handle)
+        size = handle.seek(0, os.SEEK_END) or 1
+        # 1. Everything reused across chunks: learned merchants, the user's models, duplicate numbering.
+        # Models are trained offline (classifier.run_training_job); until one exists the rules categorize
+        index = load_merchant_index(user_id)
+        models = load_user_models(user_id, train=False)
+        seen = DuplicateCounter()
+        stats = {"import_batch_id": start_import_batch_db(user_id, filename),
+                 "rows": 0, "inserted": 0, "skipped": 0, "unreadable_dates": 0, "hits": 0, "model_hits": 0}
+        try:
+            # 2. One chunk at a time: categorize, classify, insert
+            for chunk in read_statement_chunks(handle, chunksize):
+                rows, chunk_stats = classify_chunk(chunk, user_id, index, models)
+                rows = prepare_expense_rows(rows, dayfirst, seen)
+                inserted, skipped = insert_expense_rows_db(rows, import_batch_id=stats["import_batch_id"])
+                stats["rows"] += len(rows)
+                stats["inserted"] += inserted
+                stats["skipped"] += skipped
+                stats["unreadable_dates"] += sum(row[5] is None for row in rows)
+                stats["hits"] += chunk_stats["hits"]
+                stats["model_hits"] += chunk_stats["model_hits"]
+                if progress:
+                    progress(min(handle.tell() / size, 1.0), stats)
+        except Exception:
+            rollback_import(stats["import_batch_id"], user_id)
+            raise
+    finally:
+        if handle is not source:
+            handle.close()
+    stats["hit_rate"] = stats["hits"] / stats["rows"] if stats["rows"] else 0.0
+    stats["seconds"] = time.perf_counter() - start
+    return stats
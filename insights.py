@@ -0,0 +1,100 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import database
+from database import (
+    get_user_summary_db, get_recurring_due_db,
+    get_user_ids_db, get_insights_db, start_insights_db, save_insights_db
+)
+from ai_logic import predict_month_end, generate_savings_tips, check_recurring_reminders, REMINDER_DAYS
+from analytics import load_analytics_frame
+
+# Users per task handed to a worker; small enough to balance, large enough to amortize startup.
+SHARD_SIZE = 50
+
+def compute_user_insights(user_id):
+    """
+    Runs the per-user analysis the Dashboard and Insights pages show.
+    Returns {'tips', 'reminders', 'predicted_total', 'predicted_savings'}.
+    """
+    frame = load_analytics_frame(user_id, types=['expense'])
+    current_balance = get_user_summary_db(user_id)['current_balance']
+    predicted_total, predicted_savings = predict_month_end(frame, current_balance)
+    return {
+        "tips": generate_savings_tips(frame),
+        # Only items due within the reminder window (or overdue) are read
+        "reminders": check_recurring_reminders(get_recurring_due_db(user_id, (datetime.now() + timedelta(days=REMINDER_DAYS)).strftime("%Y-%m-%d"))),
+        "predicted_total": float(predicted_total),
+        "predicted_savings": float(predicted_savings),
+    }
+
+def is_fresh(row):
+    # Forecasts and reminders depend on today's date as well as the data
+    return (row is not None and row["computed_version"] == row["data_version"]
+            and (row["computed_at"] or "")[:10] == datetime.now().strftime("%Y-%m-%d"))
+
+def get_user_insights(user_id):
+    """
+    Dashboard read path: the precomputed row when it is still current, otherwise
+    recompute inline and store the result.
+    """
+    row = get_insights_db(user_id)
+    if is_fresh(row):
+        return row
+    version = start_insights_db([user_id])[user_id]
+    result = compute_user_insights(user_id)
+    save_insights_db([(user_id, version, result)])
+    return result
+
+def _compute_shard(args):
+    db_file, shard = args
+    if database.DB_FILE != db_file:
+        database.set_db_file(db_file)
+    return [(user_id, version, compute_user_insights(user_id)) for user_id, version in shard]
+
+def run_insights_job(workers=None, user_ids=None, shard_size=SHARD_SIZE):
+    """
+    Computes insights for every user (or the given ones), sharded across a process pool.
+    Results are written by this process as shards finish. Returns (users, seconds).
+    """
+    start = time.perf_counter()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    user_ids = get_user_ids_db() if user_ids is None else list(user_ids)
+
+    # 1. Snapshot each user's data version before any data is read
+    versions = start_insights_db(user_ids)
+    items = [(u, versions[u]) for u in user_ids]
+    shards = [(database.DB_FILE, items[i:i + shard_size]) for i in range(0, len(items), shard_size)]
+
+    # 2. Compute, in-process when workers is 0
+    if workers <= 0:
+        for shard in shards:
+            save_insights_db(_compute_shard(shard))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as ex:
+            for results in ex.map(_compute_shard, shards):
+                save_insights_db(results)
+
+    return len(user_ids), time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute insights for every user.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count, 0 = in-process)")
+    parser.add_argument("--db", default=None, help="Database file (default: EXPENSES_DB or bank.db)")
+    args = parser.parse_args()
+
+    if args.db:
+        database.set_db_file(args.db)
+    database.init_db()
+    workers = (os.cpu_count() or 1) if args.workers is None else args.workers
+    users, seconds = run_insights_job(workers)
+    rate = users / seconds if seconds else 0.0
+    print(f"Computed insights for {users} users in {seconds:.2f}s ({rate:,.1f} users/sec, {workers} workers)")
+
+if __name__ == "__main__":
+    main()
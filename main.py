@@ -3,26 +3,46 @@ import pandas as pd
 import plotly.express as px
 import time
 import os
+import io
+import tempfile
 from datetime import datetime
 
 # Import Database Functions
 from database import (
     init_db, create_user, authenticate_user, 
-    add_expense_db, get_expenses_db, set_initial_balance_db, get_initial_balance_db,
-    add_recurring_expense_db, get_recurring_expenses_db, delete_recurring_expense_db,
-    add_expense_batch_db, create_session, validate_session, delete_session,
+    add_expense_db, set_initial_balance_db, get_initial_balance_db,
+    add_recurring_expense_db, get_recurring_expenses_db, delete_recurring_expense_db, materialize_recurring_db,
+    create_session, validate_session, delete_session,
     add_investment_db, get_investments_db, delete_investment_db,
-    archive_and_reset_expenses, get_archived_expenses, undo_last_reset
+    archive_and_reset_expenses, get_archived_expenses, undo_last_reset,
+    get_expenses_page, iter_expenses_pages, get_expense_categories_db,
+    get_user_summary_db, get_category_totals_db, get_monthly_totals_db, get_daily_totals_db,
+    get_category_month_totals_db, get_first_transaction_date_db,
+    apply_import_balance_adjustment_db, rollback_import, get_import_batches_db,
+    set_expense_category_db,
+    get_anomaly_alerts_db
 )
 
 # Import AI Logic
-from ai_logic import detect_anomalies, predict_month_end, generate_savings_tips, check_recurring_reminders
+from ai_logic import format_anomaly_alert
+from insights import get_user_insights
+
+# Import Backup Engine
+from backup import create_backup, list_backups, restore_backup, BACKUP_KEEP
 
 # Import UI Utils
-from ui_utils import get_category_icon, get_custom_css, generate_backup, parse_bank_statement, auto_categorize
+from ui_utils import get_category_icon, get_custom_css, generate_backup
+from importer import read_statement_chunks, import_statement
+from dates import normalize_dates
+
+# Rows per page on the History page
+HISTORY_PAGE_SIZE = 50
+
+# Statement rows shown before an import
+PREVIEW_ROWS = 5
 
-# Initialize DB
-init_db()
+# Expense categories offered when adding or recategorizing
+CATEGORIES = ["Food", "Transport", "Utilities", "Entertainment", "Shopping", "Health", "Education", "Other"]
 
 def main():
     st.set_page_config(page_title="Expenses Analysis", page_icon="💰", layout="wide")
@@ -199,51 +219,48 @@ def dashboard_page():
 
     # Fetch Data for Current User
     user_id = st.session_state.user_id
-    expenses = get_expenses_db(user_id)
+    # Post any recurring expenses that have come due (an index probe when nothing is due)
+    posted = materialize_recurring_db(user_id=user_id)
+    if posted:
+        st.toast(f"Posted {posted} recurring transaction(s)", icon="🔄")
     initial_balance = get_initial_balance_db(user_id)
     recurring = get_recurring_expenses_db(user_id)
     investments = get_investments_db(user_id) # Fetch investments
     
-    # Process Income vs Expenses
-    total_income = sum(e['amount'] for e in expenses if e.get('type') == 'income')
-    total_spent = sum(e['amount'] for e in expenses if e.get('type') == 'expense')
+    # Income vs Expenses, kept up to date by triggers on every write
+    summary = get_user_summary_db(user_id)
+    total_income = summary['income_total']
+    total_spent = summary['expense_total']
     
     # Net Worth = Initial + Income - Expenses
-    current_balance = initial_balance + total_income - total_spent
+    current_balance = summary['current_balance']
     net_worth = current_balance # checks out basically
     
     # Calculate Average Daily (Expenses Only)
-    expense_data = [e for e in expenses if e.get('type') == 'expense']
-    if expense_data:
-        dates = []
-        for e in expense_data:
-            try:
-                # Try full format first
-                d = datetime.strptime(e['date'], "%Y-%m-%d %H:%M:%S").date()
-            except ValueError:
-                try:
-                    # Fallback to just date
-                    d = datetime.strptime(e['date'], "%Y-%m-%d").date()
-                except ValueError:
-                    # Fallback to today if parsing fails entirely, to prevent crash
-                    d = datetime.now().date()
-            dates.append(d)
-            
-        first_date = min(dates)
+    # The full history isn't loaded per rerun; pages use SQL aggregates and insights the analytics frame
+    has_expenses = bool(get_expenses_page(user_id, 1, types=['expense'])[0])
+    first_expense = get_first_transaction_date_db(user_id, types=['expense'])
+    if first_expense:
+        # Stored dates are canonical, so the first ten characters are always YYYY-MM-DD
+        first_date = datetime.strptime(first_expense[:10], "%Y-%m-%d").date()
         days_active = (datetime.now().date() - first_date).days + 1
         avg_daily = total_spent / days_active
     else:
         avg_daily = 0.0
 
     # --- AI Analysis (on Expense Data Only) ---
-    anomalies = detect_anomalies(expense_data)
-    reminders = check_recurring_reminders(recurring)
-    tips = generate_savings_tips(expense_data)
+    # Precomputed by the nightly insights job; recomputed here only if the data changed since
+    insights = get_user_insights(user_id)
+    reminders = insights['reminders']
+    tips = insights['tips']
 
     # Main Content
     if st.session_state.page == "Dashboard":
         
         # --- Smart Alerts Section ---
+        # Flags are set when transactions are added, against the streaming category stats
+        anomalies = [format_anomaly_alert(a['amount'], a['category'], a['description'], a['median'])
+                     for a in get_anomaly_alerts_db(user_id)]
         if anomalies or reminders:
             with st.expander("🔔 Smart Alerts & Reminders", expanded=True):
                 for alert in reminders:
@@ -276,14 +293,12 @@ def dashboard_page():
 
         col_chart1, col_chart2 = st.columns(2)
         
-        if expense_data:
-            df = pd.DataFrame(expense_data)
-            # Add Icons to Category
-            df['display_category'] = df['category'].apply(lambda x: f"{get_category_icon(x)} {x}")
-            
+        if has_expenses:
             with col_chart1:
                 st.write("#### Expenses by Category")
-                category_data = df.groupby("display_category")["amount"].sum().reset_index()
+                category_data = pd.DataFrame(get_category_totals_db(user_id, types=['expense']))
+                # Add Icons to Category
+                category_data['display_category'] = category_data['category'].apply(lambda x: f"{get_category_icon(x)} {x}")
                 
                 fig = px.pie(category_data, values='amount', names='display_category', 
                              hole=0.5,
@@ -299,10 +314,11 @@ def dashboard_page():
             with col_chart2:
                 st.write("#### Recent Activity")
                 # Show mix of income and expense
-                full_df = pd.DataFrame(expenses)
+                recent_rows, _ = get_expenses_page(user_id, 5)
+                full_df = pd.DataFrame(recent_rows)
                 full_df['display_category'] = full_df.apply(lambda x: f"💰 {x['category']}" if x['type'] == 'income' else f"{get_category_icon(x['category'])} {x['category']}", axis=1)
                 
-                recent_df = full_df[['date', 'display_category', 'amount', 'type']].head(5)
+                recent_df = full_df[['date', 'display_category', 'amount', 'type']]
                 recent_df.columns = ['Date', 'Category', 'Amount', 'Type']
                 
                 # Color code type? Streamlit dataframe doesn't support generic row coloring easily, 
@@ -320,7 +336,7 @@ def dashboard_page():
         st.subheader("📈 Analytics & Insights")
         
         # Forecast
-        predicted_total, predicted_savings = predict_month_end(expense_data, current_balance)
+        predicted_total, predicted_savings = insights['predicted_total'], insights['predicted_savings']
         
         with st.container():
             st.markdown("#### 🔮 AI Predictions (Month End)")
@@ -332,12 +348,16 @@ def dashboard_page():
         
         st.divider()
         
-        if expense_data:
-            df = pd.DataFrame(expense_data)
-            df['date'] = pd.to_datetime(df['date'])
-            df['month'] = df['date'].dt.to_period('M').astype(str)
-            df['day'] = df['date'].dt.date
-            df['display_category'] = df['category'].apply(lambda x: f"{get_category_icon(x)} {x}")
+        if has_expenses:
+            # Rollups come straight from GROUP BY queries
+            # Rows whose date can't be read are left out of the date buckets, so these may be empty
+            monthly = pd.DataFrame(get_monthly_totals_db(user_id, types=['expense']), columns=['month', 'amount'])
+            daily = pd.DataFrame(get_daily_totals_db(user_id, types=['expense']), columns=['day', 'amount'])
+            daily['day'] = pd.to_datetime(daily['day']).dt.date
+            by_category = pd.DataFrame(get_category_totals_db(user_id, types=['expense']))
+            by_category['display_category'] = by_category['category'].apply(lambda x: f"{get_category_icon(x)} {x}")
+            cat_month = pd.DataFrame(get_category_month_totals_db(user_id, types=['expense']), columns=['category', 'month', 'amount'])
+            cat_month['display_category'] = cat_month['category'].apply(lambda x: f"{get_category_icon(x)} {x}")
             
             # --- Key Insights ---
             st.markdown("#### 💡 Smart Insights")
@@ -347,8 +367,8 @@ def dashboard_page():
             current_month = datetime.now().strftime('%Y-%m')
             last_month = (datetime.now() - pd.DateOffset(months=1)).strftime('%Y-%m')
             
-            this_month_spent = df[df['month'] == current_month]['amount'].sum()
-            last_month_spent = df[df['month'] == last_month]['amount'].sum()
+            this_month_spent = monthly.loc[monthly['month'] == current_month, 'amount'].sum()
+            last_month_spent = monthly.loc[monthly['month'] == last_month, 'amount'].sum()
             
             diff = this_month_spent - last_month_spent
             delta_color = "inverse" if diff > 0 else "normal" # Red if spent more
@@ -356,18 +376,19 @@ def dashboard_page():
             with col1:
                 st.metric("This Month vs Last", f"₹{this_month_spent:,.2f}", delta=f"₹{diff:,.2f}", delta_color=delta_color)
 
-            # Top Category
-            top_cat = df.groupby('display_category')['amount'].sum().idxmax()
-            top_cat_amount = df.groupby('display_category')['amount'].sum().max()
+            # Top Category (rows are ordered largest first)
+            top_cat = by_category['display_category'].iloc[0]
+            top_cat_amount = by_category['amount'].iloc[0]
             with col2:
                 st.metric("Top Spending Category", top_cat, f"₹{top_cat_amount:,.2f}")
                 
             # Highest Spending Day
-            daily_sum = df.groupby('day')['amount'].sum()
-            max_day = daily_sum.idxmax()
-            max_day_val = daily_sum.max()
-            with col3:
-                st.metric("Highest Spending Day", max_day.strftime('%d %b'), f"₹{max_day_val:,.2f}")
+            if not daily.empty:
+                daily_sum = daily.set_index('day')['amount']
+                max_day = daily_sum.idxmax()
+                max_day_val = daily_sum.max()
+                with col3:
+                    st.metric("Highest Spending Day", max_day.strftime('%d %b'), f"₹{max_day_val:,.2f}")
 
             st.divider()
             
@@ -376,16 +397,15 @@ def dashboard_page():
             
             with col_chart1:
                 st.write("#### 📅 Daily Spending Trend")
-                daily_trend = df.groupby('day')['amount'].sum().reset_index()
-                fig_line = px.line(daily_trend, x='day', y='amount', markers=True, 
+                fig_line = px.line(daily, x='day', y='amount', markers=True, 
                                    line_shape='spline', color_discrete_sequence=['#4C51BF'])
                 fig_line.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(color="#E2E8F0" if st.session_state.theme == "Dark" else "#212529"))
                 st.plotly_chart(fig_line, use_container_width=True)
 
             with col_chart2:
                 st.write("#### 🗓️ Monthly Spending")
-                # Stacked Bar: Group by Month AND Category
-                monthly_trend = df.groupby(['month', 'display_category'])['amount'].sum().reset_index()
+                # Stacked Bar: Month AND Category
+                monthly_trend = cat_month[['month', 'display_category', 'amount']].copy()
                 monthly_trend['amount'] = monthly_trend['amount'].round(2)
                 
                 fig_bar = px.bar(monthly_trend, x='month', y='amount', color='display_category',
@@ -402,7 +422,7 @@ def dashboard_page():
                 
             # Detailed Breakdown Table
             with st.expander("View Detailed Category Breakdown"):
-                cat_month_pivot = df.pivot_table(index='display_category', columns='month', values='amount', aggfunc='sum', fill_value=0)
+                cat_month_pivot = cat_month.pivot_table(index='display_category', columns='month', values='amount', aggfunc='sum', fill_value=0)
                 st.dataframe(cat_month_pivot, use_container_width=True)
 
         else:
@@ -444,8 +464,7 @@ def dashboard_page():
                 with col2:
                     if tx_type == "Expense":
                         # Categories with Icons
-                        cats = ["Food", "Transport", "Utilities", "Entertainment", "Shopping", "Health", "Education", "Other"]
-                        cat_map = {c: f"{get_category_icon(c)} {c}" for c in cats}
+                        cat_map = {c: f"{get_category_icon(c)} {c}" for c in CATEGORIES}
                         selected_display = st.selectbox("Category", list(cat_map.values()))
                         category = [k for k, v in cat_map.items() if v == selected_display][0]
                     else:
@@ -467,142 +486,240 @@ def dashboard_page():
     elif st.session_state.page == "History":
         st.subheader("📜 Complete History")
         
-        if expenses:
-            df = pd.DataFrame(expenses)
-            
-            # Enhance DF
-            df['display_category'] = df.apply(lambda x: f"💰 {x['category']}" if x['type'] == 'income' else f"{get_category_icon(x['category'])} {x['category']}", axis=1)
-            
+        categories = get_expense_categories_db(user_id)
+        if categories:
             with st.expander("🔎 Filter Options"):
                 col1, col2, col3 = st.columns(3)
                 with col1:
-                    filter_category = st.multiselect("Filter by Category", df['display_category'].unique())
-                with col2:
+                    filter_category = st.multiselect("Filter by Category", categories, format_func=lambda c: f"{get_category_icon(c)} {c}")
                     filter_type = st.multiselect("Filter by Type", ["expense", "income"])
+                with col2:
+                    filter_start = st.date_input("From", value=None)
+                    filter_end = st.date_input("To", value=None)
+                with col3:
+                    filter_min = st.number_input("Min Amount (₹)", min_value=0.0, value=None, step=100.0)
+                    filter_max = st.number_input("Max Amount (₹)", min_value=0.0, value=None, step=100.0)
+            
+            # Filters run in SQL; only one page of rows is ever loaded
+            filters = {
+                "categories": filter_category, "types": filter_type,
+                "start_date": filter_start, "end_date": filter_end,
+                "min_amount": filter_min, "max_amount": filter_max,
+            }
+            
+            # Back to the first page whenever the filters change
+            filter_key = repr(filters)
+            if st.session_state.get('history_filter_key') != filter_key:
+                st.session_state.history_filter_key = filter_key
+                st.session_state.history_cursors = [None]
+                st.session_state.pop('history_csv', None)
+            cursors = st.session_state.history_cursors
+            
+            page_rows, next_cursor = get_expenses_page(user_id, HISTORY_PAGE_SIZE, after=cursors[-1], **filters)
+            
+            if page_rows:
+                df = pd.DataFrame(page_rows)
+                df['display_category'] = df.apply(lambda x: f"💰 {x['category']}" if x['type'] == 'income' else f"{get_category_icon(x['category'])} {x['category']}", axis=1)
+                
+                show_df = df[['date', 'display_category', 'description', 'amount', 'type']]
+                show_df.columns = ['Date', 'Category', 'Description', 'Amount', 'Type']
+                st.dataframe(show_df, use_container_width=True, height=500, hide_index=True)
+                
+                # Recategorizing teaches the merchant memory used on the next import
+                with st.expander("✏️ Recategorize a Transaction"):
+                    labels = {r['id']: f"{r['date'][:10]} · {r['description']} · ₹{r['amount']:,.2f} ({r['category']})" for r in page_rows}
+                    expense_id = st.selectbox("Transaction", list(labels), format_func=labels.get)
+                    new_category = st.selectbox("New Category", CATEGORIES, format_func=lambda c: f"{get_category_icon(c)} {c}", key="recat_category")
+                    if st.button("Save Category"):
+                        set_expense_category_db(expense_id, new_category)
+                        st.toast("Category updated. Future imports from this merchant will use it.", icon="🧠")
+                        st.rerun()
+            else:
+                st.info("No transactions match these filters.")
             
-            if filter_category:
-                df = df[df['display_category'].isin(filter_category)]
-            
-            if filter_type:
-                df = df[df['type'].isin(filter_type)]
-            
-            # Show display_category but keep original for download/logic if needed
-            show_df = df[['date', 'display_category', 'description', 'amount', 'type']]
-            show_df.columns = ['Date', 'Category', 'Description', 'Amount', 'Type']
-            
-            # Color amounts differently? 
-            # Streamlit doesn't support conditional formatting in basic dataframe easily without styling (Pandas Styler), 
-            # but standard view is fine for now.
-            st.dataframe(show_df, use_container_width=True, height=500, hide_index=True)
+            col_prev, col_page, col_next = st.columns([1, 2, 1])
+            with col_prev:
+                if st.button("⬅️ Newer", disabled=len(cursors) == 1, use_container_width=True):
+                    cursors.pop()
+                    st.rerun()
+            with col_page:
+                st.markdown(f"<p style='text-align: center;'>Page {len(cursors)}</p>", unsafe_allow_html=True)
+            with col_next:
+                if st.button("Older ➡️", disabled=next_cursor is None, use_container_width=True):
+                    cursors.append(next_cursor)
+                    st.rerun()
             
-            st.download_button(
-                label="📥 Download CSV",
-                data=df.to_csv(index=False).encode('utf-8'),
-                file_name='expenses.csv',
-                mime='text/csv',
-            )
+            # Export walks every page of the filtered result, so build it only on request
+            if st.button("📄 Prepare CSV Export"):
+                buf = io.StringIO()
+                for i, chunk in enumerate(iter_expenses_pages(user_id, **filters)):
+                    pd.DataFrame(chunk).to_csv(buf, index=False, header=(i == 0))
+                st.session_state.history_csv = buf.getvalue().encode('utf-8')
+            
+            if 'history_csv' in st.session_state:
+                st.download_button(
+                    label="📥 Download CSV",
+                    data=st.session_state.history_csv,
+                    file_name='expenses.csv',
+                    mime='text/csv',
+                )
         else:
             st.info("No transaction history available.")
             
     elif st.session_state.page == "Data":
         st.subheader("💾 Data Management")
         
-        tab1, tab2 = st.tabs(["Import CSV", "Backup & Restore"])
+        tab1, tab2, tab3 = st.tabs(["Import CSV", "Backup & Restore", "Import History"])
         
         with tab1:
             st.write("Upload your bank statement (CSV) to automatically import transactions.")
             uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
             
             if uploaded_file:
-                df = parse_bank_statement(uploaded_file)
-                if df is not None:
+                # Only a preview is read here; the import itself streams the file in chunks
+                try:
+                    preview = next(read_statement_chunks(uploaded_file, chunksize=PREVIEW_ROWS), None)
+                except ValueError:
+                    preview = None
+                if preview is not None:
                     st.success("File parsed successfully!")
                     st.write("#### Preview")
-                    st.dataframe(df.head(), use_container_width=True)
+                    st.dataframe(preview, use_container_width=True)
+                    
+                    # Dates are normalized on import; ambiguous ones like 03/04/2025 need the order
+                    dayfirst = st.checkbox("Dates are day-first (DD/MM/YYYY)", value=False)
+                    # Checked on the preview only; the import counts the whole file
+                    if any(epoch is None for epoch in normalize_dates(preview["date"], dayfirst=dayfirst)[1]):
+                        st.warning("Some dates in the preview can't be read; such rows will be kept as-is and left out of date-based views.")
                     
                     if st.button("Confirm Import", type="primary"):
-                        # Prepare batch list
-                        # (user_id, amount, category, description, date, transaction_type)
-                        batch = []
-                        for _, row in df.iterrows():
-                            # Auto Categorize
-                            desc = str(row.get('description', ''))
-                            cat = auto_categorize(desc)
+                        # Each chunk is categorized (merchant memory, the user's trained classifier, keyword rules),
+                        # classified and inserted in its own transaction. Rows already imported are skipped, and
+                        # the rows are tagged with an import batch so the whole file can be rolled back
+                        progress_bar = st.progress(0.0, text="Importing...")
+                        def on_progress(fraction, stats):
+                            progress_bar.progress(fraction, text=f"Imported {stats['rows']:,} rows...")
+                        try:
+                            result = import_statement(uploaded_file, user_id, uploaded_file.name, dayfirst=dayfirst, progress=on_progress)
+                        except ValueError as e:
+                            st.error(f"Import failed, nothing was imported: {e}")
+                        else:
+                            inserted, skipped = result['inserted'], result['skipped']
                             
-                            # Determine Type
-                            amt = float(row.get('amount', 0))
+                            # --- Auto-Match Initial Balance Logic ---
+                            # Balance now includes only the rows that actually landed
+                            projected_balance = get_user_summary_db(user_id)['current_balance']
                             
-                            # Default Logic
-                            if amt > 0:
-                                tx_type = 'income' if cat == 'Salary' else 'expense'
+                            if projected_balance < 0:
+                                needed = abs(projected_balance)
+                                apply_import_balance_adjustment_db(result['import_batch_id'], user_id, needed)
+                                st.toast(f"Auto-adjusted Initial Balance by +₹{needed:,.2f} to cover expenses.", icon="⚖️")
+                                
+                            if skipped:
+                                st.success(f"Successfully imported {inserted} transactions! Skipped {skipped} already imported.")
                             else:
-                                # Negative amount usually means expense in many exports
-                                tx_type = 'expense'
-                                amt = abs(amt) # Store as positive
-                            
-                            # Keyword override for Income
-                            income_keywords = ['salary', 'credit', 'interest', 'refund', 'dividend', 'deposit']
-                            if any(k in desc.lower() for k in income_keywords):
-                                tx_type = 'income'
-                                amt = abs(amt)
-
-                            if 'type' in row and pd.notna(row['type']):
-                                t = str(row['type']).lower()
-                                if 'credit' in t or 'cr' in t or 'income' in t: tx_type = 'income'
-                                elif 'debit' in t or 'dr' in t or 'expense' in t: tx_type = 'expense'
-                            
-                            date_str = str(row.get('date', datetime.now().strftime("%Y-%m-%d")))
-                            
-                            batch.append((user_id, amt, cat, desc, date_str, tx_type))
-                            
-                        # --- Auto-Match Initial Balance Logic ---
-                        # Calculate net change from this import
-                        import_income = sum(x[1] for x in batch if x[5] == 'income')
-                        import_expense = sum(x[1] for x in batch if x[5] == 'expense')
-                        net_import_change = import_income - import_expense
-                        
-                        # Get current state
-                        current_initial = get_initial_balance_db(user_id)
-                        current_txs = get_expenses_db(user_id)
-                        curr_income = sum(e['amount'] for e in current_txs if e['type'] == 'income')
-                        curr_expense = sum(e['amount'] for e in current_txs if e['type'] == 'expense')
-                        current_net = current_initial + curr_income - curr_expense
-                        
-                        projected_balance = current_net + net_import_change
-                        
-                        if projected_balance < 0:
-                            needed = abs(projected_balance)
-                            new_initial = current_initial + needed
-                            set_initial_balance_db(user_id, new_initial)
-                            st.toast(f"Auto-adjusted Initial Balance by +₹{needed:,.2f} to cover expenses.", icon="⚖️")
-                            
-                        add_expense_batch_db(batch)
-                        st.success(f"Successfully imported {len(batch)} transactions!")
-                        time.sleep(1)
-                        st.rerun()
+                                st.success(f"Successfully imported {inserted} transactions!")
+                            if result['unreadable_dates']:
+                                st.warning(f"{result['unreadable_dates']} row(s) have dates that can't be read; they were kept as-is and left out of date-based views.")
+                            if result['hits'] or result['model_hits']:
+                                st.toast(f"{result['hits']} of {result['rows']} rows ({result['hit_rate']:.0%}) categorized from your past choices, "
+                                         f"{result['model_hits']} by your trained model, in {result['seconds']:.1f} s", icon="🧠")
+                            time.sleep(1)
+                            st.rerun()
                 else:
                     st.error("Could not parse CSV. Ensure it has 'Date', 'Description', and 'Amount' columns.")
                     
         with tab2:
             st.write("Backup your data or restore from a previous backup.")
             
-            if st.button("📦 Create Backup"):
-                backup_path = generate_backup()
-                if backup_path:
-                    with open(backup_path, "rb") as file:
+            col_bk1, col_bk2 = st.columns(2)
+            backup_path = None
+            if col_bk1.button("📦 Full Backup"):
+                backup_path = generate_backup() or "missing"
+            if col_bk2.button("🧩 Differential Backup", help="Only the changes since the last backup"):
+                backup_path = create_backup(differential=True) or "missing"
+            if backup_path == "missing":
+                st.error("Database file not found.")
+            elif backup_path:
+                st.success(f"Backup created: {os.path.basename(backup_path)}")
+            
+            backups = list_backups()
+            if backups:
+                st.caption(f"Keeping the latest {BACKUP_KEEP} full backups and the differentials taken after them.")
+                by_name = {b['name']: b for b in backups}
+                kinds = {"full": "Full", "diff": "Differential"}
+                for b in backups:
+                    col_b1, col_b2 = st.columns([4, 1])
+                    col_b1.write(f"**{b['created_at']}** · {kinds[b['kind']]} · {b['size'] / 1024:,.0f} KB")
+                    if col_b2.button("♻️ Restore", key=f"restore_{b['name']}"):
+                        try:
+                            restore_backup(b['path'])
+                            st.success(f"Restored {b['name']}.")
+                            time.sleep(1)
+                            st.rerun()
+                        except ValueError as e:
+                            st.error(str(e))
+
+                # Only the chosen backup is read, and only once a download is asked for
+                col_d1, col_d2 = st.columns([4, 1])
+                chosen = col_d1.selectbox("Backup to download", list(by_name),
+                                          format_func=lambda n: f"{by_name[n]['created_at']} · {kinds[by_name[n]['kind']]}")
+                if col_d2.button("📂 Prepare Download"):
+                    st.session_state.backup_download = chosen
+                if st.session_state.get('backup_download') == chosen:
+                    with open(by_name[chosen]['path'], "rb") as file:
                         st.download_button(
-                            label="📥 Download Backup File",
+                            label=f"📥 Download {chosen}",
                             data=file,
-                            file_name=backup_path,
-                            mime="application/octet-stream"
+                            file_name=chosen,
+                            mime="application/octet-stream",
+                            on_click=lambda: st.session_state.pop('backup_download', None)
                         )
-                    st.success(f"Backup created: {backup_path}")
-                else:
-                    st.error("Database file not found.")
+
+            restore_file = st.file_uploader("Restore from a backup file", type=["db", "gz"])
+            if restore_file and st.button("♻️ Restore Uploaded Backup"):
+                suffix = ".db.gz" if restore_file.name.endswith(".gz") else ".db"
+                with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+                    tmp.write(restore_file.getbuffer())
+                try:
+                    restore_backup(tmp.name)
+                    st.success("Backup restored.")
+                    time.sleep(1)
+                    st.rerun()
+                except ValueError as e:
+                    st.error(str(e))
+                finally:
+                    os.remove(tmp.name)
+                    
+        with tab3:
+            st.write("Every CSV import can be rolled back in one step, including any balance auto-adjustment.")
+            imports = get_import_batches_db(user_id)
+            
+            if imports:
+                for imp in imports:
+                    col_h1, col_h2, col_h3, col_h4 = st.columns([2, 1, 1, 1])
+                    with col_h1:
+                        st.write(f"**{imp['filename']}**")
+                        st.caption(f"Imported {imp['imported_at']}")
+                    col_h2.write(f"{imp['row_count']} rows ({imp['skipped_count']} skipped)")
+                    col_h3.write(f"Balance adj: ₹{imp['balance_adjustment']:,.2f}")
+                    
+                    if imp['rolled_back_at']:
+                        col_h4.caption(f"Rolled back {imp['rolled_back_at']}")
+                    elif col_h4.button("↩️ Rollback", key=f"rollback_{imp['id']}"):
+                        removed = rollback_import(imp['id'], user_id)
+                        if removed is None:
+                            st.warning(f"{imp['filename']} has rows archived by a reset. Undo the reset first, then roll it back.")
+                        else:
+                            st.success(f"Rolled back {removed} transactions from {imp['filename']}.")
+                            time.sleep(1)
+                            st.rerun()
+            else:
+                st.info("No imports yet.")
 
     elif st.session_state.page == "Recurring":
         st.subheader("🔄 Recurring Expenses & Subscriptions")
-        st.write("Manage your recurring subscriptions and bills.")
+        st.write("Manage your recurring subscriptions and bills. Each one is posted as a transaction when it falls due.")
         
         with st.expander("➕ Add Recurring Expense", expanded=True):
             with st.form("recurring_form", clear_on_submit=True):
@@ -767,5 +884,7 @@ def dashboard_page():
             st.info("No archived data found.")
 
 if __name__ == "__main__":
+    # Here rather than at import: worker processes re-import this script as __mp_main__
+    init_db()
     main()
 
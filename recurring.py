@@ -0,0 +1,31 @@
+import argparse
+import time
+from datetime import date
+
+import database
+from database import materialize_recurring_db
+
+def run_recurring_job(today=None):
+    """
+    Posts every due recurring expense for all users. Returns (posted, seconds).
+    Safe to run as often as you like: a second run the same day posts nothing.
+    """
+    start = time.perf_counter()
+    posted = materialize_recurring_db(today)
+    return posted, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Post due recurring expenses for every user.")
+    parser.add_argument("--db", default=None, help="Database file (default: EXPENSES_DB or bank.db)")
+    parser.add_argument("--today", default=None, help="Post as of this date, YYYY-MM-DD (default: today)")
+    args = parser.parse_args()
+
+    if args.db:
+        database.set_db_file(args.db)
+    database.init_db()
+    today = date.fromisoformat(args.today) if args.today else None
+    posted, seconds = run_recurring_job(today)
+    print(f"Posted {posted} recurring transactions in {seconds:.2f}s")
+
+if __name__ == "__main__":
+    main()
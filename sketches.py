@@ -0,0 +1,92 @@
+import json
+
+# Streaming summary of one (user, category) stream of expense amounts:
+# count, mean and a P² estimate of the median (Jain & Chlamtac, 1985).
+# P² keeps five markers whatever the stream length, so updates are O(1) and the
+# state fits in a short JSON string stored next to the counters.
+
+P2_QUANTILE = 0.5
+_INCREMENTS = (0.0, P2_QUANTILE / 2, P2_QUANTILE, (1 + P2_QUANTILE) / 2, 1.0)
+
+class CategorySketch:
+    def __init__(self, count=0, mean=0.0, heights=None, positions=None):
+        self.count = count
+        self.mean = mean
+        # Until five values are seen, heights holds the raw values
+        self.heights = list(heights or [])
+        self.positions = list(positions or [])
+
+    @classmethod
+    def from_json(cls, count, mean, sketch):
+        state = json.loads(sketch) if sketch else {}
+        return cls(count, mean, state.get("q"), state.get("n"))
+
+    def to_json(self):
+        return json.dumps({"q": self.heights, "n": self.positions})
+
+    @property
+    def median(self):
+        if self.count == 0:
+            return None
+        if self.count < 5:
+            values = sorted(self.heights)
+            mid = len(values) // 2
+            return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+        return self.heights[2]
+
+    def add(self, x):
+        x = float(x)
+        self.count += 1
+        self.mean += (x - self.mean) / self.count
+
+        # 1. Warm-up: collect the first five values
+        if self.count <= 5:
+            self.heights.append(x)
+            if self.count == 5:
+                self.heights.sort()
+                self.positions = [1, 2, 3, 4, 5]
+            return
+
+        # 2. Find the cell x falls into, stretching the extremes if needed
+        q, n = self.heights, self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+
+        # 3. Nudge the three middle markers toward their desired positions
+        for i in (1, 2, 3):
+            desired = 1 + (self.count - 1) * _INCREMENTS[i]
+            d = desired - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = self._parabolic(i, d)
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = candidate
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def check(self, amount, multiplier, floor, min_count):
+        """
+        Returns the median an amount is judged against if it is anomalous, else None.
+        Call before add() so the amount is compared with the history before it.
+        """
+        if self.count < min_count or amount is None:
+            return None
+        median = self.median
+        if float(amount) > max(multiplier * median, floor):
+            return median
+        return None
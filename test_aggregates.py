@@ -0,0 +1,72 @@
+
+import io
+
+import pandas as pd
+import pytest
+from database import (
+    init_db, add_expense_batch_db, get_expenses_db,
+    get_totals_by_type_db, get_category_totals_db, get_monthly_totals_db, get_daily_totals_db,
+    get_category_month_totals_db, get_first_transaction_date_db
+)
+from importer import import_statement
+
+def test_aggregates(temp_db):
+    print("--- Testing SQL Aggregates ---")
+
+    init_db()
+    user_id = 1
+    batch = []
+    for i in range(60):
+        tx_type = 'income' if i % 7 == 0 else 'expense'
+        category = ["Food", "Transport", "Shopping"][i % 3]
+        # Mix of full timestamps and date-only strings, as stored today
+        date_str = f"2025-{(i % 4) + 1:02d}-{(i % 27) + 1:02d}" + (" 09:30:00" if i % 2 else "")
+        batch.append((user_id, round(10 + i * 3.5, 2), category, f"Item {i}", date_str, tx_type))
+    add_expense_batch_db(batch)
+
+    # Reference numbers computed the old way, in pandas
+    df = pd.DataFrame(get_expenses_db(user_id))
+    expenses = df[df['type'] == 'expense'].copy()
+    expenses['month'] = expenses['date'].str[:7]
+    expenses['day'] = expenses['date'].str[:10]
+
+    totals = get_totals_by_type_db(user_id)
+    assert abs(totals['income'] - df[df['type'] == 'income']['amount'].sum()) < 1e-6
+    assert abs(totals['expense'] - expenses['amount'].sum()) < 1e-6
+    assert totals['count'] == 60
+
+    by_cat = {r['category']: r['amount'] for r in get_category_totals_db(user_id, types=['expense'])}
+    expected = expenses.groupby('category')['amount'].sum().to_dict()
+    assert by_cat.keys() == expected.keys()
+    assert all(abs(by_cat[k] - expected[k]) < 1e-6 for k in expected)
+
+    monthly = {r['month']: r['amount'] for r in get_monthly_totals_db(user_id, types=['expense'])}
+    expected = expenses.groupby('month')['amount'].sum().to_dict()
+    assert monthly.keys() == expected.keys()
+    assert all(abs(monthly[k] - expected[k]) < 1e-6 for k in expected)
+
+    daily = {r['day']: r['amount'] for r in get_daily_totals_db(user_id, types=['expense'])}
+    assert abs(sum(daily.values()) - expenses['amount'].sum()) < 1e-6
+    assert daily.keys() == set(expenses['day'])
+
+    pivot_rows = pd.DataFrame(get_category_month_totals_db(user_id, types=['expense']))
+    pivot = pivot_rows.pivot_table(index='category', columns='month', values='amount', aggfunc='sum', fill_value=0)
+    expected = expenses.pivot_table(index='category', columns='month', values='amount', aggfunc='sum', fill_value=0)
+    assert (abs(pivot - expected) < 1e-6).all().all()
+
+    assert get_first_transaction_date_db(user_id, types=['expense']) == expenses['date'].min()
+    assert get_first_transaction_date_db(999) is None
+
+    # An imported row whose date can't be read stays in the totals but in no date bucket
+    statement = b"Date,Narration,Amount\nOpening Bal,Carried forward,-75\n2025-05-02,Cafe,-25\n"
+    assert import_statement(io.BytesIO(statement), 2, "odd.csv")["unreadable_dates"] == 1
+    assert get_totals_by_type_db(2)['expense'] == 100.0
+    assert [r['month'] for r in get_monthly_totals_db(2)] == ['2025-05']
+    assert [r['day'] for r in get_daily_totals_db(2)] == ['2025-05-02']
+    assert [(r['month'], r['amount']) for r in get_category_month_totals_db(2)] == [('2025-05', 25.0)]
+    pd.to_datetime(pd.DataFrame(get_daily_totals_db(2))['day'])
+
+    print("✅ Aggregate Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
@@ -0,0 +1,56 @@
+
+from datetime import datetime
+import pandas as pd
+import pytest
+from database import init_db, add_expense_batch_db, get_expenses_db
+from analytics import build_analytics_frame, load_analytics_frame, as_analytics_frame
+from ai_logic import detect_anomalies, predict_month_end, generate_savings_tips
+
+def test_analytics(temp_db):
+    print("--- Testing Shared Analytics Frame ---")
+
+    init_db()
+    this_month = datetime.now().strftime("%Y-%m")
+    batch = [(1, 100.0 + i, "Food" if i % 3 else "Rent", f"Item {i}", f"{this_month}-01 0{i % 10}:00:00", "expense") for i in range(30)]
+    batch.append((1, 5000.0, "Salary", "Pay", f"{this_month}-01", "income"))
+    batch.append((1, 20.0, "Food", "Odd date", "sometime", "expense"))
+    add_expense_batch_db(batch)
+
+    # 1. Typed columns, dates parsed once
+    frame = load_analytics_frame(1)
+    print(frame.dtypes.to_dict())
+    assert len(frame) == 32
+    assert frame['amount'].dtype == 'float64'
+    assert isinstance(frame['category'].dtype, pd.CategoricalDtype)
+    assert isinstance(frame['type'].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(frame['date'])
+    assert frame['date'].isna().sum() == 1
+    assert (frame['month'].dropna().astype(str) == this_month).all()
+
+    # 2. Type filter runs in SQL; a frame passes through as_analytics_frame untouched
+    expenses_only = load_analytics_frame(1, types=['expense'])
+    assert set(expenses_only['type']) == {'expense'}
+    assert as_analytics_frame(expenses_only) is expenses_only
+
+    # 3. ai_logic gives the same answers from the frame as from expense dicts
+    dicts = [e for e in get_expenses_db(1) if e['type'] == 'expense']
+    assert predict_month_end(expenses_only, 1000) == predict_month_end(dicts, 1000)
+    assert generate_savings_tips(expenses_only) == generate_savings_tips(dicts)
+    assert detect_anomalies(expenses_only, window=40) == detect_anomalies(dicts, window=40)
+
+    # 4. Dicts and tuples build the same frame
+    from_dicts = build_analytics_frame(dicts).sort_values('id').reset_index(drop=True)
+    from_rows = expenses_only.sort_values('id').reset_index(drop=True)
+    assert from_dicts['amount'].tolist() == from_rows['amount'].tolist()
+    assert from_dicts['month'].equals(from_rows['month'])
+
+    # 5. Text dates outside ISO-8601 are parsed, not dropped
+    legacy = build_analytics_frame([{'id': 1, 'date': '02/15/2025', 'amount': 10.0, 'category': 'Food', 'type': 'expense', 'description': 'Cafe'},
+                                    {'id': 2, 'date': '2025-02-16 09:00:00', 'amount': 12.0, 'category': 'Food', 'type': 'expense', 'description': 'Cafe'}])
+    assert legacy['date'].tolist() == [pd.Timestamp('2025-02-15'), pd.Timestamp('2025-02-16 09:00:00')]
+    assert (legacy['month'].astype(str) == '2025-02').all()
+
+    print("✅ Analytics Frame Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
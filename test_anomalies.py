@@ -0,0 +1,47 @@
+
+import pandas as pd
+from ai_logic import detect_anomalies
+
+def test_anomalies():
+    print("--- Testing Vectorized Anomaly Detection ---")
+
+    expenses = [{'amount': 100.0 + i, 'category': 'Food', 'description': f"Meal {i}", 'date': f"2025-01-{i + 1:02d} 12:00:00"} for i in range(20)]
+    expenses += [{'amount': 40.0, 'category': 'Transport', 'description': f"Bus {i}", 'date': f"2025-01-{i + 1:02d} 08:00:00"} for i in range(20)]
+    # Old spike, then a recent one; date-only and garbage dates mixed in
+    expenses.append({'amount': 900.0, 'category': 'Food', 'description': 'Old feast', 'date': '2025-01-02'})
+    expenses.append({'amount': 800.0, 'category': 'Food', 'description': 'New feast', 'date': '2025-01-25 19:00:00'})
+    expenses.append({'amount': 9999.0, 'category': 'Food', 'description': 'Bad row', 'date': 'not-a-date'})
+
+    # 1. Default window only sees the newest rows
+    alerts = detect_anomalies(expenses)
+    print(alerts)
+    assert len(alerts) == 1 and 'New feast' in alerts[0]
+
+    # 2. A wider window reaches the older spike, newest first; garbage dates are never recent
+    alerts = detect_anomalies(expenses, window=len(expenses))
+    assert [a for a in alerts if 'feast' in a] == [alerts[0], alerts[1]]
+    assert 'New feast' in alerts[0] and 'Old feast' in alerts[1]
+    assert not any('Bad row' in a for a in alerts)
+
+    # 3. Multiplier and floor are tunable
+    assert detect_anomalies(expenses, multiplier=10) == []
+    bus_spike = expenses + [{'amount': 150.0, 'category': 'Transport', 'description': 'Taxi', 'date': '2025-02-01 09:00:00'}]
+    assert any('Taxi' in a for a in detect_anomalies(bus_spike, window=1))
+    assert detect_anomalies(bus_spike, window=1, floor=200) == []
+
+    # 4. DataFrame input with parsed dates gives the same answer
+    df = pd.DataFrame(expenses[:-1])
+    df['date'] = pd.to_datetime(df['date'], format='ISO8601')
+    assert detect_anomalies(df) == detect_anomalies(expenses[:-1])
+
+    # 5. Dates outside ISO-8601 still count as recent
+    statement = expenses + [{'amount': 700.0, 'category': 'Transport', 'description': 'Airport cab', 'date': '02/15/2025'}]
+    alerts = detect_anomalies(statement)
+    assert 'Airport cab' in alerts[0]
+
+    assert detect_anomalies([]) == []
+
+    print("✅ Anomaly Detection Tests Passed!")
+
+if __name__ == "__main__":
+    test_anomalies()
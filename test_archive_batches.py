@@ -0,0 +1,49 @@
+
+import pytest
+from database import (
+    init_db, create_user, authenticate_user,
+    add_expense_db, get_expenses_db, set_initial_balance_db, get_initial_balance_db,
+    archive_and_reset_expenses, undo_last_reset, get_archive_batches_db, get_archived_expenses
+)
+
+def test_archive_batches(temp_db):
+    print("--- Testing Archive Batches ---")
+
+    init_db()
+    create_user("batch_user", "password")
+    user_id = authenticate_user("batch_user", "password")
+
+    # 1. Two resets back to back (same second) get distinct batches
+    set_initial_balance_db(user_id, 1000.0)
+    add_expense_db(user_id, 10.0, "Food", "January")
+    first = archive_and_reset_expenses(user_id)
+
+    set_initial_balance_db(user_id, 2000.0)
+    add_expense_db(user_id, 20.0, "Food", "February")
+    add_expense_db(user_id, 30.0, "Food", "February 2")
+    second = archive_and_reset_expenses(user_id)
+
+    batches = get_archive_batches_db(user_id)
+    print(f"Batches: {batches}")
+    assert [b['id'] for b in batches] == [second, first]
+    assert [b['row_count'] for b in batches] == [2, 1]
+    assert len(get_archived_expenses(user_id)) == 3
+
+    # 2. Undo restores only the latest batch
+    assert undo_last_reset(user_id)
+    assert get_initial_balance_db(user_id) == 2000.0
+    assert sorted(e['description'] for e in get_expenses_db(user_id)) == ["February", "February 2"]
+    assert [b['id'] for b in get_archive_batches_db(user_id)] == [first]
+
+    # 3. A specific batch can be restored by id, and only by its owner
+    assert not undo_last_reset(user_id + 1, batch_id=first)
+    assert undo_last_reset(user_id, batch_id=first)
+    assert get_initial_balance_db(user_id) == 1000.0
+    assert len(get_expenses_db(user_id)) == 3
+    assert get_archive_batches_db(user_id) == []
+    assert not undo_last_reset(user_id)
+
+    print("✅ Archive Batch Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
@@ -0,0 +1,36 @@
+
+import pytest
+import database
+from database import init_db, create_user, authenticate_user, get_connection, _hash_rounds
+
+def stored_hash(username):
+    with get_connection() as conn:
+        return conn.execute("SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()[0]
+
+def test_auth_rehash(temp_db, monkeypatch):
+    print("--- Testing Password Rehash On Login ---")
+
+    init_db()
+
+    # 1. New users get the configured cost
+    monkeypatch.setattr(database, "BCRYPT_ROUNDS", 4)
+    assert create_user("alice", "pw")
+    assert _hash_rounds(stored_hash("alice")) == 4
+
+    # 2. Wrong password never touches the hash
+    assert authenticate_user("alice", "nope") is None
+    assert _hash_rounds(stored_hash("alice")) == 4
+
+    # 3. Raising the cost upgrades the hash on the next good login
+    database.BCRYPT_ROUNDS = 5
+    user_id = authenticate_user("alice", "pw")
+    assert user_id is not None
+    assert _hash_rounds(stored_hash("alice")) == 5
+
+    # 4. Upgraded hash still verifies
+    assert authenticate_user("alice", "pw") == user_id
+
+    print("✅ Auth Rehash Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
@@ -0,0 +1,55 @@
+
+import os
+import pytest
+import backup
+from database import init_db, add_expense_db, get_expenses_db
+from backup import create_backup, list_backups, prune_backups, verify_backup, restore_backup
+
+def test_backup(temp_db, tmp_path, monkeypatch):
+    print("--- Testing Online Backup & Restore ---")
+
+    backup_dir = os.path.join(tmp_path, "backups")
+    monkeypatch.setattr(backup, "BACKUP_DIR", os.path.join(tmp_path, "safety"))
+    init_db()
+    add_expense_db(1, 100.0, "Food", "Lunch", "2025-01-01 12:00:00", "expense")
+
+    # 1. Compressed snapshot of the live database
+    path = create_backup(dest_dir=backup_dir)
+    print(f"Backup: {path}")
+    assert path.endswith(".db.gz")
+    verified = verify_backup(path)
+    os.remove(verified)
+
+    # 2. Retention keeps only the newest
+    for _ in range(3):
+        create_backup(dest_dir=backup_dir, keep=100)
+    assert len(list_backups(backup_dir)) == 4
+    removed = prune_backups(2, backup_dir)
+    assert len(removed) == 2
+    names = [b["name"] for b in list_backups(backup_dir)]
+    assert len(names) == 2
+    assert os.path.basename(path) not in names
+
+    # 3. Restore brings back the snapshot and keeps a safety copy of what it replaced
+    snapshot = list_backups(backup_dir)[0]["path"]
+    add_expense_db(1, 50.0, "Food", "Dinner", "2025-01-02 20:00:00", "expense")
+    assert len(get_expenses_db(1)) == 2
+    safety = restore_backup(snapshot)
+    assert len(get_expenses_db(1)) == 1
+    assert safety and os.path.exists(safety)
+
+    # 4. A damaged backup is rejected and the live data is untouched
+    bad = os.path.join(tmp_path, "backup_bank_20250101_000000.db.gz")
+    with open(bad, "wb") as f:
+        f.write(b"not a backup")
+    try:
+        restore_backup(bad, safety_backup=False)
+        assert False, "corrupt backup was restored"
+    except ValueError as e:
+        print(f"Rejected: {e}")
+    assert len(get_expenses_db(1)) == 1
+
+    print("✅ Backup Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
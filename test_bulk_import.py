@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from database import init_db, create_user, authenticate_user, get_expenses_db, get_import_batches_db, resolve_user_db
+from importer import import_statement
+from bulk_import import find_statements, load_mapping, assign_users, run_bulk_import
+
+FILES = {
+    "hdfc_oct.csv": "Date,Narration,Withdrawal Amount,Type\n2023-10-01,Salary October,50000,Cr\n2023-10-02,Swiggy Order,-450,\n2023-10-02,Swiggy Order,-450,\n",
+    "hdfc_nov.csv": "Date,Narration,Withdrawal Amount,Type\n2023-11-01,Salary November,50000,Cr\n2023-11-03,Uber Trip,-300,Dr\n",
+    "sbi_2023.csv": "Txn Date,Particulars,Amount\n2023-10-05,Netflix,-649\n2023-10-06,Interest Credit,120\n",
+    "broken.csv": "Date,Narration\n2023-10-01,No amount column\n",
+    "notes.txt": "not a statement",
+}
+
+def stored(user_id):
+    return sorted((e['amount'], e['category'], e['description'], e['date'], e['type']) for e in get_expenses_db(user_id))
+
+def test_bulk_import(temp_db, tmp_path):
+    print("--- Testing Bulk Import ---")
+
+    inbox = os.path.join(tmp_path, "inbox")
+    os.makedirs(inbox)
+    for name, content in FILES.items():
+        with open(os.path.join(inbox, name), "w") as f:
+            f.write(content)
+    mapping_path = os.path.join(tmp_path, "mapping.csv")
+    with open(mapping_path, "w") as f:
+        f.write("file,user\nhdfc_*.csv,asha\nsbi_2023.csv,ravi\n")
+
+    init_db()
+    for name in ("asha", "ravi", "check"):
+        create_user(name, "pw")
+    asha, ravi, check = (authenticate_user(n, "pw") for n in ("asha", "ravi", "check"))
+    assert resolve_user_db("ravi") == ravi and resolve_user_db(str(asha)) == asha and resolve_user_db("nobody") is None
+
+    # 1. Directories give their CSVs; the mapping picks users, --user covers the rest
+    files = find_statements([inbox])
+    assert [os.path.basename(f) for f in files] == ["broken.csv", "hdfc_nov.csv", "hdfc_oct.csv", "sbi_2023.csv"]
+    assert find_statements([os.path.join(inbox, "hdfc_*.csv")]) == files[1:3]
+    assignments, failures = assign_users(files, mapping=load_mapping(mapping_path))
+    assert dict(assignments) == {files[1]: asha, files[2]: asha, files[3]: ravi}
+    assert list(failures) == [files[0]]
+    assert assign_users(files, user="ghost")[1][files[0]] == "Unknown user 'ghost'"
+
+    # 2. Parsed in a worker pool, written here: one import batch per file, failures reported
+    assignments, _ = assign_users(files, user="check", mapping=load_mapping(mapping_path))
+    reports, seconds = run_bulk_import(assignments, workers=2)
+    by_name = {os.path.basename(r["file"]): r for r in reports}
+    print({name: (r["rows"], r["inserted"], r["error"]) for name, r in by_name.items()})
+    assert by_name["broken.csv"]["error"] and by_name["broken.csv"]["import_batch_id"] is None
+    assert [by_name[n]["inserted"] for n in ("hdfc_oct.csv", "hdfc_nov.csv", "sbi_2023.csv")] == [3, 2, 2]
+    assert len(get_import_batches_db(asha)) == 2 and get_expenses_db(check) == []
+
+    # 3. Same rows, types and categories as the Data page import of the same files
+    expected_user = create_user("expected", "pw") and authenticate_user("expected", "pw")
+    for name in ("hdfc_oct.csv", "hdfc_nov.csv"):
+        import_statement(os.path.join(inbox, name), expected_user)
+    assert stored(asha) == stored(expected_user)
+    assert {e['description']: e['type'] for e in get_expenses_db(ravi)} == {"Netflix": "expense", "Interest Credit": "income"}
+
+    # 4. Running again (in-process this time) skips everything already imported
+    again, _ = run_bulk_import(assignments, workers=0)
+    assert sum(r["inserted"] for r in again) == 0 and sum(r["skipped"] for r in again) == 7
+
+    # 5. The command line: per-file report and a failing exit code when a file fails
+    report_path = os.path.join(tmp_path, "report.csv")
+    result = subprocess.run([sys.executable, "bulk_import.py", inbox, "--user", "check", "--db", temp_db,
+                             "--workers", "0", "--report", report_path],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    print(result.stdout)
+    assert result.returncode == 1
+    assert "FAIL" in result.stdout and "1 failed" in result.stdout
+    with open(report_path) as f:
+        assert len(f.readlines()) == 1 + 4
+    assert len(get_expenses_db(check)) == 7
+
+    print("✅ Bulk Import Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
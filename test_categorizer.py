@@ -0,0 +1,56 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+from categorizer import CATEGORY_KEYWORDS, categorize, categorize_series, compile_rules, merchant_key, merchant_keys
+from ui_utils import auto_categorize
+
+# The original nested-loop matcher, kept as the reference behaviour
+def old_auto_categorize(description):
+    desc = description.lower()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in desc:
+                return category
+    return "Other"
+
+def test_categorizer():
+    print("--- Testing Compiled Categorizer ---")
+
+    # 1. Priority follows category order, not position in the text
+    assert categorize("UBER EATS pizza") == "Food"
+    assert categorize("Salary credit for March") == "Salary"
+    assert categorize("MEDPLUS pharmacy") == "Health"
+    assert categorize("Random shop") == "Other"
+    assert auto_categorize("Netflix.com") == "Entertainment"
+
+    # 2. Scalar and batch results match the old matcher on random statements
+    words = [k for keywords in CATEGORY_KEYWORDS.values() for k in keywords] + ["upi", "ref", "pos", "neft", "store", "xyz"] * 5
+    rng = random.Random(3)
+    descs = [" ".join(rng.choice(words).upper() if rng.random() < 0.3 else rng.choice(words) for _ in range(rng.randint(1, 4)))
+             + f" {rng.randint(1000, 99999)}" for _ in range(5000)]
+    expected = [old_auto_categorize(d) for d in descs]
+    assert [categorize(d) for d in descs] == expected
+    batch = categorize_series(pd.Series(descs, index=np.arange(5000) * 2))
+    assert batch.tolist() == expected
+    assert (batch.index == np.arange(5000) * 2).all()
+
+    # 3. Missing descriptions categorize like str(value) did in the import loop
+    missing = categorize_series(pd.Series(["pizza", None, np.nan, ""], dtype=object))
+    assert missing.tolist() == ["Food", "Other", "Other", "Other"]
+
+    # Characters the vectorized lowercase maps differently from str.lower()
+    unicode_descs = ["PİZZA", "pİzza", "K Mart", "CAFÉ", "İNTEREST"]
+    assert categorize_series(unicode_descs).tolist() == [categorize(d) for d in unicode_descs]
+    assert merchant_keys(unicode_descs).tolist() == [merchant_key(d) for d in unicode_descs]
+
+    # 4. Custom rule sets keep their own order
+    rules = compile_rules({"Coffee": ["coffee"], "Food": ["cafe", "coffee"]})
+    assert categorize("Cafe Coffee Day", rules) == "Coffee"
+    assert categorize_series(["Cafe Coffee Day", "cafe"], rules).tolist() == ["Coffee", "Food"]
+
+    print("✅ Categorizer Tests Passed!")
+
+if __name__ == "__main__":
+    test_categorizer()
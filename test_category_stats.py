@@ -0,0 +1,69 @@
+
+import pytest
+from database import (
+    init_db, add_expense_db, add_expense_batch_db,
+    start_import_batch_db, rollback_import, archive_and_reset_expenses, undo_last_reset,
+    get_anomaly_alerts_db, get_category_stats_db, rebuild_category_stats
+)
+
+def stats_by_category(user_id):
+    return {s['category']: s for s in get_category_stats_db(user_id)}
+
+def test_category_stats(temp_db):
+    print("--- Testing Streaming Category Stats ---")
+
+    init_db()
+    user_id = 1
+
+    # 1. Too little history: nothing is flagged yet
+    for i in range(4):
+        add_expense_db(user_id, 100.0 + i, "Food", f"Meal {i}", f"2025-01-0{i + 1} 12:00:00")
+    add_expense_db(user_id, 2000.0, "Food", "Early feast", "2025-01-05 12:00:00")
+    assert get_anomaly_alerts_db(user_id) == []
+
+    # 2. With history, a spike is flagged at insert against the median before it
+    for i in range(10):
+        add_expense_db(user_id, 100.0 + i, "Food", f"Meal {i}", f"2025-01-{i + 10} 12:00:00")
+    add_expense_db(user_id, 5000.0, "Food", "Gold Steak", "2025-01-25 20:00:00")
+    add_expense_db(user_id, 9000.0, "Salary", "Pay", "2025-01-26 09:00:00", "income")
+    alerts = get_anomaly_alerts_db(user_id)
+    print(alerts)
+    assert [a['description'] for a in alerts] == ["Gold Steak"]
+    # Approximate: the early outlier pulls the P² marker up a little on so few points
+    assert 100 <= alerts[0]['median'] <= 150
+    stats = stats_by_category(user_id)
+    assert stats['Food']['count'] == 16
+    assert 'Salary' not in stats
+
+    # 3. Batch import only counts rows actually inserted
+    batch = [(user_id, 40.0 + i % 5, "Transport", f"Bus {i}", f"2025-02-{i + 1:02d} 08:00:00", "expense") for i in range(20)]
+    batch.append((user_id, 400.0, "Transport", "Taxi to airport", "2025-02-25 05:00:00", "expense"))
+    import_id = start_import_batch_db(user_id, "feb.csv")
+    add_expense_batch_db(batch, import_batch_id=import_id)
+    add_expense_batch_db(batch)
+    assert stats_by_category(user_id)['Transport']['count'] == 21
+    assert any(a['description'] == "Taxi to airport" for a in get_anomaly_alerts_db(user_id, window=50))
+
+    # 4. Rebuilding from history reproduces the incremental state
+    before = stats_by_category(user_id)
+    rebuild_category_stats()
+    after = stats_by_category(user_id)
+    assert before.keys() == after.keys()
+    for cat in before:
+        assert before[cat]['count'] == after[cat]['count']
+        assert abs(before[cat]['median'] - after[cat]['median']) < 1e-9
+
+    # 5. Rollback, reset and undo keep the stats in step with the rows
+    rollback_import(import_id, user_id)
+    assert 'Transport' not in stats_by_category(user_id)
+    archive_and_reset_expenses(user_id)
+    assert get_category_stats_db(user_id) == []
+    assert get_anomaly_alerts_db(user_id) == []
+    undo_last_reset(user_id)
+    assert stats_by_category(user_id)['Food']['count'] == 16
+    assert [a['description'] for a in get_anomaly_alerts_db(user_id)] == ["Gold Steak"]
+
+    print("✅ Category Stats Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
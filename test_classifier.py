@@ -0,0 +1,101 @@
+import io
+
+import pandas as pd
+import pytest
+
+import classifier
+
+from database import init_db, create_user, authenticate_user, add_expense_batch_db, get_classifier_model_db
+from classifier import (
+    NaiveBayes, featurize, train_user_models, load_user_models, run_training_job, predict_confident, MIN_TRAINING_ROWS
+)
+from importer import import_statement
+from merchant_memory import categorize_with_memory
+
+HISTORY = [
+    ("KIRANA STORE {n}", "Food", "expense"),
+    ("BIGBASKET ORDER {n}", "Food", "expense"),
+    ("RAPIDO RIDE {n}", "Transport", "expense"),
+    ("INDIAN OIL PUMP {n}", "Transport", "expense"),
+    ("ACME CORP PAYROLL {n}", "Salary", "income"),
+    ("TATA POWER {n}", "Utilities", "expense"),
+]
+
+def test_classifier(temp_db, monkeypatch):
+    print("--- Testing Naive Bayes Classifier ---")
+
+    # 1. Features: one CSR row per description, repeated features merged into counts
+    indptr, features, counts = featurize(["tea tea", "", "tea"])
+    doubled = dict(zip(features[indptr[0]:indptr[1]], counts[indptr[0]:indptr[1]]))
+    single = dict(zip(features[indptr[2]:indptr[3]], counts[indptr[2]:indptr[3]]))
+    assert indptr[1] == indptr[2]
+    # Same word and trigrams twice, plus the "tea tea" bigram once
+    assert all(doubled[f] == 2 * c for f, c in single.items())
+    assert len(doubled) == len(single) + 1
+
+    # 2. Fit / predict, and a stored model predicts the same
+    descs = [template.format(n=n) for n in range(20) for template, _, _ in HISTORY]
+    labels = [category for _ in range(20) for _, category, _ in HISTORY]
+    model = NaiveBayes.fit(descs, labels)
+    predicted, confidence = model.predict(["bigbasket 999", "rapido 5", "acme payroll march"])
+    print(predicted, confidence)
+    assert list(predicted) == ["Food", "Transport", "Salary"]
+    assert (confidence > 0.9).all()
+    restored = NaiveBayes.from_bytes(model.to_bytes())
+    assert (restored.predict(descs)[0] == model.predict(descs)[0]).all()
+    # Nothing known about the text: low confidence, so callers fall back to the rules
+    assert predict_confident(model, pd.Series(["zzqx"], index=[7])).isna().all()
+    # No model at all: None for every row, not NaN, since callers test `is not None`
+    assert predict_confident(None, ["tea", "bus"]).tolist() == [None, None]
+
+    init_db()
+    create_user("nb", "pw")
+    user_id = authenticate_user("nb", "pw")
+
+    # 3. Too little history: no model
+    add_expense_batch_db([(user_id, 10.0, c, d.format(n=0), "2025-01-01", t) for d, c, t in HISTORY])
+    assert train_user_models(user_id) == {} and load_user_models(user_id) == {}
+
+    # 4. Enough history: both models trained on first use, stored, reused until it grows
+    rows = [(user_id, 10.0 + n, c, d.format(n=n + 1), f"2025-01-{n % 28 + 1:02d}", t) for n in range(MIN_TRAINING_ROWS) for d, c, t in HISTORY]
+    add_expense_batch_db(rows)
+    models = load_user_models(user_id)
+    assert set(models) == {"category", "type"}
+    trained_on = get_classifier_model_db(user_id, "category")[0]
+    assert trained_on == len(rows) + len(HISTORY)
+    assert set(load_user_models(user_id)) == {"category", "type"}
+    assert get_classifier_model_db(user_id, "category")[0] == trained_on
+
+    # 5. On import: learned categories the keyword rules miss, and income by description
+    statement = pd.Series(["BIGBASKET ORDER 77", "RAPIDO RIDE 9", "Uber trip", "ACME CORP PAYROLL OCT"])
+    categories, stats = categorize_with_memory(statement, user_id, model=models["category"])
+    assert categories.tolist() == ["Food", "Transport", "Transport", "Salary"]
+    assert stats["model_hits"] >= 3
+    assert predict_confident(models["type"], statement).tolist()[-1] == "income"
+
+    # 6. A history with a single category and type gets no model, and is not retried on every import
+    create_user("flat", "pw")
+    flat = authenticate_user("flat", "pw")
+    add_expense_batch_db([(flat, 10.0 + n, "Food", f"Canteen {n}", "2025-01-01", "expense") for n in range(MIN_TRAINING_ROWS + 10)])
+    assert load_user_models(flat) == {}
+    assert get_classifier_model_db(flat, "category") == (MIN_TRAINING_ROWS + 10, b"")
+    assert run_training_job([flat])[0] == 0
+
+    # 7. The Data page import never trains; the offline job trains users who are due
+    create_user("fresh", "pw")
+    fresh = authenticate_user("fresh", "pw")
+    statement = "Date,Narration,Amount\n" + "".join(f"2025-01-{n % 28 + 1:02d},{d.format(n=n)},-{10 + n}\n"
+                                                       for n in range(MIN_TRAINING_ROWS) for d, _, _ in HISTORY)
+    import_statement(io.BytesIO(statement.encode()), fresh)
+    assert get_classifier_model_db(fresh, "category") is None
+    assert run_training_job()[0] == 1
+    assert get_classifier_model_db(fresh, "category")[0] == MIN_TRAINING_ROWS * len(HISTORY)
+    assert run_training_job([fresh])[0] == 0 and run_training_job([fresh], force=True)[0] == 1
+
+    monkeypatch.setattr(classifier, "train_user_models", lambda user_id: pytest.fail("retrained an unchanged history"))
+    assert load_user_models(flat) == {}
+
+    print("✅ Classifier Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
@@ -0,0 +1,84 @@
+import os
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+from database import (
+    set_db_file, init_db, get_connection, add_expense_db, add_expense_batch_db,
+    get_first_transaction_date_db, get_user_summary_db, get_expenses_page,
+    archive_and_reset_expenses, undo_last_reset
+)
+from dates import normalize_dates, normalize_date
+from analytics import load_analytics_frame
+
+def test_dates(temp_db, tmp_path):
+    print("--- Testing Canonical Dates ---")
+
+    # 1. Normalizer: mixed formats in, canonical text and epoch seconds out
+    dates, epochs = normalize_dates(["2025-01-02 10:00:00", "2025-01-02", "2025-01-02T10:00:00+05:30",
+                                     "01/02/2025", "Jan 5, 2025", "junk", None])
+    print(dates, epochs)
+    assert dates[:5] == ["2025-01-02 10:00:00", "2025-01-02 00:00:00", "2025-01-02 10:00:00",
+                         "2025-01-02 00:00:00", "2025-01-05 00:00:00"]
+    # Epochs are the wall-clock time as if it were UTC
+    assert epochs[0] == int((datetime(2025, 1, 2, 10) - datetime(1970, 1, 1)).total_seconds())
+    assert epochs[1] == epochs[0] - 10 * 3600
+    assert dates[5:] == ["junk", None] and epochs[5:] == [None, None]
+    assert normalize_dates(["01/02/2025"], dayfirst=True)[0] == ["2025-02-01 00:00:00"]
+    assert normalize_date(date(2024, 2, 29)) == ("2024-02-29 00:00:00", int((datetime(2024, 2, 29) - datetime(1970, 1, 1)).total_seconds()))
+    assert normalize_date("junk") == ("junk", None)
+
+    # 2. A database with mixed-format dates is normalized once by the migration
+    legacy_db = os.path.join(tmp_path, "legacy.db")
+    conn = sqlite3.connect(legacy_db)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, password_hash BLOB NOT NULL, currency TEXT DEFAULT '₹', initial_balance REAL DEFAULT 0.0, created_at TEXT)")
+    conn.execute("CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, amount REAL, category TEXT, description TEXT, date TEXT)")
+    conn.execute("INSERT INTO users (username, password_hash) VALUES ('u', x'00')")
+    conn.executemany("INSERT INTO expenses (user_id, amount, category, description, date) VALUES (1, ?, 'Food', 'Tea', ?)",
+                     [(10.0, "2024-03-01 09:30:00"), (20.0, "02/15/2024"), (30.0, "2024-01-20"), (40.0, "not a date")])
+    conn.commit()
+    conn.close()
+
+    set_db_file(legacy_db)
+    init_db()
+    with get_connection() as conn:
+        rows = conn.execute("SELECT date, date_epoch FROM expenses ORDER BY id").fetchall()
+    print(rows)
+    assert [r[0] for r in rows] == ["2024-03-01 09:30:00", "2024-02-15 00:00:00", "2024-01-20 00:00:00", "not a date"]
+    assert rows[3][1] is None and all(r[1] is not None for r in rows[:3])
+    assert get_first_transaction_date_db(1) == "2024-01-20 00:00:00"
+    assert get_user_summary_db(1)['first_date'] == "2024-01-20 00:00:00"
+
+    # 3. Range filters on canonical text now see every normalized row
+    page, _ = get_expenses_page(1, 10, start_date="2024-02-01", end_date="2024-02-29")
+    assert [e['amount'] for e in page] == [20.0]
+
+    # 4. Every write path stores canonical dates with their epoch
+    add_expense_db(1, 5.0, "Food", "Snack", "2024-04-01")
+    add_expense_db(1, 6.0, "Food", "Lunch")
+    inserted, _ = add_expense_batch_db([(1, 7.0, "Food", "Chai", "03/04/2024", "expense")], dayfirst=True)
+    assert inserted == 1
+    with get_connection() as conn:
+        rows = conn.execute("SELECT date, date_epoch FROM expenses WHERE id > 4 ORDER BY id").fetchall()
+    assert rows[0] == ("2024-04-01 00:00:00", normalize_date("2024-04-01")[1])
+    assert rows[1][0][:10] == datetime.now().strftime("%Y-%m-%d") and rows[1][1] is not None
+    assert rows[2][0] == "2024-04-03 00:00:00"
+
+    # The content hash keeps the statement's own text, so a re-import is still a no-op
+    assert add_expense_batch_db([(1, 7.0, "Food", "Chai", "03/04/2024", "expense")], dayfirst=True) == (0, 1)
+
+    # 5. Epochs survive a reset and undo
+    archive_and_reset_expenses(1)
+    undo_last_reset(1)
+    with get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM expenses WHERE date_epoch IS NULL").fetchone()[0] == 1
+
+    # 6. The analytics frame reads epochs directly
+    frame = load_analytics_frame(1)
+    assert frame['date'].isna().sum() == 1
+    assert frame['date'].min() == datetime(2024, 1, 20)
+
+    print("✅ Canonical Date Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
@@ -0,0 +1,149 @@
+
+import os
+import pytest
+import backup
+from database import (
+    init_db, get_connection, add_expense_db, add_expense_batch_db, get_expenses_db,
+    update_expense_db, delete_expense_db, set_initial_balance_db, get_initial_balance_db,
+    add_recurring_expense_db, get_recurring_expenses_db, create_user, get_user_summary_db,
+    archive_and_reset_expenses, undo_last_reset, get_archive_batches_db, get_archived_expenses,
+    get_import_batches_db, rollback_import, set_expense_category_db, get_merchant_categories_db,
+    _rebuild_category_stats
+)
+from importer import import_statement
+from classifier import train_user_models, MIN_TRAINING_ROWS
+from backup import create_backup, list_backups, prune_backups, restore_backup
+
+def change_log_count():
+    with get_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+
+def state(user_id):
+    return (sorted((e['amount'], e['description']) for e in get_expenses_db(user_id)),
+            get_initial_balance_db(user_id), len(get_recurring_expenses_db(user_id)))
+
+def test_differential_backup(temp_db, tmp_path, monkeypatch):
+    print("--- Testing Differential Backups ---")
+
+    monkeypatch.setattr(backup, "BACKUP_DIR", os.path.join(tmp_path, "backups"))
+    init_db()
+    create_user("alice", "pw")
+    add_expense_batch_db([(1, float(i), "Food", f"Item {i}", f"2025-01-{(i % 28) + 1:02d} 12:00:00", "expense") for i in range(2000)])
+
+    # 1. Nothing is logged until a backup exists
+    assert change_log_count() == 0
+    full = create_backup(differential=True)
+    assert list_backups()[0]["kind"] == "full"
+
+    # 2. Changes after the full backup go into a small differential
+    add_expense_db(1, 75.0, "Food", "Pizza", "2025-02-01 20:00:00", "expense")
+    first_id = get_expenses_db(1)[-1]['id']
+    update_expense_db(first_id, 1.5, "Food", "Edited", "expense")
+    set_initial_balance_db(1, 500.0)
+    diff1 = create_backup(differential=True)
+    assert diff1.endswith(".diff.gz")
+    assert change_log_count() == 0
+    print(f"Full: {os.path.getsize(full)} bytes, Diff: {os.path.getsize(diff1)} bytes")
+    assert os.path.getsize(diff1) < os.path.getsize(full) / 4
+    at_diff1 = state(1)
+
+    # 3. A second differential with deletes, a new user and a recurring entry
+    delete_expense_db(get_expenses_db(1)[0]['id'])
+    create_user("bob", "pw")
+    add_recurring_expense_db(1, 199.0, "Entertainment", "Netflix", "Monthly", "2025-03-01")
+    diff2 = create_backup(differential=True)
+    at_diff2 = state(1)
+
+    # 4. Restoring a differential replays its chain onto the full backup
+    add_expense_db(1, 1.0, "Food", "After backups")
+    restore_backup(diff2, safety_backup=False)
+    assert state(1) == at_diff2
+    with get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM users WHERE username = 'bob'").fetchone()[0] == 1
+    summary = get_user_summary_db(1)
+    assert summary['tx_count'] == len(at_diff2[0])
+
+    restore_backup(diff1, safety_backup=False)
+    assert state(1) == at_diff1
+
+    # 5. The restored database starts a new chain: next differential becomes a full backup
+    assert create_backup(differential=True).endswith(".db.gz")
+
+    # 6. Retention keeps whole chains
+    removed = prune_backups(1)
+    assert full in removed and diff1 in removed and diff2 in removed
+    assert [b["kind"] for b in list_backups()] == ["full"]
+
+    print("✅ Differential Backup Tests Passed!")
+
+def category_stats(rebuild=False):
+    with get_connection() as conn:
+        if rebuild:
+            _rebuild_category_stats(conn.cursor())
+        return [(u, c, n, round(m, 6)) for u, c, n, m in conn.execute("SELECT user_id, category, count, mean FROM category_stats ORDER BY 1, 2")]
+
+def test_differential_restore_after_reset_and_import(temp_db, tmp_path, monkeypatch):
+    print("--- Testing Differential Restore of Resets and Imports ---")
+
+    monkeypatch.setattr(backup, "BACKUP_DIR", os.path.join(tmp_path, "backups"))
+    init_db()
+    create_user("alice", "pw")
+    add_expense_batch_db([(1, float(i), "Food", f"Item {i}", f"2025-01-{(i % 28) + 1:02d} 12:00:00", "expense") for i in range(50)])
+    create_backup(differential=True)
+
+    # 1. Reset, import a statement as a batch and teach a merchant, then take a differential
+    archive_and_reset_expenses(1)
+    statement = os.path.join(tmp_path, "feb.csv")
+    with open(statement, "w") as f:
+        f.write("Date,Narration,Amount\n2025-02-01,Swiggy Order,-450\n2025-02-03,Uber Trip,-300\n2025-02-05,Big Bazaar,-1200\n")
+    batch_id = import_statement(statement, 1)["import_batch_id"]
+    set_expense_category_db(get_expenses_db(1)[0]['id'], "Groceries")
+    learned = get_merchant_categories_db(1)
+    stats = category_stats(rebuild=True)
+    diff = create_backup(differential=True)
+
+    # 2. The restore brings back the archive, the batch and what was learned, not just the expenses
+    add_expense_db(1, 1.0, "Food", "After backups")
+    restore_backup(diff, safety_backup=False)
+    assert len(get_archive_batches_db(1)) == 1 and len(get_archived_expenses(1)) == 50
+    assert [b['id'] for b in get_import_batches_db(1)] == [batch_id]
+    assert get_merchant_categories_db(1) == learned
+
+    # 3. Derived stats are rebuilt from the replayed rows
+    assert category_stats() == stats
+
+    # 4. Both can still be undone; the restored rows still point at their batch
+    assert rollback_import(batch_id, 1) == 3
+    assert undo_last_reset(1)
+    assert len(get_expenses_db(1)) == 50 and get_archive_batches_db(1) == []
+
+    print("✅ Differential Restore After Reset And Import Tests Passed!")
+
+def test_differential_restore_after_retrain(temp_db, tmp_path, monkeypatch):
+    print("--- Testing Differential Restore of Retrained Models ---")
+
+    monkeypatch.setattr(backup, "BACKUP_DIR", os.path.join(tmp_path, "backups"))
+    init_db()
+    create_user("alice", "pw")
+    history = [(1, 10.0 + i, "Food" if i % 2 else "Transport", "Swiggy order" if i % 2 else "Uber trip", "2025-01-01", "expense")
+               for i in range(MIN_TRAINING_ROWS)]
+    add_expense_batch_db(history)
+    train_user_models(1)
+    create_backup(differential=True)
+
+    # 1. Retraining rewrites the stored models after the full backup
+    add_expense_batch_db([(1, 500.0, "Salary", f"Payroll {i}", "2025-02-01", "income") for i in range(10)])
+    train_user_models(1)
+    with get_connection() as conn:
+        models = conn.execute("SELECT user_id, target, row_count, model FROM classifier_models ORDER BY target").fetchall()
+    diff = create_backup(differential=True)
+
+    # 2. The differential's models replace the full backup's instead of clashing with them
+    restore_backup(diff, safety_backup=False)
+    with get_connection() as conn:
+        assert conn.execute("SELECT user_id, target, row_count, model FROM classifier_models ORDER BY target").fetchall() == models
+
+    print("✅ Differential Restore After Retrain Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
@@ -0,0 +1,50 @@
+
+import pytest
+from database import (
+    init_db, add_expense_batch_db, add_expense_db, get_expenses_db,
+    get_user_summary_db, archive_and_reset_expenses, undo_last_reset
+)
+
+def test_import_dedup(temp_db):
+    print("--- Testing Idempotent Import ---")
+
+    init_db()
+    user_id = 1
+    statement = [
+        (user_id, 50000.0, "Salary", "Salary October", "2023-10-01", "income"),
+        (user_id, 120.0, "Food", "Coffee  Shop", "2023-10-02", "expense"),
+        (user_id, 120.0, "Food", "coffee shop", "2023-10-02", "expense"),  # Genuine second coffee
+        (user_id, 350.0, "Transport", "Uber Trip", "2023-10-05", "expense"),
+        (user_id, 450.0, "Food", "Swiggy Order", "2023-10-06", "expense"),
+    ]
+
+    # 1. First import inserts everything, in small chunks
+    inserted, skipped = add_expense_batch_db(statement, chunk_size=2)
+    print(f"First import: {inserted} inserted, {skipped} skipped")
+    assert (inserted, skipped) == (5, 0)
+    balance = get_user_summary_db(user_id)['current_balance']
+
+    # 2. Same statement again is a no-op and leaves the balance alone
+    assert add_expense_batch_db(statement) == (0, 5)
+    assert len(get_expenses_db(user_id)) == 5
+    assert get_user_summary_db(user_id)['current_balance'] == balance
+
+    # 3. An overlapping statement only adds the new rows
+    extended = statement + [(user_id, 2000.0, "Shopping", "Amazon", "2023-10-10", "expense")]
+    assert add_expense_batch_db(extended) == (1, 5)
+
+    # 4. Manual entries are never deduplicated
+    add_expense_db(user_id, 120.0, "Food", "Coffee Shop", "2023-10-02")
+    add_expense_db(user_id, 120.0, "Food", "Coffee Shop", "2023-10-02")
+    assert len(get_expenses_db(user_id)) == 8
+
+    # 5. Undo after a re-import does not double the restored rows
+    archive_and_reset_expenses(user_id)
+    assert add_expense_batch_db(statement) == (5, 0)
+    assert undo_last_reset(user_id)
+    assert len(get_expenses_db(user_id)) == 8
+
+    print("✅ Import Dedup Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
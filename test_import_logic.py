@@ -1,7 +1,12 @@
 
+import random
+
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+from importer import classify_transactions
+
 # Mock the logic from main.py (since main.py is inside a function and hard to import partially without refactoring)
 def mock_import_logic(row):
     desc = str(row.get('description', '')).lower()
@@ -55,7 +60,70 @@ def test_import_logic():
         assert res_type == exp_type, f"Failed type for {desc}"
         assert res_amt == exp_amt, f"Failed amt for {desc}"
         
+    # The same cases through the vectorized version
+    types, amounts = classify_transactions([c[0] for c in test_cases], [c[1] for c in test_cases], ["Other"] * len(test_cases),
+                                           type_values=[c[2] for c in test_cases])
+    assert types.tolist() == [c[3] for c in test_cases]
+    assert amounts.tolist() == [c[4] for c in test_cases]
+        
     print("✅ All Import Logic Tests Passed!")
 
+# The Confirm Import loop as main.py ran it row by row, with the category and model type it was given
+def row_wise_import_logic(desc, amt, cat, model_type, type_value):
+    if amt > 0:
+        tx_type = 'income' if cat == 'Salary' else 'expense'
+    else:
+        tx_type = 'expense'
+        amt = abs(amt)
+
+    income_keywords = ['salary', 'credit', 'interest', 'refund', 'dividend', 'deposit']
+    if model_type is not None:
+        tx_type = model_type
+    elif any(k in desc.lower() for k in income_keywords):
+        tx_type = 'income'
+        amt = abs(amt)
+
+    if type_value is not None and pd.notna(type_value):
+        t = str(type_value).lower()
+        if 'credit' in t or 'cr' in t or 'income' in t: tx_type = 'income'
+        elif 'debit' in t or 'dr' in t or 'expense' in t: tx_type = 'expense'
+    return tx_type, amt
+
+def test_vectorized_matches_row_wise():
+    print("--- Differential Test: Vectorized vs Row-wise Import Logic ---")
+
+    rng = random.Random(24)
+    words = ["Salary", "SALARY", "credit", "Interest", "REFUND", "dividend", "Deposit", "Uber", "Swiggy",
+             "Coffee", "NEFT", "cr", "income", "Transfer", "", "crédit", "DEPOSİT", "ſalary"]
+    amounts = [100.0, -100.0, 0.0, -0.0, 0.01, -0.01, 1e9, -1e9, float("nan")]
+    categories = ["Salary", "Food", "Other", "Transport", None]
+    model_types = [None, None, None, "income", "expense"]
+    type_values = [None, float("nan"), "", "Credit", "DEBIT", "Cr", "dr", "CR/DR", "Income", "expense",
+                   "Debit Card", "Credit Card Payment", "Transfer", 1.0, "ÇR"]
+
+    rows = []
+    for _ in range(20000):
+        desc = " ".join(rng.choice(words) for _ in range(rng.randint(0, 3)))
+        rows.append((desc, rng.choice(amounts), rng.choice(categories), rng.choice(model_types), rng.choice(type_values)))
+
+    expected = [row_wise_import_logic(*row) for row in rows]
+    descs, amts, cats, models, types = zip(*rows)
+    got_types, got_amounts = classify_transactions(list(descs), list(amts), list(cats), list(models), list(types))
+
+    mismatches = [(row, exp) for row, exp, t in zip(rows, expected, got_types) if exp[0] != t]
+    assert not mismatches, f"{len(mismatches)} type mismatches, e.g. {mismatches[:3]}"
+    np.testing.assert_array_equal(got_amounts.to_numpy(), np.array([a for _, a in expected]))
+    # Sign of zero preserved too
+    assert all(np.signbit(g) == np.signbit(a) for g, (_, a) in zip(got_amounts, expected))
+
+    # No type column at all, and an empty chunk
+    no_type = classify_transactions(list(descs), list(amts), list(cats), list(models))[0].tolist()
+    assert no_type == [row_wise_import_logic(d, a, c, m, None)[0] for d, a, c, m, _ in rows]
+    empty_types, empty_amounts = classify_transactions([], [], [], [], [])
+    assert empty_types.empty and empty_amounts.empty
+
+    print(f"✅ Vectorized Import Logic matches row-wise on {len(rows)} rows!")
+
 if __name__ == "__main__":
     test_import_logic()
+    test_vectorized_matches_row_wise()
@@ -0,0 +1,79 @@
+
+import pytest
+from database import (
+    init_db, create_user, authenticate_user,
+    add_expense_db, add_expense_batch_db, get_expenses_db, get_initial_balance_db, set_initial_balance_db,
+    get_user_summary_db, start_import_batch_db, apply_import_balance_adjustment_db,
+    rollback_import, get_import_batches_db, archive_and_reset_expenses, undo_last_reset, delete_expense_db
+)
+
+def test_import_rollback(temp_db):
+    print("--- Testing Import Rollback ---")
+
+    init_db()
+    create_user("import_user", "password")
+    user_id = authenticate_user("import_user", "password")
+    set_initial_balance_db(user_id, 100.0)
+    add_expense_db(user_id, 40.0, "Food", "Manual lunch", "2025-01-01 13:00:00")
+
+    # 1. Import that overdraws and triggers an auto-adjustment
+    batch_id = start_import_batch_db(user_id, "statement_jan.csv")
+    statement = [(user_id, 300.0, "Rent", "Rent", "2025-01-02", "expense"),
+                 (user_id, 20.0, "Food", "Snacks", "2025-01-03", "expense")]
+    assert add_expense_batch_db(statement, import_batch_id=batch_id) == (2, 0)
+    needed = abs(get_user_summary_db(user_id)['current_balance'])
+    apply_import_balance_adjustment_db(batch_id, user_id, needed)
+    assert get_initial_balance_db(user_id) == 360.0
+    assert get_user_summary_db(user_id)['current_balance'] == 0.0
+
+    history = get_import_batches_db(user_id)
+    print(f"History: {history}")
+    assert history[0]['filename'] == "statement_jan.csv"
+    assert history[0]['row_count'] == 2
+    assert history[0]['balance_adjustment'] == 260.0
+
+    # 2. Re-import is recorded as fully skipped
+    second_id = start_import_batch_db(user_id, "statement_jan.csv")
+    add_expense_batch_db(statement, import_batch_id=second_id)
+    assert get_import_batches_db(user_id)[0]['skipped_count'] == 2
+
+    # 3. Rollback removes only that import's rows and reverts the adjustment
+    assert rollback_import(batch_id, user_id=user_id + 1) is None
+    assert rollback_import(batch_id, user_id=user_id) == 2
+    assert [e['description'] for e in get_expenses_db(user_id)] == ["Manual lunch"]
+    assert get_initial_balance_db(user_id) == 100.0
+    assert get_user_summary_db(user_id)['current_balance'] == 60.0
+    assert get_import_batches_db(user_id)[1]['rolled_back_at'] is not None
+
+    # 4. Rolling back twice is refused; the file can be imported again afterwards
+    assert rollback_import(batch_id) is None
+    assert add_expense_batch_db(statement) == (2, 0)
+
+    # 5. Import, reset, rollback, undo: the rollback waits for the undo, which brings back rollback-able rows
+    create_user("reset_user", "password")
+    reset_user = authenticate_user("reset_user", "password")
+    batch_id = start_import_batch_db(reset_user, "statement_feb.csv")
+    add_expense_batch_db([(reset_user, 500.0, "Rent", "Rent", "2025-02-01", "expense")], import_batch_id=batch_id)
+    apply_import_balance_adjustment_db(batch_id, reset_user, 500.0)
+    archive_and_reset_expenses(reset_user)
+    assert rollback_import(batch_id, reset_user) is None
+    assert get_initial_balance_db(reset_user) == 0.0
+    assert get_import_batches_db(reset_user)[0]['rolled_back_at'] is None
+    assert undo_last_reset(reset_user)
+    assert get_initial_balance_db(reset_user) == 500.0
+    assert rollback_import(batch_id, reset_user) == 1
+    assert get_expenses_db(reset_user) == [] and get_initial_balance_db(reset_user) == 0.0
+    assert rollback_import(batch_id, reset_user) is None
+
+    # 6. With its rows already deleted by hand, a rollback leaves the balance alone
+    batch_id = start_import_batch_db(reset_user, "statement_mar.csv")
+    add_expense_batch_db([(reset_user, 80.0, "Food", "Dinner", "2025-03-01", "expense")], import_batch_id=batch_id)
+    apply_import_balance_adjustment_db(batch_id, reset_user, 80.0)
+    delete_expense_db(get_expenses_db(reset_user)[0]['id'])
+    assert rollback_import(batch_id, reset_user) == 0
+    assert get_initial_balance_db(reset_user) == 80.0
+
+    print("✅ Import Rollback Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
@@ -0,0 +1,89 @@
+import io
+import os
+
+import pytest
+from database import init_db, get_expenses_db, get_import_batches_db, add_expense_batch_db
+from categorizer import categorize
+from ui_utils import parse_bank_statement
+from importer import import_statement, read_statement_chunks, classify_transactions
+
+STATEMENT = """Txn Date,Narration,Amount (INR),Cr/Dr
+2023-10-01,Salary October,"50,000.00",Credit
+2023-10-02,Coffee Shop,-120,
+2023-10-02,Coffee Shop,-120,
+2023-10-03,Uber Trip,350,Debit
+2023-10-04,Refund Amazon,-200,
+2023-10-05,Swiggy Order,450,Dr
+2023-10-06,Interest Credit,35.5,
+2023-10-02,Coffee Shop,-120,
+"""
+
+def whole_file_rows(path, user_id):
+    """The import as the Data page did it before: the whole file in one frame."""
+    df = parse_bank_statement(path)
+    amounts = [float(str(a).replace(",", "")) for a in df['amount']]
+    categories = [categorize(str(d)) for d in df['description']]
+    types, amounts = classify_transactions(df['description'], amounts, categories, type_values=df['type'])
+    return [(user_id, amt, cat, str(desc), str(date), tx_type)
+            for desc, amt, cat, date, tx_type in zip(df['description'], amounts, categories, df['date'], types)]
+
+def stored(user_id):
+    return sorted((e['amount'], e['category'], e['description'], e['date'], e['type']) for e in get_expenses_db(user_id))
+
+def test_import_stream(temp_db, tmp_path):
+    print("--- Testing Streaming Import ---")
+
+    path = os.path.join(tmp_path, "statement.csv")
+    with open(path, "w") as f:
+        f.write(STATEMENT)
+
+    init_db()
+
+    # 1. Columns detected like parse_bank_statement, read with fixed dtypes
+    chunks = list(read_statement_chunks(path, chunksize=3))
+    assert [len(c) for c in chunks] == [3, 3, 2]
+    assert set(chunks[0].columns) == {"date", "description", "amount", "type"}
+    assert str(chunks[0]["amount"].dtype) == "float64" and chunks[0]["amount"].iloc[0] == 50000.0
+
+    # 2. Chunked import stores the same rows as the whole-file import, duplicates across chunks included
+    progress = []
+    stats = import_statement(path, 1, chunksize=3, progress=lambda fraction, s: progress.append((fraction, s["rows"])))
+    print(stats)
+    assert (stats["rows"], stats["inserted"], stats["skipped"], stats["unreadable_dates"]) == (8, 8, 0, 0)
+    assert [rows for _, rows in progress] == [3, 6, 8] and progress[-1][0] == 1.0
+    assert [f for f, _ in progress] == sorted(f for f, _ in progress)
+    add_expense_batch_db(whole_file_rows(path, 2))
+    assert stored(1) == stored(2)
+    assert sum(e['description'] == "Coffee Shop" for e in get_expenses_db(1)) == 3
+
+    # 3. Re-importing (from an upload this time) skips every row
+    with open(path, "rb") as f:
+        upload = io.BytesIO(f.read())
+    again = import_statement(upload, 1, "statement.csv", chunksize=5)
+    assert (again["inserted"], again["skipped"]) == (0, 8)
+
+    # 4. A bad row in a later chunk rolls back the chunks already inserted
+    bad = STATEMENT.replace("Swiggy Order,450", "Swiggy Order,450 rupees")
+    try:
+        import_statement(io.BytesIO(bad.encode()), 3, "bad.csv", chunksize=2)
+        assert False, "Expected a parse error"
+    except ValueError:
+        pass
+    assert get_expenses_db(3) == []
+    assert get_import_batches_db(3)[0]["rolled_back_at"] is not None
+
+    # 5. No amount column
+    try:
+        next(read_statement_chunks(io.BytesIO(b"Date,Description\n2023-10-01,Tea\n")))
+        assert False, "Expected missing columns"
+    except ValueError:
+        pass
+
+    # 6. Dates that can't be read are counted during the import, in every chunk
+    odd = STATEMENT.replace("2023-10-03", "sometime").replace("2023-10-06", "later")
+    assert import_statement(io.BytesIO(odd.encode()), 4, "odd.csv", chunksize=3)["unreadable_dates"] == 2
+
+    print("✅ Streaming Import Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
@@ -0,0 +1,61 @@
+
+from datetime import datetime
+import pytest
+from database import (
+    init_db, get_connection, add_expense_batch_db, add_expense_db, update_expense_db,
+    add_recurring_expense_db, set_initial_balance_db, get_insights_db, get_expenses_db
+)
+from insights import run_insights_job, get_user_insights, is_fresh
+
+def test_insights(temp_db):
+    print("--- Testing Precomputed Insights ---")
+
+    init_db()
+    today = datetime.now().strftime("%Y-%m-%d")
+    with get_connection() as conn:
+        conn.executemany("INSERT INTO users (id, username, password_hash) VALUES (?, ?, ?)",
+                         [(u, f"user{u}", b"x") for u in range(1, 7)])
+    add_expense_batch_db([(u, 50.0 + i, "Food" if i % 3 else "Rent", f"Item {i}", f"{today} 0{i % 10}:00:00", "expense")
+                          for u in range(1, 7) for i in range(25)])
+
+    # 1. The job fills a fresh row for every user, through the process pool
+    users, seconds = run_insights_job(workers=2, shard_size=2)
+    print(f"{users} users in {seconds:.2f}s")
+    assert users == 6
+    for u in range(1, 7):
+        row = get_insights_db(u)
+        assert is_fresh(row)
+        assert row['predicted_total'] > 0 and row['tips']
+
+    # 2. Every kind of relevant write makes only that user's row stale
+    writes = [
+        lambda: add_expense_db(1, 10.0, "Food", "Snack"),
+        lambda: update_expense_db(get_expenses_db(1)[0]['id'], 10.0, "Travel", "Edited", "expense"),
+        lambda: add_recurring_expense_db(1, 199.0, "Entertainment", "Netflix", "Monthly", today),
+        lambda: set_initial_balance_db(1, 1000.0),
+    ]
+    for write in writes:
+        write()
+        assert not is_fresh(get_insights_db(1))
+        assert is_fresh(get_insights_db(2))
+
+        # 3. The read path recomputes inline and stores the result
+        result = get_user_insights(1)
+        assert is_fresh(get_insights_db(1))
+    assert any("Netflix" in r for r in result['reminders'])
+
+    # 4. Rows computed on an earlier day are stale even without writes
+    with get_connection() as conn:
+        conn.execute("UPDATE insights SET computed_at = '2000-01-01 00:00:00' WHERE user_id = 3")
+    assert not is_fresh(get_insights_db(3))
+    get_user_insights(3)
+    assert is_fresh(get_insights_db(3))
+
+    # 5. In-process mode gives the same results
+    run_insights_job(workers=0)
+    assert get_insights_db(2)['tips'] == get_insights_db(4)['tips']
+
+    print("✅ Insights Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
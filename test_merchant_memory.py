@@ -0,0 +1,68 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from database import (
+    set_db_file, init_db, create_user, authenticate_user, get_connection,
+    add_expense_db, add_expense_batch_db, set_expense_category_db, get_merchant_categories_db
+)
+from merchant_memory import categorize_with_memory
+
+def test_merchant_memory(temp_db, tmp_path):
+    print("--- Testing Merchant Memory ---")
+
+    # 1. Existing history is learned once by the migration; the latest category wins
+    legacy_db = os.path.join(tmp_path, "legacy.db")
+    conn = sqlite3.connect(legacy_db)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, password_hash BLOB NOT NULL, currency TEXT DEFAULT '₹', initial_balance REAL DEFAULT 0.0, created_at TEXT)")
+    conn.execute("CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, amount REAL, category TEXT, description TEXT, date TEXT, content_hash TEXT, import_batch_id INTEGER)")
+    conn.executemany("INSERT INTO expenses (user_id, amount, category, description, date) VALUES (1, 10.0, ?, ?, '2024-01-01')",
+                     [("Other", "ZOMATO*ORDER 1"), ("Food", "ZOMATO*ORDER 2"), ("Shopping", "DMART 55"), ("Food", "DMART 56"), ("Other", "MYSTERY CO")])
+    # Imported rows only hold the import's guess
+    conn.executemany("INSERT INTO expenses (user_id, amount, category, description, date, content_hash, import_batch_id) VALUES (1, 10.0, ?, ?, '2024-01-02', ?, ?)",
+                     [("Shopping", "ZOMATO*ORDER 3", "hash-3", None), ("Travel", "UBER TRIP 4", None, 1)])
+    conn.commit()
+    conn.close()
+    set_db_file(legacy_db)
+    init_db()
+    assert get_merchant_categories_db(1) == {"zomato": "Food", "dmart": "Food"}
+
+    # 2. Manual adds and recategorizations teach it; 'Other' and imports don't
+    set_db_file(temp_db)
+    init_db()
+    create_user("mm_a", "pw", family_id="fam")
+    create_user("mm_b", "pw", family_id="fam")
+    a = authenticate_user("mm_a", "pw")
+    b = authenticate_user("mm_b", "pw")
+
+    add_expense_db(a, 300.0, "Food", "ZOMATO*ORDER 1234", "2025-01-01")
+    add_expense_db(a, 50.0, "Other", "Random Stall", "2025-01-02")
+    add_expense_batch_db([(a, 99.0, "Shopping", "BLINKIT 7788", "2025-01-03", "expense")])
+    assert get_merchant_categories_db(a) == {"zomato": "Food"}
+
+    with get_connection() as conn:
+        stall = conn.execute("SELECT id FROM expenses WHERE description = 'Random Stall'").fetchone()[0]
+    set_expense_category_db(stall, "Shopping")
+    assert get_merchant_categories_db(a) == {"zomato": "Food", "random stall": "Shopping"}
+
+    # 3. Imports use the memory first, then keyword rules for the rest
+    statement = pd.Series(["UPI/ZOMATO/998877", "Random Stall 2", "Uber trip", "Unknown shop"], index=[10, 11, 12, 13])
+    categories, stats = categorize_with_memory(statement, a)
+    print(categories.tolist(), stats)
+    assert categories.tolist() == ["Food", "Shopping", "Transport", "Other"]
+    assert list(categories.index) == [10, 11, 12, 13]
+    assert stats["rows"] == 4 and stats["hits"] == 2 and stats["hit_rate"] == 0.5
+
+    # 4. Family members share entries; a user's own choice overrides the family's
+    assert categorize_with_memory(statement, b)[0].tolist() == ["Food", "Shopping", "Transport", "Other"]
+    add_expense_db(b, 20.0, "Health", "Random Stall", "2025-01-05")
+    assert get_merchant_categories_db(b)["random stall"] == "Health"
+    assert get_merchant_categories_db(a)["random stall"] == "Shopping"
+    assert get_merchant_categories_db(b, include_family=False) == {"random stall": "Health"}
+
+    print("✅ Merchant Memory Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
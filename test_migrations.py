@@ -0,0 +1,46 @@
+
+import os
+import sqlite3
+import pytest
+from database import set_db_file, migrate_db, init_db, get_schema_version, MIGRATIONS
+
+def test_migrations(temp_db, tmp_path):
+    print("--- Testing Schema Migrations ---")
+
+
+    # 1. Fresh database gets every step, in order
+    applied = migrate_db()
+    print(f"Applied: {applied}")
+    assert applied == [m[0] for m in MIGRATIONS]
+    assert get_schema_version() == MIGRATIONS[-1][0]
+
+    # 2. Second run is a no-op
+    assert migrate_db() == []
+
+    # 3. A pre-versioning database (tables exist, no schema_version) upgrades cleanly
+    legacy_db = os.path.join(tmp_path, "legacy.db")
+    conn = sqlite3.connect(legacy_db)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, password_hash BLOB NOT NULL, currency TEXT DEFAULT '₹', initial_balance REAL DEFAULT 0.0, created_at TEXT)")
+    conn.execute("CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, amount REAL, category TEXT, description TEXT, date TEXT)")
+    conn.execute("INSERT INTO expenses (user_id, amount, category, description, date) VALUES (1, 10.0, 'Food', 'Tea', '2024-01-01')")
+    conn.commit()
+    conn.close()
+
+    set_db_file(legacy_db)
+    init_db()
+    assert get_schema_version() == MIGRATIONS[-1][0]
+
+    conn = sqlite3.connect(legacy_db)
+    cols = [info[1] for info in conn.execute("PRAGMA table_info(expenses)")]
+    count = conn.execute("SELECT COUNT(*) FROM expenses").fetchone()[0]
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    conn.close()
+
+    assert 'transaction_type' in cols
+    assert count == 1
+    assert {'sessions', 'recurring_expenses', 'investments', 'archived_expenses'} <= tables
+
+    print("✅ Migration Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
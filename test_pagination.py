@@ -0,0 +1,62 @@
+
+import pytest
+from database import init_db, add_expense_batch_db, get_expenses_page, iter_expenses_pages
+
+def test_pagination(temp_db):
+    print("--- Testing Keyset Pagination ---")
+
+    init_db()
+    user_id = 1
+    # 30 rows over 10 days, 3 per day so pages have to break ties on id
+    batch = []
+    for i in range(30):
+        day = (i % 10) + 1
+        tx_type = 'income' if i % 5 == 0 else 'expense'
+        category = "Salary" if tx_type == 'income' else ("Food" if i % 2 else "Transport")
+        batch.append((user_id, float(i * 10), category, f"Item {i}", f"2025-03-{day:02d} 10:00:00", tx_type))
+    batch.append((2, 999.0, "Food", "Other user", "2025-03-05 10:00:00", "expense"))
+    add_expense_batch_db(batch)
+
+    # 1. Walk every page
+    seen = []
+    after = None
+    pages = 0
+    while True:
+        rows, after = get_expenses_page(user_id, 7, after=after)
+        seen.extend(rows)
+        pages += 1
+        if after is None:
+            break
+    print(f"Pages: {pages}, Rows: {len(seen)}")
+    assert pages == 5
+    assert len(seen) == 30
+    assert len({r['id'] for r in seen}) == 30
+
+    # Newest first, ties broken by id
+    keys = [(r['date'], r['id']) for r in seen]
+    assert keys == sorted(keys, reverse=True)
+
+    # 2. Filters run in SQL
+    rows, _ = get_expenses_page(user_id, 100, types=['income'])
+    assert len(rows) == 6
+    assert all(r['type'] == 'income' for r in rows)
+
+    rows, _ = get_expenses_page(user_id, 100, categories=['Food'])
+    assert rows and all(r['category'] == 'Food' for r in rows)
+
+    rows, _ = get_expenses_page(user_id, 100, start_date="2025-03-02", end_date="2025-03-03")
+    assert len(rows) == 6
+    assert all(r['date'][:10] in ("2025-03-02", "2025-03-03") for r in rows)
+
+    rows, _ = get_expenses_page(user_id, 100, min_amount=100, max_amount=200)
+    assert all(100 <= r['amount'] <= 200 for r in rows)
+    assert len(rows) == 11
+
+    # 3. Export iterator covers the filtered result
+    exported = [r for page in iter_expenses_pages(user_id, page_size=4, types=['expense']) for r in page]
+    assert len(exported) == 24
+
+    print("✅ Pagination Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
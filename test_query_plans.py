@@ -0,0 +1,118 @@
+import re
+import sqlite3
+from datetime import date
+
+import pytest
+import backup
+from database import (
+    init_db, create_user, authenticate_user, close_connections, session_cache,
+    add_expense_db, add_expense_batch_db, get_expenses_db, get_expense_columns_db, get_expenses_page,
+    get_category_month_totals_db, get_first_transaction_date_db, get_totals_by_type_db, get_category_totals_db,
+    get_merchant_categories_db, set_expense_category_db, get_classifier_model_db,
+    archive_and_reset_expenses, undo_last_reset, get_archive_batches_db, get_archived_expenses,
+    start_import_batch_db, rollback_import, get_import_batches_db, get_user_summary_db,
+    create_session, validate_session, delete_session, sweep_expired_sessions,
+    get_anomaly_alerts_db, add_recurring_expense_db, get_recurring_expenses_db, get_recurring_due_db,
+    materialize_recurring_db, add_investment_db, get_investments_db
+)
+
+TODAY = date(2025, 6, 1)
+# Bookkeeping tables that stay a handful of rows: one per table, one per backup taken
+SMALL_TABLES = {"sqlite_sequence", "backup_history"}
+
+def seed():
+    """Two family members with imported history, recurring items, an investment and a session."""
+    create_user("planner", "pw", family_id="fam")
+    create_user("partner", "pw", family_id="fam")
+    user_id = authenticate_user("planner", "pw")
+    batch_id = start_import_batch_db(user_id, "jan.csv")
+    add_expense_batch_db([(user_id, 10.0 + i, "Food", f"Zomato {i}", f"2025-01-{(i % 28) + 1:02d}", "expense") for i in range(50)],
+                         import_batch_id=batch_id)
+    add_recurring_expense_db(user_id, 500.0, "Bills", "Rent", "Monthly", "2025-01-01")
+    add_investment_db(user_id, "Index Fund", 1000.0, "SIP", "2025-01-01", "Monthly")
+    return user_id, batch_id, create_session(user_id)
+
+def hot_calls(user_id, batch_id, session_id):
+    """Every per-user read and write on a request path, called the way the app calls it."""
+    expense_id = get_expenses_db(user_id)[0]["id"]
+    return {
+        "get_expenses_db": lambda: get_expenses_db(user_id),
+        "get_expense_columns_db": lambda: get_expense_columns_db(user_id, types=["expense"]),
+        "get_expenses_page": lambda: get_expenses_page(user_id, 10, after=("2025-01-20 00:00:00", 10**9), start_date="2025-01-01"),
+        "get_totals_by_type_db": lambda: get_totals_by_type_db(user_id),
+        "get_category_totals_db": lambda: get_category_totals_db(user_id, types=["expense"]),
+        "get_category_month_totals_db": lambda: get_category_month_totals_db(user_id, types=["expense"]),
+        "get_first_transaction_date_db": lambda: get_first_transaction_date_db(user_id, types=["expense"]),
+        "get_user_summary_db": lambda: get_user_summary_db(user_id),
+        "get_merchant_categories_db": lambda: get_merchant_categories_db(user_id),
+        "set_expense_category_db": lambda: set_expense_category_db(expense_id, "Dining"),
+        "add_expense_db": lambda: add_expense_db(user_id, 5000.0, "Food", "Gold Steak", "2025-02-01 20:00:00"),
+        "get_anomaly_alerts_db": lambda: get_anomaly_alerts_db(user_id),
+        "get_classifier_model_db": lambda: get_classifier_model_db(user_id, "category"),
+        "validate_session": lambda: (session_cache.clear(), validate_session(session_id)),
+        "sweep_expired_sessions": sweep_expired_sessions,
+        "delete_session": lambda: delete_session(session_id),
+        "get_recurring_expenses_db": lambda: get_recurring_expenses_db(user_id),
+        "get_recurring_due_db": lambda: get_recurring_due_db(user_id, TODAY),
+        "materialize_recurring_db": lambda: materialize_recurring_db(today=TODAY),
+        "get_investments_db": lambda: get_investments_db(user_id),
+        "create_backup: full": lambda: backup.create_backup(differential=True),
+        "create_backup: differential": lambda: backup.create_backup(differential=True),
+        "get_import_batches_db": lambda: get_import_batches_db(user_id),
+        "rollback_import": lambda: rollback_import(batch_id, user_id),
+        "archive_and_reset_expenses": lambda: archive_and_reset_expenses(user_id),
+        "get_archive_batches_db": lambda: get_archive_batches_db(user_id),
+        "get_archived_expenses": lambda: get_archived_expenses(user_id),
+        "undo_last_reset": lambda: undo_last_reset(user_id),
+    }
+
+def checked_sql(sql):
+    """
+    The part of a traced statement to explain: reads and writes only, and for rows copied into
+    a differential backup's attached database, the SELECT that finds them.
+    """
+    verb = sql.lstrip().split(None, 1)[0].upper()
+    if verb not in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE"):
+        return None
+    if sql.lstrip().upper().startswith("INSERT INTO DIFF."):
+        select = re.search(r"\bSELECT\b", sql, re.IGNORECASE)
+        return sql[select.start():] if select else None
+    return sql
+
+def test_query_plans(temp_db, tmp_path, monkeypatch):
+    print("--- Testing Query Plans ---")
+
+    # 1. Record the SQL every connection actually runs, pooled or not
+    statements = []
+    connect = sqlite3.connect
+    def traced_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+    monkeypatch.setattr(sqlite3, "connect", traced_connect)
+    monkeypatch.setattr(backup, "BACKUP_DIR", str(tmp_path / "backups"))
+    close_connections()
+    init_db()
+    calls = hot_calls(*seed())
+
+    # 2. Explain each distinct statement right after its function ran
+    failures = []
+    explainer = connect(temp_db)
+    for name, call in calls.items():
+        statements.clear()
+        call()
+        checked = {sql for sql in map(checked_sql, statements) if sql}
+        assert checked, f"{name} ran no statements"
+        for sql in sorted(checked):
+            plan = [row[3] for row in explainer.execute("EXPLAIN QUERY PLAN " + sql)]
+            print(f"{name}: {plan}")
+            # Every table access must be an index SEARCH, never a SCAN
+            if any(step.startswith("SCAN ") and step.split()[1] not in SMALL_TABLES for step in plan):
+                failures.append(f"{name}: {' '.join(sql.split())}")
+    explainer.close()
+    assert not failures, "Full table scan in:\n" + "\n".join(failures)
+
+    print("✅ Query Plan Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
@@ -0,0 +1,68 @@
+from datetime import date
+
+import pytest
+from database import (
+    init_db, create_user, authenticate_user, get_connection,
+    add_recurring_expense_db, get_recurring_expenses_db, materialize_recurring_db,
+    get_user_summary_db, get_recurring_due_db
+)
+
+def test_recurring(temp_db):
+    print("--- Testing Recurring Expense Posting ---")
+
+    init_db()
+    create_user("rec_a", "pw")
+    create_user("rec_b", "pw")
+    a = authenticate_user("rec_a", "pw")
+    b = authenticate_user("rec_b", "pw")
+
+    add_recurring_expense_db(a, 500.0, "Rent", "Flat", "Monthly", "2025-01-31")
+    add_recurring_expense_db(a, 100.0, "Entertainment", "Club", "Weekly", "2025-03-03")
+    add_recurring_expense_db(b, 1200.0, "Utilities", "Insurance", "Yearly", "2024-02-29")
+    add_recurring_expense_db(b, 50.0, "Other", "Future", "Monthly", "2025-05-01")
+
+    # 1. One run for all users catches up on every missed period
+    today = date(2025, 4, 1)
+    posted = materialize_recurring_db(today)
+    print(f"Posted: {posted}")
+    with get_connection() as conn:
+        rows = conn.execute("SELECT user_id, description, date, date_epoch FROM expenses ORDER BY user_id, description, date").fetchall()
+    flat = [r[2][:10] for r in rows if r[1] == "Flat"]
+    club = [r[2][:10] for r in rows if r[1] == "Club"]
+    insurance = [r[2][:10] for r in rows if r[1] == "Insurance"]
+    # Month-end schedule stays on the month end
+    assert flat == ["2025-01-31", "2025-02-28", "2025-03-31"]
+    assert club == ["2025-03-03", "2025-03-10", "2025-03-17", "2025-03-24", "2025-03-31"]
+    assert insurance == ["2024-02-29", "2025-02-28"]
+    assert posted == len(rows) == 10
+    assert all(r[3] is not None for r in rows)
+
+    # 2. Due dates moved past today; the future item was untouched
+    due = {r['description']: r['next_due_date'] for r in get_recurring_expenses_db(a) + get_recurring_expenses_db(b)}
+    assert due == {"Flat": "2025-04-30", "Club": "2025-04-07", "Insurance": "2026-02-28", "Future": "2025-05-01"}
+    assert get_user_summary_db(a)['expense_total'] == 3 * 500.0 + 5 * 100.0
+
+    # 3. Running again is a no-op
+    assert materialize_recurring_db(today) == 0
+
+    # 4. The month-end anchor survives across runs (Apr 30, then May 31)
+    assert materialize_recurring_db(date(2025, 5, 31), user_id=a) == 2 + 8
+    due = {r['description']: r['next_due_date'] for r in get_recurring_expenses_db(a)}
+    assert due["Flat"] == "2025-06-30"
+    with get_connection() as conn:
+        assert conn.execute("SELECT MAX(date) FROM expenses WHERE description = 'Flat'").fetchone()[0][:10] == "2025-05-31"
+    # ...and user-scoped runs leave other users alone
+    assert {r['description']: r['next_due_date'] for r in get_recurring_expenses_db(b)}["Future"] == "2025-05-01"
+
+    # 5. Even if a due date is rolled back, an occurrence is never posted twice
+    with get_connection() as conn:
+        conn.execute("UPDATE recurring_expenses SET next_due_date = '2025-05-31' WHERE description = 'Flat'")
+    assert materialize_recurring_db(date(2025, 5, 31), user_id=a) == 0
+
+    # 6. Reminder reads only see items due inside the window
+    assert [r['description'] for r in get_recurring_due_db(b, "2025-06-01")] == ["Future"]
+
+    print("✅ Recurring Posting Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
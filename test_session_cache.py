@@ -0,0 +1,53 @@
+
+import pytest
+import database
+from database import (
+    init_db, create_user, authenticate_user, get_connection,
+    create_session, validate_session, delete_session, sweep_expired_sessions, session_cache
+)
+
+def count_sessions():
+    with get_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+def test_session_cache(temp_db):
+    print("--- Testing Session Cache ---")
+
+    init_db()
+    create_user("session_user", "password")
+    user_id = authenticate_user("session_user", "password")
+
+    # 1. A validated session is served from memory afterwards
+    session_id = create_session(user_id)
+    assert validate_session(session_id) == (user_id, "session_user")
+    with get_connection() as conn:
+        conn.execute("UPDATE users SET username = 'renamed' WHERE id = ?", (user_id,))
+    assert validate_session(session_id) == (user_id, "session_user")  # No disk read
+
+    # 2. Logout invalidates the cache entry
+    delete_session(session_id)
+    assert validate_session(session_id) == (None, None)
+
+    # 3. Expired sessions are rejected and swept
+    expired_id = create_session(user_id)
+    live_id = create_session(user_id)
+    with get_connection() as conn:
+        conn.execute("UPDATE sessions SET expires_at = '2000-01-01 00:00:00' WHERE session_id = ?", (expired_id,))
+    session_cache.clear()
+    assert validate_session(expired_id) == (None, None)
+    assert validate_session(live_id) == (user_id, "renamed")
+
+    assert sweep_expired_sessions() == 1
+    assert count_sessions() == 1
+
+    # 4. The cache is bounded
+    small = database.SessionCache(size=2, ttl=60)
+    for i in range(3):
+        small.put(f"s{i}", (i, f"user{i}"))
+    assert small.get("s0") is None
+    assert small.get("s2") == (2, "user2")
+
+    print("✅ Session Cache Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
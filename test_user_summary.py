@@ -0,0 +1,65 @@
+
+import pytest
+from database import (
+    init_db, create_user, authenticate_user,
+    add_expense_db, add_expense_batch_db, update_expense_db, delete_expense_db, get_expenses_db,
+    set_initial_balance_db, archive_and_reset_expenses, undo_last_reset,
+    get_user_summary_db, verify_user_summary, get_connection
+)
+
+def test_user_summary(temp_db):
+    print("--- Testing User Summary Table ---")
+
+    init_db()
+    create_user("summary_user", "password")
+    user_id = authenticate_user("summary_user", "password")
+
+    def check(balance, count):
+        summary = get_user_summary_db(user_id)
+        print(f"Summary: {summary}")
+        assert abs(summary['current_balance'] - balance) < 1e-6
+        assert summary['tx_count'] == count
+        assert verify_user_summary() == []
+
+    check(0.0, 0)
+
+    # 1. Initial balance and single writes
+    set_initial_balance_db(user_id, 1000.0)
+    check(1000.0, 0)
+    add_expense_db(user_id, 200.0, "Food", "Dinner", "2025-02-10 20:00:00")
+    add_expense_db(user_id, 500.0, "Salary", "Bonus", "2025-02-01", transaction_type="income")
+    check(1300.0, 2)
+    assert get_user_summary_db(user_id)['first_date'] == "2025-02-01 00:00:00"  # stored in canonical form
+    assert get_user_summary_db(user_id)['last_date'] == "2025-02-10 20:00:00"
+
+    # 2. Batch import
+    add_expense_batch_db([(user_id, 50.0, "Transport", f"Cab {i}", f"2025-03-{i + 1:02d}", "expense") for i in range(10)])
+    check(800.0, 12)
+
+    # 3. Update flips an expense to income; delete removes the latest row
+    dinner = [e for e in get_expenses_db(user_id) if e['description'] == "Dinner"][0]
+    update_expense_db(dinner['id'], 200.0, "Refund", "Dinner", transaction_type="income")
+    check(1200.0, 12)
+    latest = get_expenses_db(user_id)[0]
+    delete_expense_db(latest['id'])
+    check(1250.0, 11)
+    assert get_user_summary_db(user_id)['last_date'] == "2025-03-09 00:00:00"
+
+    # 4. Reset and undo
+    archive_and_reset_expenses(user_id)
+    check(0.0, 0)
+    assert get_user_summary_db(user_id)['first_date'] is None
+    assert undo_last_reset(user_id)
+    check(1250.0, 11)
+
+    # 5. The checker spots drift and repairs it
+    with get_connection() as conn:
+        conn.execute("UPDATE user_summary SET expense_total = expense_total + 1 WHERE user_id = ?", (user_id,))
+    mismatches = verify_user_summary(repair=True)
+    assert [m[1] for m in mismatches] == ["expense_total"]
+    check(1250.0, 11)
+
+    print("✅ User Summary Tests Passed!")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
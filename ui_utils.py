@@ -98,45 +98,23 @@ h1, h2, h3, h4, h5, h6 { color: #212529 !important; font-family: 'Salina', sans-
         
     return base_css + animations
 
-import shutil
-import os
-from datetime import datetime
 import pandas as pd
+from backup import create_backup
+from categorizer import categorize
+from importer import detect_columns
 
-def generate_backup():
+def generate_backup(compress=True):
     """
-    Creates a backup of the current database.
+    Creates an online backup of the current database in the backup directory.
     Returns the path to the backup file.
     """
-    db_file = "bank.db"
-    if not os.path.exists(db_file):
-        return None
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = f"backup_bank_{timestamp}.db"
-    shutil.copy(db_file, backup_file)
-    return backup_file
+    return create_backup(compress=compress)
 
 def auto_categorize(description):
     """
-    Simple keyword matching for auto-categorization.
+    Simple keyword matching for auto-categorization (see categorizer.CATEGORY_KEYWORDS).
     """
-    desc = description.lower()
-    mapping = {
-        "Food": ["burger", "pizza", "swiggy", "zomato", "restaurant", "cafe", "coffee", "grocery", "mart"],
-        "Transport": ["uber", "ola", "fuel", "petrol", "parking", "train", "bus", "flight", "taxi"],
-        "Utilities": ["electricity", "water", "bill", "recharge", "mobile", "broadband", "gas"],
-        "Entertainment": ["netflix", "prime", "movie", "cinema", "spotify", "game", "steam"],
-        "Shopping": ["amazon", "flipkart", "myntra", "nike", "adidas", "clothes", "mall"],
-        "Health": ["pharmacy", "doctor", "hospital", "med", "clinic"],
-        "Salary": ["salary", "credit", "interest", "refund", "dividend", "bonus"]
-    }
-    
-    for category, keywords in mapping.items():
-        for keyword in keywords:
-            if keyword in desc:
-                return category
-    return "Other"
+    return categorize(description)
 
 def parse_bank_statement(uploaded_file):
     """
@@ -150,13 +128,8 @@ def parse_bank_statement(uploaded_file):
         # Normalize columns
         df.columns = [c.lower().strip() for c in df.columns]
         
-        # Mapping attempts
-        col_map = {}
-        for col in df.columns:
-            if "date" in col: col_map["date"] = col
-            elif "desc" in col or "particulars" in col or "narration" in col: col_map["description"] = col
-            elif "amount" in col or "debit" in col or "credit" in col: col_map["amount"] = col
-            elif "type" in col or "cr/dr" in col: col_map["type"] = col
+        # Mapping attempts (shared with the streaming importer)
+        col_map = detect_columns(df.columns)
 
         if "date" in col_map and "amount" in col_map:
             # Rename for consistency